@@ -1,17 +1,31 @@
+import functools
+import os
+
 import streamlit as st
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import io
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
 from datetime import datetime
 
+from moteur_fiscal import parametres_fiscaux
+from moteur_fiscal.cache import cache_resultats, empreinte_scenario
+from moteur_fiscal.graphe import GRAPHE_SIMULATION, CalculIncremental
+from moteur_fiscal.mesures import MesuresExecution
+from moteur_fiscal.objectif import resoudre_objectif
+from moteur_fiscal.monte_carlo import HypothesesRisque, simuler_monte_carlo
+from moteur_fiscal.resultats import TableauRegimes
+from moteur_fiscal.optimisation import DUREES_PRET, optimiser_financement
+from moteur_fiscal.portefeuille import simuler_portefeuille
+from moteur_fiscal.sensibilite import grille_sensibilite
+from moteur_fiscal.sortie import simuler_sorties
+from moteur_fiscal.stockage import archive_scenarios
+
 
 # --- Style vert sapin / doré ---
 st.set_page_config(page_title="Simulateur fiscal immobilier", page_icon="🏠", layout="wide")
+
+# Durée de chaque étape de l'exécution (moteur_fiscal.mesures) ; panneau caché, affiché avec ?debug=1
+# dans l'URL ou SIMULATEUR_DEBUG=1. Allocations et profil ne s'activent que par variables d'environnement
+mode_debug = st.query_params.get("debug") == "1" or os.environ.get("SIMULATEUR_DEBUG") == "1"
 st.markdown("""
     <style>
     .stApp {
@@ -102,599 +116,851 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-# --- Barème progressif 2025 ---
-bareme = [
-    (0, 11497, 0.00),
-    (11498, 29315, 0.11),
-    (29316, 83823, 0.30),
-    (83824, 180294, 0.41),
-    (180295, float("inf"), 0.45),
-]
-
-def impot_progressif(revenu_imposable, parts=1):
-    revenu_par_part = revenu_imposable / parts
-    impots = 0
-    details = []
-    for bas, haut, taux in bareme:
-        if revenu_par_part > bas:
-            tranche_imposable = min(revenu_par_part, haut) - bas
-            impot_tranche = tranche_imposable * taux
-            impots += impot_tranche
-            details.append((bas, haut, taux, tranche_imposable, impot_tranche))
-        else:
-            break
-    return impots * parts, details
-
-# --- Calcul intérêts réels sur 12 mois ---
-def calcul_interets_annuels(capital, taux_annuel, duree_annees):
-    n_mois = duree_annees * 12
-    taux_mensuel = taux_annuel / 100 / 12
-    mensualite = capital * (taux_mensuel / (1 - (1 + taux_mensuel) ** -n_mois))
-    interets_annuels = 0
-    capital_restant = capital
-    for _ in range(12):
-        interet_mois = capital_restant * taux_mensuel
-        interets_annuels += interet_mois
-        amortissement_mois = mensualite - interet_mois
-        capital_restant -= amortissement_mois
-    return interets_annuels, mensualite
-
-# --- Calcul revenu foncier ou BIC ---
-def calcul_revenu_foncier(loyers, charges_classiques, interets_emprunt, assurance_emprunteur, 
-                          type_loc, regime, amortissement_total=0):
-    revenu_brut = loyers
-    total_charges_pret = interets_emprunt + assurance_emprunteur
-    
-    if regime.startswith("Micro"):
-        abattement = 30 if type_loc == "Nue" else 50
-        revenu_imposable = revenu_brut * (1 - abattement / 100)
-        return {
-            "revenu_brut": revenu_brut,
-            "abattement_pct": abattement,
-            "revenu_imposable": revenu_imposable,
-            "charges_classiques": 0,
-            "interets": interets_emprunt,
-            "assurance_pret": assurance_emprunteur,
-            "amortissement_total": 0,
-            "amortissement_deductible": 0,
-            "amortissement_non_deductible": 0,
-            "revenu_apres_interets": revenu_brut,
-            "revenu_apres_charges": revenu_brut,
-            "revenu_avant_amortissement": revenu_brut,
-            "deficit_global": 0,
-            "deficit_interets": 0,
-        }
-    else:
-        # Régime réel
-        revenu_apres_interets = revenu_brut - total_charges_pret
-        deficit_interets = max(0, total_charges_pret - revenu_brut)
-        revenu_apres_charges = revenu_apres_interets - charges_classiques
-        
-        # Pour location nue : déficit foncier classique
-        if type_loc == "Nue":
-            # Déficit imputable limité à 10 700 € (charges hors intérêts)
-            # Les intérêts créent un déficit reportable séparément
-            deficit_charges_seules = max(0, charges_classiques - revenu_apres_interets)
-            deficit_global = min(deficit_charges_seules, 10700)
-            assiette_imposable = max(0, revenu_apres_charges)
-            
-            return {
-                "revenu_brut": revenu_brut,
-                "abattement_pct": 0,
-                "revenu_imposable": assiette_imposable,
-                "charges_classiques": charges_classiques,
-                "interets": interets_emprunt,
-                "assurance_pret": assurance_emprunteur,
-                "amortissement_total": 0,
-                "amortissement_deductible": 0,
-                "amortissement_non_deductible": 0,
-                "revenu_apres_interets": revenu_apres_interets,
-                "revenu_apres_charges": revenu_apres_charges,
-                "revenu_avant_amortissement": revenu_apres_charges,
-                "deficit_global": deficit_global,
-                "deficit_interets": deficit_interets,
-            }
-        
-        # Pour location meublée : amortissement avec limitation Art. 39 C
-        else:
-            revenu_avant_amortissement = revenu_apres_charges
-            
-            # Article 39 C du CGI : l'amortissement ne peut excéder
-            # la différence entre loyers et autres charges
-            plafond_amortissement = max(0, revenu_avant_amortissement)
-            amortissement_deductible = min(amortissement_total, plafond_amortissement)
-            amortissement_non_deductible = amortissement_total - amortissement_deductible
-            
-            revenu_apres_amortissement = revenu_avant_amortissement - amortissement_deductible
-            assiette_imposable = max(0, revenu_apres_amortissement)
-            
-            return {
-                "revenu_brut": revenu_brut,
-                "abattement_pct": 0,
-                "revenu_imposable": assiette_imposable,
-                "charges_classiques": charges_classiques,
-                "interets": interets_emprunt,
-                "assurance_pret": assurance_emprunteur,
-                "amortissement_total": amortissement_total,
-                "amortissement_deductible": amortissement_deductible,
-                "amortissement_non_deductible": amortissement_non_deductible,
-                "revenu_apres_interets": revenu_apres_interets,
-                "revenu_apres_charges": revenu_apres_charges,
-                "revenu_avant_amortissement": revenu_avant_amortissement,
-                "deficit_global": 0,
-                "deficit_interets": 0,
-            }
+# Paramètres fiscaux de l'année en vigueur (barème, plafonds, taux), construits une fois à l'import
+parametres = parametres_fiscaux()
+
+# Graphe de calcul de la session : à chaque exécution, seuls les nœuds en aval des saisies modifiées
+# sont recalculés (prêt, amortissements, régimes, projection, graphiques)
+if "calcul" not in st.session_state:
+    st.session_state.calcul = CalculIncremental(GRAPHE_SIMULATION)
+calcul = st.session_state.calcul
+calcul.recalcules.clear()
+
+
+
+def definir_saisies(**saisies):
+    # Montants en float, comme dans normaliser_scenario : mêmes valeurs que simuler_scenario
+    calcul.definir(**{champ: float(valeur) for champ, valeur in saisies.items()})
+
+
+# --- Sections relancées seules ---
+# Chaque section après les saisies est un fragment : un clic ou une saisie n'y relance que la section
+# concernée. Les saisies, elles, relancent toute la page : toutes les sections suivent le scénario.
+# Les valeurs partagées (saisies, empreinte du scénario, scénario simulé) sont gardées en session.
+def section(cle):
+    def decorer(corps):
+        @st.fragment
+        @functools.wraps(corps)
+        def executer():
+            # Relancée seule, la section ouvre et clôt sa propre mesure (celle de la page est déjà close)
+            global mesures
+            if not mesures.terminee:
+                corps()
+                return
+            mesures = MesuresExecution()
+            calcul.recalcules.clear()
+            try:
+                corps()
+            finally:
+                mesures.terminer(f"section_{cle}")
+        return executer
+    return decorer
+
+
+def scenario_courant():
+    return st.session_state.scenario, st.session_state.options_projection, st.session_state.cle_scenario
+
+
+def simulation_affichee():
+    # Empreinte du scénario simulé, tant que les saisies n'ont pas changé depuis
+    cle = st.session_state.get("simulation")
+    return cle if cle is not None and cle == st.session_state.get("cle_scenario") else None
+
+
+# --- Saisies ---
+# Un scénario rechargé depuis l'archive fournit les valeurs initiales des champs ; la génération,
+# incrémentée à chaque rechargement, renouvelle les clés pour que les champs repartent de ces valeurs
+saisies_rechargees = st.session_state.get("saisies_rechargees", {})
+generation_saisies = st.session_state.get("generation_saisies", 0)
+
+
+def valeur_initiale(champ, defaut, **dependances):
+    # Valeur enregistrée du champ, tant que les champs dont elle dépend n'ont pas changé
+    if champ not in saisies_rechargees or any(saisies_rechargees.get(c) != v for c, v in dependances.items()):
+        return defaut
+    return saisies_rechargees[champ]
+
+
+def cle_saisie(champ):
+    return f"saisie_{champ}_{generation_saisies}"
+
 
 # --- Interface ---
 st.title("🏠 Simulateur fiscal immobilier et rendement")
 
-st.info("""ℹ️ Ce simulateur calcule la fiscalité de la **première année** d'investissement. Les intérêts d'emprunt diminuent progressivement les années suivantes.
+st.info("""ℹ️ Ce simulateur détaille la fiscalité de la **première année** d'investissement. Les intérêts d'emprunt diminuant progressivement, les années suivantes sont présentées dans la projection pluriannuelle.
 """)
 
-RFR = st.number_input("Revenu Fiscal de Référence (RFR)", value=50000)
-st.caption("💡 Montant indiqué sur votre avis d'imposition. Il s'agit du revenu net imposable après abattements et déductions.")
-
-parts = st.number_input("Nombre de parts fiscales", value=1)
-st.caption("💡 1 part pour célibataire, 2 parts pour couple, +0,5 part par enfant à charge (1 part entière à partir du 3ème).")
-
-loyers = st.number_input("Revenus locatifs annuels (€)", value=10000)
-st.caption("💡 Montant total des loyers perçus sur l'année (hors charges). Pour un loyer mensuel de 800€, indiquez 9 600€.")
-
-st.subheader("🏘️ Type de bien")
-type_bien = st.selectbox("Type de bien immobilier", ["Appartement", "Maison individuelle"])
-st.caption("💡 Appartement : terrain négligeable. Maison : terrain à déduire (non amortissable).")
-
-prix_bien = st.number_input("Prix d'achat du bien (€)", value=200000)
-st.caption("💡 Prix d'acquisition hors frais de notaire et agence")
-
-type_achat = st.selectbox("Type d'achat", ["Ancien", "Neuf"])
-taux_notaire = 0.08 if type_achat == "Ancien" else 0.03
-frais_notaire = st.number_input("Frais de notaire (€)", value=int(prix_bien * taux_notaire))
-st.caption(f"💡 Environ {taux_notaire*100:.0f}% du prix d'achat pour un bien {type_achat.lower()}")
-
-valeur_terrain = 0
-valeur_amortissable = prix_bien
-
-if type_bien == "Maison individuelle":
-    st.warning("⚠️ Pour une maison, le terrain n'est pas amortissable (LMNP)")
-    valeur_terrain = st.number_input("Valeur du terrain (€)", value=int(prix_bien * 0.15))
-    st.caption("💡 Généralement 10-25% du prix total")
-    valeur_amortissable = prix_bien - valeur_terrain
-    st.info(f"💡 Valeur amortissable (bâti) : {valeur_amortissable:,.0f} €")
-else:
-    st.info("ℹ️ Pour un appartement, la totalité du prix est amortissable (terrain négligeable)")
-
-st.subheader("🛋️ Amortissement LMNP (location meublée au réel)")
-with st.expander("Paramètres d'amortissement"):
-    st.warning("⚠️ Ce calcul est simplifié pour vous donner une première estimation. La fiscalité du LMNP est complexe et nécessite l'accompagnement d'un expert-comptable pour une optimisation précise (décomposition par composants, stratégie pluriannuelle, application de l'article 39 C du CGI, etc.).")
-    
-    duree_amortissement_bati = st.number_input("Durée d'amortissement du bâti (années)", 
-                                                value=25, min_value=20, max_value=40)
-    st.caption("💡 Généralement entre 25 et 30 ans")
-    
-    valeur_mobilier = st.number_input("Valeur du mobilier (€)", value=10000)
-    st.caption("💡 Coût d'ameublement du logement")
-    
-    duree_amortissement_mobilier = st.number_input("Durée d'amortissement du mobilier (années)", 
-                                                    value=7, min_value=5, max_value=10)
-    st.caption("💡 Généralement entre 5 et 10 ans")
-
-# Calcul des amortissements
-amortissement_bati = valeur_amortissable / duree_amortissement_bati
-amortissement_mobilier = valeur_mobilier / duree_amortissement_mobilier
-amortissement_total = amortissement_bati + amortissement_mobilier
-
-st.write(f"💡 Amortissement annuel bâti : {amortissement_bati:.2f} €")
-st.write(f"💡 Amortissement annuel mobilier : {amortissement_mobilier:.2f} €")
-st.write(f"💡 **Amortissement total calculé : {amortissement_total:.2f} €**")
-
-st.subheader("💼 Charges déductibles (réelles)")
-taxe_fonciere = st.number_input("Taxe foncière annuelle (€)", value=2000)
-st.caption("💡 Montant annuel de la taxe foncière indiqué sur votre avis d'imposition. Varie selon la commune et la surface (en moyenne 15-25€/m² par an).")
-
-provision_copro = st.number_input("Provisions sur charges de copropriété annuelles (€)", value=1000)
-st.caption("💡 Montant annuel des charges de copropriété. En moyenne 20-50€/m²/an selon les services (ascenseur, gardien, etc.).")
-
-assurances = st.number_input("Primes d'assurances annuelles (GLI, PNO…) (€)", value=500)
-st.caption("💡 Montant annuel total : PNO (propriétaire non occupant) 150-300€/an + GLI (garantie loyers impayés, optionnelle) 2-4% des loyers annuels.")
-
-st.subheader("🏦 Prêt immobilier")
-capital = st.number_input("Montant du prêt (€)", value=200000)
-st.caption("💡 Montant emprunté (généralement 80-90% du prix d'achat + frais de notaire).")
-
-taux_annuel = st.number_input("Taux annuel (%)", value=2.0)
-st.caption("💡 Taux d'intérêt nominal annuel du prêt (en 2024-2025 : généralement entre 3,5% et 4,5% sur 20-25 ans).")
-
-duree_annees = st.number_input("Durée du prêt (années)", value=20)
-st.caption("💡 Durée d'emprunt typique : 15, 20 ou 25 ans.")
-
-assurance_emprunteur = st.number_input("Assurance emprunteur annuelle (€)", value=600)
-st.caption("💡 Montant annuel de l'assurance de prêt. En moyenne 0,25-0,40% du capital emprunté par an (ex : 500-800€/an pour 200 000€).")
-
-interets_emprunt, mensualite = calcul_interets_annuels(capital, taux_annuel, duree_annees)
-st.write(f"💡 Intérêts réels estimés sur la première année : {interets_emprunt:.2f} €")
-st.write(f"💡 Mensualité estimée du prêt : {mensualite:.2f} € / mois")
-
-charges_classiques = taxe_fonciere + provision_copro + assurances
-results = []
-
-def generate_pdf(df, RFR, parts, loyers, type_bien, prix_bien, valeur_terrain=0):
-    # Créer le PDF en mémoire
-    pdf_buffer = io.BytesIO()
-    doc = SimpleDocTemplate(pdf_buffer, pagesize=letter, leftMargin=40, rightMargin=40, topMargin=40, bottomMargin=40)
-    story = []
-    
-    # Styles
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        spaceAfter=30,
-        alignment=1  # Center alignment
-    )
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=16,
-        spaceAfter=15,
-        textColor=colors.HexColor('#0b3d2e'),
-        borderPadding=10,
-        borderWidth=1,
-        borderColor=colors.HexColor('#d4af37'),
-        borderRadius=5
-    )
-    subheading_style = ParagraphStyle(
-        'CustomSubheading',
-        parent=styles['Heading3'],
-        fontSize=14,
-        spaceAfter=10,
-        textColor=colors.HexColor('#1f6f4a')
-    )
-    body_style = ParagraphStyle(
-        'CustomBody',
-        parent=styles['Normal'],
-        fontSize=11,
-        spaceAfter=8,
-        leading=16
-    )
-    note_style = ParagraphStyle(
-        'Note',
-        parent=styles['Italic'],
-        fontSize=9,
-        textColor=colors.grey
-    )
-    
-    # En-tête
-    story.append(Paragraph("Dossier d'Investissement Immobilier", title_style))
-    story.append(Paragraph(f"Analyse fiscale et financière générée le {datetime.now().strftime('%d/%m/%Y')}", 
-                         note_style))
-    story.append(Spacer(1, 30))
-    
-    # Résumé exécutif
-    story.append(Paragraph("Résumé de l'Investissement", heading_style))
-    exec_summary = f"""
-    Ce document présente une analyse détaillée d'un projet d'investissement immobilier 
-    {type_bien.lower()} pour un montant de {prix_bien:,.0f} €. La simulation inclut une étude 
-    fiscale complète et une analyse de rentabilité selon différents régimes fiscaux.
-    """
-    story.append(Paragraph(exec_summary, body_style))
-    story.append(Spacer(1, 20))
-
-    # Profil de l'investisseur
-    story.append(Paragraph("Profil de l'Investisseur", heading_style))
-    # Calcul de la tranche marginale d'imposition
-    revenu_par_part = RFR/parts
-    tmi = 0
-    for bas, haut, taux in bareme:
-        if revenu_par_part >= bas:
-            tmi = taux
-    investor_data = [
-        ["Revenu Fiscal de Référence", f"{RFR:,.2f} €"],
-        ["Nombre de parts fiscales", f"{parts}"],
-        ["Tranche marginale d'imposition", f"{tmi*100:.0f}%"]
-    ]
-    t = Table(investor_data, colWidths=[4*inch, 2.5*inch])
-    t.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#f5f2e7')),
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#0b3d2e')),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 11),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ('PADDING', (0, 0), (-1, -1), 8)
-    ]))
-    story.append(t)
-    story.append(Spacer(1, 20))
-
-    # Caractéristiques du bien
-    story.append(Paragraph("Caractéristiques de l'Investissement", heading_style))
-    property_data = [
-        ["Type de bien", type_bien],
-        ["Prix d'acquisition", f"{prix_bien:,.2f} €"],
-        ["Revenus locatifs annuels", f"{loyers:,.2f} €"],
-        ["Rentabilité locative brute", f"{(loyers/prix_bien)*100:.2f}%"]
-    ]
-    if type_bien == "Maison individuelle":
-        property_data.extend([
-            ["Valeur du terrain", f"{valeur_terrain:,.2f} €"],
-            ["Valeur du bâti", f"{prix_bien-valeur_terrain:,.2f} €"]
-        ])
-    t = Table(property_data, colWidths=[4*inch, 2.5*inch])
-    t.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#f5f2e7')),
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#0b3d2e')),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 11),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ('PADDING', (0, 0), (-1, -1), 8)
-    ]))
-    story.append(t)
-    story.append(Spacer(1, 20))
-    
-    # Analyse des différents régimes
-    story.append(Paragraph("Analyse Comparative des Régimes Fiscaux", heading_style))
-    results_data = [["Régime", "Surcoût fiscal", "Rendement net", "Revenu net annuel", "Cash-flow mensuel"]]
-    for _, row in df.iterrows():
-        results_data.append([
-            row["Type"],
-            f"{row['Surcoût fiscal (€)']:,.0f} €",
-            f"{row['Rendement net (%)']:.2f}%",
-            f"{row['Revenu net (€)']:,.0f} €",
-            f"{row['Revenu net (€)']/12:,.0f} €"
-        ])
-    t = Table(results_data, colWidths=[2*inch, 1.5*inch, 1.5*inch, 1.5*inch, 1.5*inch])
-    t.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0b3d2e')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('GRID', (0, 0), (-1, -1), 1, colors.grey),
-        ('PADDING', (0, 0), (-1, -1), 8),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#f5f2e7')),
-        ('TEXTCOLOR', (0, 1), (-1, -1), colors.HexColor('#0b3d2e'))
-    ]))
-    story.append(t)
-    
-    # Recommandations
-    story.append(Spacer(1, 20))
-    story.append(Paragraph("Points Clés pour le Financement", heading_style))
-    key_points = [
-        f"• <b>Prix d'acquisition :</b> {prix_bien:,.0f} € (hors frais de notaire)",
-        f"• <b>Revenus locatifs annuels :</b> {loyers:,.0f} €",
-        f"• <b>Rentabilité locative brute :</b> {(loyers/prix_bien)*100:.2f}%",
-        "• <b>Points forts :</b>",
-        f"  - Revenus locatifs réguliers de {loyers/12:,.0f} € par mois",
-        f"  - Plusieurs options de régimes fiscaux disponibles",
-        "• <b>Points d'attention :</b>",
-        "  - Prévoir une réserve pour les charges et travaux",
-        "  - Anticiper la fiscalité dans le plan de financement"
-    ]
-    for point in key_points:
-        story.append(Paragraph(point, body_style))
-        
-    # Note de conclusion
-    story.append(Spacer(1, 20))
-    conclusion = """
-    <i>Note : Cette simulation constitue une aide à la décision et doit être complétée par une analyse 
-    personnalisée avec un professionnel (expert-comptable, avocat fiscaliste) pour choisir 
-    le régime fiscal le plus adapté à votre situation.</i>
-    """
-    story.append(Paragraph(conclusion, note_style))
-    
-    # Pied de page
-    footer = f"""
-    Document généré le {datetime.now().strftime('%d/%m/%Y à %H:%M')}
-    Simulation réalisée avec le Simulateur fiscal immobilier et rendement
-    """
-    story.append(Spacer(1, 30))
-    story.append(Paragraph(footer, note_style))
-    
-    # Générer le PDF
-    doc.build(story)
-    return pdf_buffer
-
-if st.button("✨ Lancer la simulation", key="btn_simulation"):
-    # Initialiser la session state si nécessaire
-    if 'simulation_results' not in st.session_state:
-        st.session_state.simulation_results = None
-    
-    impots_base, _ = impot_progressif(RFR, parts)
-
-    # Liste pour stocker les résultats
-    results = []
-    
-    for type_loc in ["Nue", "Meublée"]:
-        for regime in ["Micro", "Reel"]:
-            # Vérification plafond micro
-            micro_inapplicable = False
-            if regime == "Micro":
-                if type_loc == "Nue" and loyers > 15000:
-                    micro_inapplicable = True
-                    regime_name = "micro-foncier"
-                elif type_loc == "Meublée" and loyers > 77700:
-                    micro_inapplicable = True
-                    regime_name = "micro-BIC"
-                else:
-                    regime_name = "micro-foncier" if type_loc=="Nue" else "micro-BIC"
-            else:
-                regime_name = regime
+def saisies():
+    RFR = st.number_input("Revenu Fiscal de Référence (RFR)", value=valeur_initiale("RFR", 50000), key=cle_saisie("RFR"))
+    st.caption("💡 Montant indiqué sur votre avis d'imposition. Il s'agit du revenu net imposable après abattements et déductions.")
 
-            # Calcul de l'amortissement (uniquement pour meublé réel)
-            amort_a_appliquer = 0
-            if type_loc == "Meublée" and regime == "Reel":
-                amort_a_appliquer = amortissement_total
+    parts = st.number_input("Nombre de parts fiscales", value=valeur_initiale("parts", 1), key=cle_saisie("parts"))
+    st.caption("💡 1 part pour célibataire, 2 parts pour couple, +0,5 part par enfant à charge (1 part entière à partir du 3ème).")
 
-            res = calcul_revenu_foncier(
-                loyers, charges_classiques, interets_emprunt, assurance_emprunteur, 
-                type_loc, regime, amort_a_appliquer
-            )
+    loyers = st.number_input("Revenus locatifs annuels (€)", value=valeur_initiale("loyers", 10000), key=cle_saisie("loyers"))
+    st.caption("💡 Montant total des loyers perçus sur l'année (hors charges). Pour un loyer mensuel de 800€, indiquez 9 600€.")
 
-            if micro_inapplicable:
-                # --- Encadré vert sapin/doré pour régime inapplicable ---
-                with st.container():
-                    st.markdown(f"""
-                        <div style='background-color:#1f6f4a; border:2px solid #d4af37; border-radius:10px; padding:15px; margin-bottom:15px;'>
-                            <h3>{type_loc} - {regime_name}</h3>
-                            <p>⚠️ Ce régime n'est pas applicable car le revenu locatif annuel dépasse le plafond autorisé.</p>
-                        </div>
-                    """, unsafe_allow_html=True)
-                continue
-
-            # Calcul de l'impact fiscal
-            revenu_total = RFR - res["deficit_global"] + res["revenu_imposable"]
-            total_impot, details = impot_progressif(revenu_total, parts)
-            
-            # Calcul des prélèvements sociaux
-            if type_loc == "Meublée" and regime == "Reel":
-                # Pour le LMNP au réel, les PS sont calculés sur le revenu avant amortissement
-                assiette_ps = res["revenu_avant_amortissement"]
-            else:
-                # Pour les autres cas, sur le revenu imposable
-                assiette_ps = res["revenu_imposable"]
-            
-            prelev_sociaux = max(0, assiette_ps) * 0.172  # On applique les PS uniquement sur les revenus positifs
-            impot_total_avec_prelev = total_impot + prelev_sociaux
-            surcout_fiscal = impot_total_avec_prelev - impots_base
-            
-            # Calcul du rendement net-net
-            cout_total_acquisition = prix_bien + frais_notaire
-            charges_totales = charges_classiques + interets_emprunt + assurance_emprunteur
-            revenu_net_apres_charges = loyers - charges_totales
-            revenu_net_apres_impot = revenu_net_apres_charges - surcout_fiscal
-            rendement_net = (revenu_net_apres_impot / cout_total_acquisition) * 100 if cout_total_acquisition else 0
-            
-            # Calcul du cash-flow
-            mensualites_annuelles = mensualite * 12
-            charges_annuelles = charges_classiques + mensualites_annuelles
-            impact_fiscal_mensuel = surcout_fiscal / 12  # On lisse l'impact fiscal sur l'année
-            cash_flow_annuel = loyers - charges_annuelles - surcout_fiscal
-            cash_flow_mensuel = cash_flow_annuel / 12
-
-            # Stockage pour diagrammes
-            results.append({
-                "Type": f"{type_loc} - {regime_name}",
-                "Surcoût fiscal (€)": surcout_fiscal,
-                "Rendement net (%)": rendement_net,
-                "Revenu net (€)": revenu_net_apres_impot
-            })
-
-            # --- Bloc encadré vert sapin/doré ---
+    st.subheader("🏘️ Type de bien")
+    types_bien = ["Appartement", "Maison individuelle"]
+    type_bien = st.selectbox("Type de bien immobilier", types_bien,
+                             index=types_bien.index(valeur_initiale("type_bien", "Appartement")), key=cle_saisie("type_bien"))
+    st.caption("💡 Appartement : terrain négligeable. Maison : terrain à déduire (non amortissable).")
+
+    prix_bien = st.number_input("Prix d'achat du bien (€)", value=valeur_initiale("prix_bien", 200000), key=cle_saisie("prix_bien"))
+    st.caption("💡 Prix d'acquisition hors frais de notaire et agence")
+
+    types_achat = ["Ancien", "Neuf"]
+    type_achat = st.selectbox("Type d'achat", types_achat,
+                              index=types_achat.index(valeur_initiale("type_achat", "Ancien")), key=cle_saisie("type_achat"))
+    taux_notaire = 0.08 if type_achat == "Ancien" else 0.03
+    frais_notaire_defaut = valeur_initiale("frais_notaire", int(prix_bien * taux_notaire), prix_bien=prix_bien, type_achat=type_achat)
+    # Le montant proposé suit le prix et le type d'achat : il fait partie de la clé du champ
+    frais_notaire = st.number_input("Frais de notaire (€)", value=frais_notaire_defaut,
+                                    key=cle_saisie(f"frais_notaire_{frais_notaire_defaut}"))
+    st.caption(f"💡 Environ {taux_notaire*100:.0f}% du prix d'achat pour un bien {type_achat.lower()}")
+
+    valeur_terrain = 0
+    valeur_amortissable = prix_bien
+
+    if type_bien == "Maison individuelle":
+        st.warning("⚠️ Pour une maison, le terrain n'est pas amortissable (LMNP)")
+        valeur_terrain_defaut = valeur_initiale("valeur_terrain", int(prix_bien * 0.15),
+                                                prix_bien=prix_bien, type_bien=type_bien)
+        valeur_terrain = st.number_input("Valeur du terrain (€)", value=valeur_terrain_defaut,
+                                         key=cle_saisie(f"valeur_terrain_{valeur_terrain_defaut}"))
+        st.caption("💡 Généralement 10-25% du prix total")
+        valeur_amortissable = prix_bien - valeur_terrain
+        st.info(f"💡 Valeur amortissable (bâti) : {valeur_amortissable:,.0f} €")
+    else:
+        st.info("ℹ️ Pour un appartement, la totalité du prix est amortissable (terrain négligeable)")
+
+    st.subheader("🛋️ Amortissement LMNP (location meublée au réel)")
+    with st.expander("Paramètres d'amortissement"):
+        st.warning("⚠️ Ce calcul est simplifié pour vous donner une première estimation. La fiscalité du LMNP est complexe et nécessite l'accompagnement d'un expert-comptable pour une optimisation précise (décomposition par composants, stratégie pluriannuelle, application de l'article 39 C du CGI, etc.).")
+
+        duree_amortissement_bati = st.number_input("Durée d'amortissement du bâti (années)", 
+                                                    value=valeur_initiale("duree_amortissement_bati", 25), min_value=20, max_value=40,
+                                                    key=cle_saisie("duree_amortissement_bati"))
+        st.caption("💡 Généralement entre 25 et 30 ans")
+
+        valeur_mobilier = st.number_input("Valeur du mobilier (€)", value=valeur_initiale("valeur_mobilier", 10000), key=cle_saisie("valeur_mobilier"))
+        st.caption("💡 Coût d'ameublement du logement")
+
+        duree_amortissement_mobilier = st.number_input("Durée d'amortissement du mobilier (années)", 
+                                                        value=valeur_initiale("duree_amortissement_mobilier", 7), min_value=5, max_value=10,
+                                                        key=cle_saisie("duree_amortissement_mobilier"))
+        st.caption("💡 Généralement entre 5 et 10 ans")
+
+    # Calcul des amortissements
+    definir_saisies(prix_bien=prix_bien, valeur_terrain=valeur_terrain, duree_amortissement_bati=duree_amortissement_bati,
+                    valeur_mobilier=valeur_mobilier, duree_amortissement_mobilier=duree_amortissement_mobilier)
+    amortissement_bati, amortissement_mobilier, amortissement_total = calcul.evaluer("amortissements")
+
+    st.write(f"💡 Amortissement annuel bâti : {amortissement_bati:.2f} €")
+    st.write(f"💡 Amortissement annuel mobilier : {amortissement_mobilier:.2f} €")
+    st.write(f"💡 **Amortissement total calculé : {amortissement_total:.2f} €**")
+
+    st.subheader("💼 Charges déductibles (réelles)")
+    taxe_fonciere = st.number_input("Taxe foncière annuelle (€)", value=valeur_initiale("taxe_fonciere", 2000), key=cle_saisie("taxe_fonciere"))
+    st.caption("💡 Montant annuel de la taxe foncière indiqué sur votre avis d'imposition. Varie selon la commune et la surface (en moyenne 15-25€/m² par an).")
+
+    provision_copro = st.number_input("Provisions sur charges de copropriété annuelles (€)", value=valeur_initiale("provision_copro", 1000), key=cle_saisie("provision_copro"))
+    st.caption("💡 Montant annuel des charges de copropriété. En moyenne 20-50€/m²/an selon les services (ascenseur, gardien, etc.).")
+
+    assurances = st.number_input("Primes d'assurances annuelles (GLI, PNO…) (€)", value=valeur_initiale("assurances", 500), key=cle_saisie("assurances"))
+    st.caption("💡 Montant annuel total : PNO (propriétaire non occupant) 150-300€/an + GLI (garantie loyers impayés, optionnelle) 2-4% des loyers annuels.")
+
+    st.subheader("🏦 Prêt immobilier")
+    capital = st.number_input("Montant du prêt (€)", value=valeur_initiale("capital", 200000), key=cle_saisie("capital"))
+    st.caption("💡 Montant emprunté (généralement 80-90% du prix d'achat + frais de notaire).")
+
+    taux_annuel = st.number_input("Taux annuel (%)", value=valeur_initiale("taux_annuel", 2.0), key=cle_saisie("taux_annuel"))
+    st.caption("💡 Taux d'intérêt nominal annuel du prêt (en 2024-2025 : généralement entre 3,5% et 4,5% sur 20-25 ans).")
+
+    duree_annees = st.number_input("Durée du prêt (années)", value=valeur_initiale("duree_annees", 20), key=cle_saisie("duree_annees"))
+    st.caption("💡 Durée d'emprunt typique : 15, 20 ou 25 ans.")
+
+    assurance_emprunteur = st.number_input("Assurance emprunteur annuelle (€)", value=valeur_initiale("assurance_emprunteur", 600), key=cle_saisie("assurance_emprunteur"))
+    st.caption("💡 Montant annuel de l'assurance de prêt. En moyenne 0,25-0,40% du capital emprunté par an (ex : 500-800€/an pour 200 000€).")
+
+    definir_saisies(capital=capital, taux_annuel=taux_annuel, duree_annees=duree_annees)
+    interets_emprunt, mensualite = calcul.evaluer("pret")
+    st.write(f"💡 Intérêts réels estimés sur la première année : {interets_emprunt:.2f} €")
+    st.write(f"💡 Mensualité estimée du prêt : {mensualite:.2f} € / mois")
+
+    with st.expander("Voir le tableau d'amortissement du prêt"):
+        echeancier = calcul.evaluer("echeancier")
+        st.dataframe(pd.DataFrame({
+            "Année": np.arange(1, len(echeancier.interets_annuels) + 1),
+            "Intérêts (€)": echeancier.interets_annuels,
+            "Capital remboursé (€)": echeancier.principal_annuel,
+            "Capital restant dû (€)": echeancier.capital_restant_annuel,
+        }).set_index("Année").style.format("{:,.2f}"), use_container_width=True)
+
+    st.subheader("📈 Projection pluriannuelle")
+    nb_annees_projection = st.number_input("Horizon de projection (années)", value=valeur_initiale("nb_annees_projection", 20),
+                                           min_value=1, max_value=30, key=cle_saisie("nb_annees_projection"))
+    st.caption("💡 Les déficits d'intérêts (10 ans) et l'amortissement non déduit (sans limite) sont reportés d'une année sur l'autre.")
+
+    indexation_loyers = st.number_input("Revalorisation annuelle des loyers (%)", value=valeur_initiale("indexation_loyers", 0.0), key=cle_saisie("indexation_loyers"))
+    st.caption("💡 Indexation annuelle des loyers (IRL : généralement entre 1% et 3,5% par an).")
+
+    inflation_charges = st.number_input("Hausse annuelle des charges (%)", value=valeur_initiale("inflation_charges", 0.0), key=cle_saisie("inflation_charges"))
+    st.caption("💡 Évolution annuelle de la taxe foncière, des charges de copropriété et des assurances.")
+
+    definir_saisies(RFR=RFR, parts=parts, loyers=loyers, frais_notaire=frais_notaire, taxe_fonciere=taxe_fonciere,
+                    provision_copro=provision_copro, assurances=assurances, assurance_emprunteur=assurance_emprunteur,
+                    indexation_loyers=indexation_loyers, inflation_charges=inflation_charges)
+    calcul.definir(nb_annees_projection=nb_annees_projection, parametres=parametres)
+
+    # Empreinte de toutes les saisies : clé du cache partagé des résultats, de la projection et du PDF
+    scenario = {
+        "RFR": RFR, "parts": parts, "loyers": loyers, "type_bien": type_bien, "prix_bien": prix_bien,
+        "type_achat": type_achat, "frais_notaire": frais_notaire, "valeur_terrain": valeur_terrain,
+        "duree_amortissement_bati": duree_amortissement_bati, "valeur_mobilier": valeur_mobilier,
+        "duree_amortissement_mobilier": duree_amortissement_mobilier, "taxe_fonciere": taxe_fonciere,
+        "provision_copro": provision_copro, "assurances": assurances, "capital": capital,
+        "taux_annuel": taux_annuel, "duree_annees": duree_annees, "assurance_emprunteur": assurance_emprunteur,
+    }
+    options = {"nb_annees_projection": nb_annees_projection, "indexation_loyers": indexation_loyers,
+               "inflation_charges": inflation_charges}
+    cle_scenario = empreinte_scenario(scenario, **options)
+    st.session_state.scenario, st.session_state.options_projection = scenario, options
+    st.session_state.cle_scenario = cle_scenario
+    if st.session_state.get("simulation") not in (None, cle_scenario):
+        # Résultats d'un scénario dont les saisies ont changé : masqués, et leurs graphiques ne sont
+        # plus gardés par la session
+        del st.session_state.simulation
+        calcul.oublier("graphique_surcout", "graphique_rendement")
+    mesures.jalon("saisies")
+
+    if st.button("✨ Lancer la simulation", key="btn_simulation"):
+        # Les sections de résultats suivent : elles s'affichent dans cette même exécution
+        st.session_state.simulation = cle_scenario
+
+
+# --- Résultats ---
+# Affichés pour le scénario simulé (un scénario rechargé depuis l'archive l'est directement,
+# ses artefacts sont déjà en cache) ; masqués dès que les saisies changent
+@section("cartes")
+def cartes_resultats():
+    cle = simulation_affichee()
+    if cle is None:
+        return
+
+    resultats = cache_resultats.obtenir(cle, "regimes", lambda: calcul.evaluer("regimes"))
+    mesures.jalon("regimes")
+
+    for r in resultats:
+        type_loc, regime, regime_name = r.type_loc, r.regime, r.regime_name
+
+        if not r.applicable:
+            # --- Encadré vert sapin/doré pour régime inapplicable ---
             with st.container():
                 st.markdown(f"""
                     <div style='background-color:#1f6f4a; border:2px solid #d4af37; border-radius:10px; padding:15px; margin-bottom:15px;'>
                         <h3>{type_loc} - {regime_name}</h3>
-                        <p><b>Revenu locatif imposable :</b> {res['revenu_imposable']:.2f} €</p>
-                        <p><b>Impôt total + PS :</b> {impot_total_avec_prelev:.2f} €</p>
-                        <p><b>Surcoût fiscal induit par l'investissement :</b> {surcout_fiscal:.2f} €</p>
-                        <p><b>Rendement net-net :</b> {rendement_net:.2f} % ({revenu_net_apres_impot:.2f} €/an)</p>
-                        <p><b>Cash-flow (après prise en compte des impôts) :</b> {cash_flow_annuel:.2f} €/an ({cash_flow_mensuel:.2f} €/mois)</p>
+                        <p>⚠️ Ce régime n'est pas applicable car le revenu locatif annuel dépasse le plafond autorisé.</p>
                     </div>
                 """, unsafe_allow_html=True)
+            continue
+
+        res, details = r.res, r.details
+        revenu_total, prelev_sociaux = r.revenu_total, r.prelev_sociaux
+        impot_total_avec_prelev, surcout_fiscal = r.impot_total_avec_prelev, r.surcout_fiscal
+        rendement_net, revenu_net_apres_impot = r.rendement_net, r.revenu_net_apres_impot
+        cash_flow_annuel, cash_flow_mensuel = r.cash_flow_annuel, r.cash_flow_mensuel
+
+        # --- Bloc encadré vert sapin/doré ---
+        with st.container():
+            st.markdown(f"""
+                <div style='background-color:#1f6f4a; border:2px solid #d4af37; border-radius:10px; padding:15px; margin-bottom:15px;'>
+                    <h3>{type_loc} - {regime_name}</h3>
+                    <p><b>Revenu locatif imposable :</b> {res.revenu_imposable:.2f} €</p>
+                    <p><b>Impôt total + PS :</b> {impot_total_avec_prelev:.2f} €</p>
+                    <p><b>Surcoût fiscal induit par l'investissement :</b> {surcout_fiscal:.2f} €</p>
+                    <p><b>Rendement net-net :</b> {rendement_net:.2f} % ({revenu_net_apres_impot:.2f} €/an)</p>
+                    <p><b>Cash-flow (après prise en compte des impôts) :</b> {cash_flow_annuel:.2f} €/an ({cash_flow_mensuel:.2f} €/mois)</p>
+                </div>
+            """, unsafe_allow_html=True)
+            
+
+
+            with st.expander("Voir le détail des calculs"):
+                st.write(f"- Revenu locatif brut : {res.revenu_brut:.2f} €")
+                if res.abattement_pct > 0:
+                    st.write(f"- Abattement {res.abattement_pct}% : {res.revenu_brut*res.abattement_pct/100:.2f} €")
+                
+                # Afficher les charges seulement pour les régimes réels
+                if regime == "Reel":
+                    st.write(f"- Intérêts d'emprunt : {res.interets:.2f} €")
+                    st.write(f"- Assurance emprunteur : {res.assurance_pret:.2f} €")
+                    st.write(f"- Revenu après intérêts : {res.revenu_apres_interets:.2f} €")
+                    st.write(f"- Charges classiques : {res.charges_classiques:.2f} €")
+                
+                # Afficher "revenu avant amortissement" uniquement pour meublé réel
+                if type_loc == "Meublée" and regime == "Reel":
+                    st.write(f"- Revenu avant amortissement : {res.revenu_avant_amortissement:.2f} €")
+                    st.write(f"- Amortissement total calculé : {res.amortissement_total:.2f} €")
+                    st.write(f"- **Amortissement déductible (Art. 39 C) : {res.amortissement_deductible:.2f} €**")
+                    if res.amortissement_non_deductible > 0:
+                        st.write(f"- Amortissement non déductible cette année : {res.amortissement_non_deductible:.2f} €")
+                        st.warning("⚠️ Ce calcul est simplifié pour vous donner une première estimation. La fiscalité du LMNP est complexe et nécessite l'accompagnement d'un expert-comptable pour une optimisation précise (décomposition par composants, stratégie pluriannuelle, etc.).")
+                        st.info("L'amortissement non déduit est reportable sans limite de durée sur les bénéfices futurs (Art. 39 C du CGI)")
                 
+                st.write(f"- **Assiette imposable : {res.revenu_imposable:.2f} €**")
+                
+                if res.deficit_global>0:
+                    st.write(f"- Déficit foncier imputable : {res.deficit_global:.2f} €")
+                    st.info(f"Le déficit foncier (hors intérêts) est plafonné à {parametres.plafond_deficit_foncier:,.0f} € par an".replace(",", " "))
+                if res.deficit_interets>0:
+                    st.write(f"- Déficit provenant des intérêts : {res.deficit_interets:.2f} €")
+                    st.info("Ce déficit est reportable sur les revenus fonciers des 10 années suivantes")
+                
+                # Détail du calcul de l'impôt par tranches
+                st.write("\n**Détail du calcul de l'impôt par tranches :**")
+                for (bas, haut, taux), detail in zip(parametres.bareme, details):
+                    tranche_imposable, impot_tranche = detail[3], detail[4]
+                    if tranche_imposable > 0:
+                        haut_str = f"{haut:,.0f}" if haut != float('inf') else "∞"
+                        st.write(f"Tranche {bas:,.0f}-{haut_str} € à {taux*100:.0f}% : {tranche_imposable:.2f} € imposable => {impot_tranche:.2f} € impôt")
+
+                st.write(f"\n- Revenu global pour impôt : {revenu_total:.2f} €")
+                st.write(f"- Prélèvements sociaux ({parametres.taux_prelevements_sociaux*100:.1f}%)".replace(".", ",")
+                         + f" : {prelev_sociaux:.2f} €")
 
+    mesures.jalon("cartes_regimes")
 
-                with st.expander("Voir le détail des calculs"):
-                    st.write(f"- Revenu locatif brut : {res['revenu_brut']:.2f} €")
-                    if res["abattement_pct"] > 0:
-                        st.write(f"- Abattement {res['abattement_pct']}% : {res['revenu_brut']*res['abattement_pct']/100:.2f} €")
-                    
-                    # Afficher les charges seulement pour les régimes réels
-                    if regime == "Reel":
-                        st.write(f"- Intérêts d'emprunt : {res['interets']:.2f} €")
-                        st.write(f"- Assurance emprunteur : {res['assurance_pret']:.2f} €")
-                        st.write(f"- Revenu après intérêts : {res['revenu_apres_interets']:.2f} €")
-                        st.write(f"- Charges classiques : {res['charges_classiques']:.2f} €")
-                    
-                    # Afficher "revenu avant amortissement" uniquement pour meublé réel
-                    if type_loc == "Meublée" and regime == "Reel":
-                        st.write(f"- Revenu avant amortissement : {res['revenu_avant_amortissement']:.2f} €")
-                        st.write(f"- Amortissement total calculé : {res['amortissement_total']:.2f} €")
-                        st.write(f"- **Amortissement déductible (Art. 39 C) : {res['amortissement_deductible']:.2f} €**")
-                        if res['amortissement_non_deductible'] > 0:
-                            st.write(f"- Amortissement non déductible cette année : {res['amortissement_non_deductible']:.2f} €")
-                            st.warning("⚠️ Ce calcul est simplifié pour vous donner une première estimation. La fiscalité du LMNP est complexe et nécessite l'accompagnement d'un expert-comptable pour une optimisation précise (décomposition par composants, stratégie pluriannuelle, etc.).")
-                            st.info("L'amortissement non déduit est reportable sans limite de durée sur les bénéfices futurs (Art. 39 C du CGI)")
-                    
-                    st.write(f"- **Assiette imposable : {res['revenu_imposable']:.2f} €**")
-                    
-                    if res['deficit_global']>0:
-                        st.write(f"- Déficit foncier imputable : {res['deficit_global']:.2f} €")
-                        st.info("Le déficit foncier (hors intérêts) est plafonné à 10 700 € par an")
-                    if res['deficit_interets']>0:
-                        st.write(f"- Déficit provenant des intérêts : {res['deficit_interets']:.2f} €")
-                        st.info("Ce déficit est reportable sur les revenus fonciers des 10 années suivantes")
-                    
-                    # Détail du calcul de l'impôt par tranches
-                    st.write("\n**Détail du calcul de l'impôt par tranches :**")
-                    for (bas, haut, taux), detail in zip(bareme, details):
-                        tranche_imposable, impot_tranche = detail[3], detail[4]
-                        if tranche_imposable > 0:
-                            haut_str = f"{haut:,.0f}" if haut != float('inf') else "∞"
-                            st.write(f"Tranche {bas:,.0f}-{haut_str} € à {taux*100:.0f}% : {tranche_imposable:.2f} € imposable => {impot_tranche:.2f} € impôt")
-
-                    st.write(f"\n- Revenu global pour impôt : {revenu_total:.2f} €")
-                    st.write(f"- Prélèvements sociaux (17,2%) : {prelev_sociaux:.2f} €")
+
+@section("graphiques")
+def graphiques():
+    cle = simulation_affichee()
+    if cle is None:
+        return
 
     # --- Diagramme 1 : Surcoût fiscal ---
-    df = pd.DataFrame(results)
+    # matplotlib n'est importé qu'ici : la plupart des sessions n'affichent jamais les graphiques
+    from rapports.graphiques import NOEUDS_GRAPHIQUES
+
+    calcul.etendre(NOEUDS_GRAPHIQUES)
+    image_surcout, image_rendement = calcul.evaluer("graphique_surcout", "graphique_rendement")
     st.markdown("## 💰 Surcoût fiscal induit par l'investissement immobilier")
-    fig, ax = plt.subplots(figsize=(10, 6))
-    bars = ax.bar(df["Type"], df["Surcoût fiscal (€)"], color=["#1f6f4a", "#3c9b70", "#b69329", "#d4af37"])
-    ax.set_ylabel("Montant (€)")
-    ax.set_title("Surcoût fiscal induit par l'investissement selon le régime")
-    plt.xticks(rotation=45, ha='right')
-    ax.bar_label(bars, fmt="%.0f €", label_type="center", color="white", fontweight="bold", fontsize=10)
-    plt.tight_layout()
-    st.pyplot(fig, use_container_width=True)
+    st.image(image_surcout, use_container_width=True)
 
     # --- Diagramme 2 : Rendement net après impôts ---
     st.markdown("## 📊 Rendement net après impôts")
-    fig, ax = plt.subplots(figsize=(10, 6))
-    bars = ax.bar(df["Type"], df["Rendement net (%)"], color=["#1f6f4a", "#3c9b70", "#b69329", "#d4af37"])
-    ax.set_ylabel("Rendement net (%)")
-    ax.set_title("Rendement net après impôts (%)")
-    plt.xticks(rotation=45, ha='right')
-    ax.bar_label(bars, labels=[f"{v:.0f} €" for v in df["Revenu net (€)"]], label_type="center",
-                 color="white", fontweight="bold", fontsize=10)
-    plt.tight_layout()
-    st.pyplot(fig, use_container_width=True)
-
-    # Sauvegarder les résultats dans la session state
-    st.session_state.simulation_results = {
-        'df': df,
-        'RFR': RFR,
-        'parts': parts,
-        'loyers': loyers,
-        'type_bien': type_bien,
-        'prix_bien': prix_bien,
-        'valeur_terrain': valeur_terrain
-    }
+    st.image(image_rendement, use_container_width=True)
+    mesures.jalon("graphiques")
+
+    # --- Projection pluriannuelle ---
+    st.markdown("## 📈 Projection pluriannuelle")
+    projections = cache_resultats.obtenir(cle, "projection", lambda: calcul.evaluer("projection"))
+    for onglet, (type_regime, proj) in zip(st.tabs(list(projections)), projections.items()):
+        with onglet:
+            if not proj["applicable"].all():
+                st.warning("⚠️ Les années marquées « — » dépassent le plafond du régime micro : il n'y est pas applicable.")
+            st.dataframe(pd.DataFrame({
+                "Année": proj["annee"],
+                "Loyers (€)": proj["loyers"],
+                "Assiette imposable (€)": proj["assiette_imposable"],
+                "Impôt sur le revenu (€)": proj["impot_revenu"],
+                "Prélèvements sociaux (€)": proj["prelevements_sociaux"],
+                "Surcoût fiscal (€)": proj["surcout_fiscal"],
+                "Cash-flow annuel (€)": proj["cash_flow"],
+                "Déficit reportable (€)": proj["deficit_reportable"],
+                "Amortissement reporté (€)": proj["amortissement_reporte"],
+            }).set_index("Année").style.format("{:,.2f}", na_rep="—"), use_container_width=True)
+    mesures.jalon("projection")
+
+
+# --- Rapport PDF ---
+# Le rapport est construit en arrière-plan (rapports.travaux) : seule la référence du travail est
+# gardée en session, et la page reste utilisable pendant la génération
+@st.fragment(run_every=0.5)
+def suivi_rapport_pdf(identifiant):
+    from rapports.travaux import etat_rapport
+
+    etat = etat_rapport(identifiant)
+    if etat is None or etat["etat"] in ("termine", "echec"):
+        st.rerun()  # la page affiche alors le téléchargement (ou l'erreur) ; une seule fois par rapport
+    if etat["etat"] == "en_attente":
+        st.progress(0.0, text=f"⏳ Rapport en file d'attente ({etat['rapports_avant']} rapport(s) avant le vôtre)…")
+    else:
+        st.progress(etat["progression"], text=f"⏳ Génération du rapport PDF… ({etat['duree_s']:.0f} s)")
+
+
+@section("export_pdf")
+def export_pdf():
+    cle = simulation_affichee()
+    if cle is None:
+        return
+    scenario, _, _ = scenario_courant()
 
-# Bouton pour générer le PDF (en dehors du if st.button de la simulation)
-if st.session_state.get('simulation_results') is not None:
     if st.button("📄 Générer le rapport PDF", key="btn_generate_pdf"):
-        # Récupérer les données de la session
-        sim_results = st.session_state.simulation_results
-        
-        # Générer le PDF
-        pdf_buffer = generate_pdf(
-            sim_results['df'],
-            sim_results['RFR'],
-            sim_results['parts'],
-            sim_results['loyers'],
-            sim_results['type_bien'],
-            sim_results['prix_bien'],
-            sim_results['valeur_terrain']
+        from rapports.travaux import soumettre_rapport
+
+        # Un rapport déjà en cache (scénario identique) est disponible immédiatement
+        st.session_state.rapport_pdf = soumettre_rapport(
+            cle,
+            calcul.evaluer("tableau"),
+            scenario['RFR'],
+            scenario['parts'],
+            scenario['loyers'],
+            scenario['type_bien'],
+            scenario['prix_bien'],
+            scenario['valeur_terrain']
         )
-        
-        # Offrir le téléchargement
-        st.download_button(
-            label="📥 Télécharger le rapport PDF",
-            data=pdf_buffer.getvalue(),
-            file_name=f"simulation_fiscale_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-            mime="application/pdf",
-            key="btn_download_pdf"
-        )
\ No newline at end of file
+        mesures.jalon("pdf")
+
+    if st.session_state.get('rapport_pdf'):
+        from rapports.travaux import etat_rapport
+
+        etat_pdf = etat_rapport(st.session_state.rapport_pdf)
+        if etat_pdf is None or etat_pdf["cle"] != cle:
+            pass  # rapport d'un autre scénario, ou oublié depuis
+        elif etat_pdf["etat"] in ("en_attente", "en_cours"):
+            suivi_rapport_pdf(st.session_state.rapport_pdf)
+        elif etat_pdf["etat"] == "echec":
+            st.error(f"La génération du rapport a échoué : {etat_pdf['erreur']}")
+        else:
+            if st.session_state.get('rapport_pdf_archive') != st.session_state.rapport_pdf:
+                # Un scénario déjà enregistré garde aussi son rapport
+                archive_scenarios().completer(cle, {"pdf": etat_pdf["pdf"]})
+                st.session_state.rapport_pdf_archive = st.session_state.rapport_pdf
+
+            # Offrir le téléchargement (sans relancer la section)
+            st.download_button(
+                label="📥 Télécharger le rapport PDF",
+                data=etat_pdf["pdf"],
+                file_name=f"simulation_fiscale_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
+                mime="application/pdf",
+                key="btn_download_pdf",
+                on_click="ignore",
+            )
+
+
+# --- Scénarios enregistrés ---
+@section("archive")
+def scenarios_enregistres():
+    scenario, options, cle_scenario = scenario_courant()
+    with st.expander("Enregistrer ce scénario ou recharger une simulation passée"):
+        archive = archive_scenarios()
+        st.caption("💡 Un scénario est enregistré avec ses résultats, ses graphiques et son rapport PDF s'il a été généré : "
+                   "le recharger n'exige aucun nouveau calcul. Un scénario identique n'est enregistré qu'une fois.")
+        col_client, col_bien = st.columns(2)
+        client_archive = col_client.text_input("Client", key="archive_client")
+        bien_archive = col_bien.text_input("Bien (adresse ou référence)", key="archive_bien")
+
+        if st.button("💾 Enregistrer le scénario", key="btn_enregistrer"):
+            from rapports.graphiques import NOEUDS_GRAPHIQUES
+
+            calcul.etendre(NOEUDS_GRAPHIQUES)
+            resultats_archive = cache_resultats.obtenir(cle_scenario, "regimes", lambda: calcul.evaluer("regimes"))
+            nouveau = archive.enregistrer(
+                cle_scenario,
+                {**scenario, **options},
+                client=client_archive.strip(),
+                bien=bien_archive.strip() or f"{scenario['type_bien']} {scenario['type_achat'].lower()} - {scenario['prix_bien']:,.0f} €",
+                artefacts={
+                    "regimes": resultats_archive,
+                    "projection": cache_resultats.obtenir(cle_scenario, "projection", lambda: calcul.evaluer("projection")),
+                    "surcout.png": calcul.evaluer("graphique_surcout"),
+                    "rendement.png": calcul.evaluer("graphique_rendement"),
+                    "pdf": cache_resultats.artefacts(cle_scenario).get("pdf"),
+                },
+            )
+            if nouveau:
+                st.success("Scénario enregistré.")
+            else:
+                st.info("Ce scénario était déjà enregistré : son libellé et ses artefacts ont été mis à jour.")
+            mesures.jalon("archive")
+
+        col_filtre_client, col_filtre_bien = st.columns(2)
+        filtre_client = col_filtre_client.text_input("Rechercher un client", key="archive_filtre_client")
+        filtre_bien = col_filtre_bien.text_input("Rechercher un bien", key="archive_filtre_bien")
+        scenarios_archives = archive.lister(client=filtre_client.strip(), bien=filtre_bien.strip(), limite=500)
+        if not scenarios_archives:
+            st.write("Aucun scénario enregistré.")
+        else:
+            st.caption(f"{len(scenarios_archives)} scénario(s) affiché(s) sur {len(archive)} enregistré(s), les plus récents d'abord.")
+            st.dataframe(pd.DataFrame(scenarios_archives).drop(columns="cle").rename(columns={
+                "client": "Client", "bien": "Bien", "cree_le": "Créé le", "modifie_le": "Modifié le",
+            }), hide_index=True, use_container_width=True)
+            choix_archive = st.selectbox(
+                "Scénario à recharger", range(len(scenarios_archives)),
+                format_func=lambda i: " · ".join(filter(None, (scenarios_archives[i]["client"], scenarios_archives[i]["bien"],
+                                                               scenarios_archives[i]["modifie_le"].replace("T", " ")))),
+            )
+            if st.button("📂 Recharger ce scénario", key="btn_recharger"):
+                scenario_archive = archive.charger(scenarios_archives[choix_archive]["cle"])
+                artefacts_archive = scenario_archive["artefacts"]
+                # Les artefacts enregistrés reprennent leur place dans les caches : l'affichage qui suit
+                # (résultats, graphiques, projection, PDF) ne recalcule rien
+                for nom in ("regimes", "projection", "pdf"):
+                    if nom in artefacts_archive:
+                        cache_resultats.deposer(scenario_archive["cle"], nom, artefacts_archive[nom])
+                if "regimes" in artefacts_archive:
+                    from rapports.graphiques import cache_graphiques, empreinte_donnees
+
+                    empreinte = empreinte_donnees(TableauRegimes.depuis_resultats(artefacts_archive["regimes"]))
+                    for nom in ("surcout.png", "rendement.png"):
+                        if nom in artefacts_archive:
+                            cache_graphiques.deposer(empreinte, nom, artefacts_archive[nom])
+                st.session_state.saisies_rechargees = scenario_archive["saisies"]
+                st.session_state.generation_saisies = generation_saisies + 1
+                st.session_state.simulation = scenario_archive["cle"]
+                st.rerun()
+
+
+# --- Analyse de sensibilité ---
+@section("sensibilite")
+def analyse_sensibilite():
+    scenario, options, cle_scenario = scenario_courant()
+    with st.expander("Explorer l'effet du taux, des loyers et du prix d'achat"):
+        axes_sensibilite = {
+            "Taux annuel (%)": ("taux_annuel", max(0.0, scenario["taux_annuel"] - 2), scenario["taux_annuel"] + 2),
+            "Loyers annuels (€)": ("loyers", scenario["loyers"] * 0.7, scenario["loyers"] * 1.3),
+            "Prix d'achat (€)": ("prix_bien", scenario["prix_bien"] * 0.7, scenario["prix_bien"] * 1.3),
+            "Montant emprunté (€)": ("capital", scenario["capital"] * 0.7, scenario["capital"] * 1.3),
+        }
+        titre_x = st.selectbox("Axe horizontal", list(axes_sensibilite), index=1)
+        titre_y = st.selectbox("Axe vertical", [a for a in axes_sensibilite if a != titre_x])
+        indicateur_sensibilite = st.selectbox("Indicateur", ["Rendement net (%)", "Cash-flow mensuel (€)"])
+        resolution = st.slider("Nombre de points par axe", min_value=10, max_value=200, value=100)
+        st.caption("💡 Taux : ±2 points autour du taux saisi. Loyers et prix : ±30 %. Quand le prix varie, "
+                   "frais de notaire, terrain et montant emprunté suivent la même proportion.")
+
+        if st.button("Calculer la grille", key="btn_sensibilite"):
+            axe_x, min_x, max_x = axes_sensibilite[titre_x]
+            axe_y, min_y, max_y = axes_sensibilite[titre_y]
+            valeurs_x = np.linspace(min_x, max_x, resolution)
+            valeurs_y = np.linspace(min_y, max_y, resolution)
+            cle_indicateur = "rendement_net" if indicateur_sensibilite.startswith("Rendement") else "cash_flow_mensuel"
+
+            def carte():
+                from rapports.graphiques import carte_sensibilite
+
+                grille = grille_sensibilite(scenario, **{axe_y: valeurs_y, axe_x: valeurs_x})
+                valeurs_par_regime = {
+                    regime: np.where(indicateurs["applicable"], indicateurs[cle_indicateur], np.nan)
+                    for regime, indicateurs in grille["regimes"].items()
+                }
+                return carte_sensibilite(valeurs_x, valeurs_y, valeurs_par_regime,
+                                         titre_x, titre_y, indicateur_sensibilite)
+
+            st.image(cache_resultats.obtenir(cle_scenario, f"sensibilite:{axe_x}:{axe_y}:{cle_indicateur}:{resolution}", carte),
+                     use_container_width=True)
+            mesures.jalon("sensibilite")
+            st.caption("💡 Les zones blanches correspondent aux loyers dépassant le plafond du régime micro.")
+
+
+# --- Simulation de risques (Monte Carlo) ---
+@section("monte_carlo")
+def simulation_risques():
+    scenario, options, cle_scenario = scenario_courant()
+    with st.expander("Simuler la vacance locative, l'évolution des loyers et des charges et un taux variable"):
+        n_tirages = st.select_slider("Nombre de tirages", options=[1000, 5000, 10000, 50000, 100000], value=10000)
+        vacance_mois = st.number_input("Vacance locative moyenne (mois par an)", value=0.5, min_value=0.0, max_value=12.0)
+        st.caption("💡 Nombre de mois sans locataire tiré chaque année (loi binomiale sur 12 mois).")
+        indexation_moyenne = st.number_input("Revalorisation moyenne des loyers (%)", value=1.5)
+        indexation_ecart_type = st.number_input("Écart-type de la revalorisation (points)", value=1.0, min_value=0.0)
+        inflation_moyenne = st.number_input("Hausse moyenne des charges (%)", value=2.0)
+        inflation_ecart_type = st.number_input("Écart-type de la hausse des charges (points)", value=1.0, min_value=0.0)
+        taux_variable = st.checkbox("Prêt à taux variable")
+        volatilite_taux = st.number_input("Volatilité annuelle du taux (points)", value=0.5, min_value=0.0,
+                                          disabled=not taux_variable)
+        st.caption("💡 Taux variable : le taux suit une marche aléatoire (plancher à 0 %) et la mensualité est "
+                   "recalculée chaque année sur le capital restant dû.")
+        graine = st.number_input("Graine aléatoire", value=0, min_value=0, step=1)
+
+        if st.button("Lancer la simulation de risques", key="btn_monte_carlo"):
+            hypotheses = HypothesesRisque(
+                vacance_mois=vacance_mois,
+                indexation_moyenne=indexation_moyenne / 100,
+                indexation_ecart_type=indexation_ecart_type / 100,
+                inflation_charges_moyenne=inflation_moyenne / 100,
+                inflation_charges_ecart_type=inflation_ecart_type / 100,
+                taux_variable=taux_variable,
+                volatilite_taux=volatilite_taux,
+            )
+            cle_risques = f"monte_carlo:{n_tirages}:{int(graine)}:{':'.join(map(str, hypotheses))}"
+            risques = cache_resultats.obtenir(cle_scenario, cle_risques, lambda: simuler_monte_carlo(
+                scenario, n_tirages=n_tirages, nb_annees=options["nb_annees_projection"], hypotheses=hypotheses, graine=int(graine)
+            ))
+            mesures.jalon("monte_carlo")
+
+            from rapports.graphiques import bandes_centiles
+
+            st.image(bandes_centiles(risques["annee"], {regime: indicateurs["cash_flow_annuel"]
+                                                        for regime, indicateurs in risques["regimes"].items()},
+                                     risques["centiles"], "Cash-flow annuel (€)"), use_container_width=True)
+            st.dataframe(pd.DataFrame({
+                regime: indicateurs["probabilite_cash_flow_negatif"] * 100
+                for regime, indicateurs in risques["regimes"].items()
+            }, index=pd.Index(risques["annee"], name="Année")).style.format("{:.1f} %", na_rep="—"),
+                use_container_width=True)
+            st.caption("💡 Probabilité d'un cash-flow annuel négatif, parmi les tirages où le régime est applicable.")
+
+
+# --- Optimisation du régime et du financement ---
+@section("optimisation")
+def optimisation_financement():
+    scenario, options, cle_scenario = scenario_courant()
+    with st.expander("Chercher les meilleures combinaisons de régime, durée, apport et mobilier"):
+        cout_acquisition = scenario["prix_bien"] + scenario["frais_notaire"]
+        apport_maximum = st.number_input("Apport maximum disponible (€)", value=float(max(0.0, cout_acquisition - scenario["capital"])),
+                                         min_value=0.0, max_value=float(cout_acquisition))
+        st.caption("💡 Le montant emprunté est le coût d'acquisition (prix + frais de notaire + mobilier) moins "
+                   "l'apport.")
+        durees_pret = st.multiselect("Durées de prêt envisagées (années)", [5, 7, 10, 12, 15, 20, 25, 30],
+                                     default=list(DUREES_PRET))
+        mobilier_maximum = st.number_input("Valeur maximale du mobilier (€)", value=float(max(scenario["valeur_mobilier"], 20000)),
+                                           min_value=0.0)
+        indicateur_optimisation = st.selectbox("Rendement à maximiser",
+                                               ["Rendement net (%)", "Rendement des fonds propres (%)"])
+        st.caption("💡 Rendement des fonds propres : revenu net après impôt rapporté à l'apport.")
+
+        if st.button("Optimiser", key="btn_optimisation") and durees_pret:
+            cle_rendement = "rendement_net" if indicateur_optimisation.startswith("Rendement net") else "rendement_fonds_propres"
+            optimisation = cache_resultats.obtenir(
+                cle_scenario, f"optimisation:{apport_maximum}:{sorted(durees_pret)}:{mobilier_maximum}:{cle_rendement}",
+                lambda: optimiser_financement(scenario, durees=sorted(durees_pret), apport_max=apport_maximum,
+                                              valeur_mobilier_max=mobilier_maximum, n_apport=81, n_mobilier=41,
+                                              indicateur_rendement=cle_rendement)
+            )
+            mesures.jalon("optimisation")
+            front = pd.DataFrame([{
+                "Régime": f"{c['type_loc']} - {c['regime_name']}",
+                "Durée (ans)": int(c["duree_annees"]),
+                "Apport (€)": c["apport"],
+                "Emprunt (€)": c["capital"],
+                "Mobilier (€)": c["valeur_mobilier"],
+                "Mensualité (€)": c["mensualite"],
+                "Cash-flow mensuel (€)": c["cash_flow_mensuel"],
+                indicateur_optimisation: c[cle_rendement],
+            } for c in optimisation["front"]])
+            st.write(f"💡 {optimisation['candidats_evalues']} combinaisons évaluées, "
+                     f"{len(front)} non dominées (aucune autre n'offre à la fois plus de cash-flow et plus de rendement).")
+            if len(front):
+                st.scatter_chart(front, x="Cash-flow mensuel (€)", y=indicateur_optimisation, color="Régime")
+                st.dataframe(front.style.format({
+                    "Apport (€)": "{:,.0f}", "Emprunt (€)": "{:,.0f}", "Mobilier (€)": "{:,.0f}",
+                    "Mensualité (€)": "{:,.2f}", "Cash-flow mensuel (€)": "{:,.2f}", indicateur_optimisation: "{:.2f}",
+                }), use_container_width=True, hide_index=True)
+
+
+# --- Recherche d'objectif ---
+@section("objectif")
+def recherche_objectif():
+    scenario, options, cle_scenario = scenario_courant()
+    with st.expander("Trouver le prix, le loyer, l'emprunt ou le taux qui atteint un objectif"):
+        regimes_objectif = {
+            "Location nue - micro-foncier": ("Nue", "Micro"),
+            "Location nue - Réel": ("Nue", "Reel"),
+            "Location meublée - micro-BIC": ("Meublée", "Micro"),
+            "Location meublée - Réel (LMNP)": ("Meublée", "Reel"),
+        }
+        indicateurs_objectif = {
+            "Cash-flow mensuel (€)": "cash_flow_mensuel",
+            "Rendement net (%)": "rendement_net",
+            "Surcoût fiscal (€)": "surcout_fiscal",
+        }
+        variables_objectif = {
+            "Prix d'achat maximal (€)": "prix_bien",
+            "Loyers annuels minimaux (€)": "loyers",
+            "Montant emprunté maximal (€)": "capital",
+            "Taux annuel maximal (%)": "taux_annuel",
+        }
+        regime_objectif = st.selectbox("Régime", list(regimes_objectif), index=3)
+        indicateur_objectif = st.selectbox("Objectif", list(indicateurs_objectif))
+        cible_objectif = st.number_input("Valeur visée", value=0.0)
+        variable_objectif = st.selectbox("Inconnue", list(variables_objectif))
+        st.caption("💡 Exemple : prix d'achat maximal pour un cash-flow mensuel nul en LMNP au réel. Quand le prix "
+                   "varie, frais de notaire, terrain et montant emprunté suivent la même proportion.")
+
+        if st.button("Résoudre", key="btn_objectif"):
+            type_loc_objectif, regime_fiscal_objectif = regimes_objectif[regime_objectif]
+            try:
+                objectif = resoudre_objectif(scenario, indicateurs_objectif[indicateur_objectif], cible_objectif,
+                                             type_loc_objectif, regime_fiscal_objectif,
+                                             variables_objectif[variable_objectif])
+                mesures.jalon("objectif")
+            except ValueError as erreur:
+                st.warning(str(erreur))
+            else:
+                unite = "%" if objectif["variable"] == "taux_annuel" else "€"
+                if objectif["solution"] is None:
+                    bas, haut = objectif["plage_indicateur"]
+                    st.warning(f"Objectif inatteignable entre {objectif['bornes'][0]:,.2f} et "
+                               f"{objectif['bornes'][1]:,.2f} {unite} : l'indicateur y varie de {bas:,.2f} à {haut:,.2f}.")
+                elif not objectif["converge"]:
+                    st.warning(f"{variable_objectif} : environ **{objectif['solution']:,.2f} {unite}**, valeur non "
+                               f"convergée (budget de calcul épuisé) : {indicateur_objectif} obtenu "
+                               f"{objectif['valeur_atteinte']:,.2f} au lieu de {cible_objectif:,.2f}.")
+                else:
+                    st.success(f"{variable_objectif} : **{objectif['solution']:,.2f} {unite}** "
+                               f"({indicateur_objectif} obtenu : {objectif['valeur_atteinte']:,.2f})")
+                    if len(objectif["solutions"]) > 1:
+                        st.caption("💡 L'objectif est atteint en plusieurs points : "
+                                   + ", ".join(f"{x:,.2f}" for x in objectif["solutions"]))
+                st.caption(f"💡 Solution obtenue en {objectif['evaluations']} évaluations du calcul.")
+
+
+# --- Revente et TRI ---
+@section("sortie")
+def revente():
+    scenario, options, cle_scenario = scenario_courant()
+    with st.expander("Plus-value, produit net et TRI selon l'année de revente"):
+        col_revalorisation, col_frais = st.columns(2)
+        revalorisation_prix = col_revalorisation.number_input("Revalorisation annuelle du bien (%)", value=1.0,
+                                                              key="sortie_revalorisation")
+        frais_vente = col_frais.number_input("Frais de vente (% du prix)", value=5.0, min_value=0.0, max_value=100.0,
+                                             key="sortie_frais")
+        st.caption("💡 Plus-value des particuliers (LMNP compris) : forfaits de 7,5 % (frais d'acquisition) et de "
+                   "15 % (travaux, après 5 ans), abattements pour durée de détention, 19 % d'impôt, 17,2 % de "
+                   "prélèvements sociaux et surtaxe. En LMNP au réel, les amortissements déduits sont réintégrés. "
+                   "Le capital restant dû et les indemnités de remboursement anticipé sont déduits du prix.")
+
+        # Toutes les années de sortie en une passe, sans bouton : toute saisie relance la page (et donc
+        # cette section avec le nouveau cle_scenario), ses propres champs ne relancent qu'elle
+        sorties = cache_resultats.obtenir(
+            cle_scenario, f"sortie:{revalorisation_prix}:{frais_vente}",
+            lambda: simuler_sorties(scenario, revalorisation_prix / 100, frais_vente / 100,
+                                    options["indexation_loyers"] / 100, options["inflation_charges"] / 100,
+                                    parametres=parametres)
+        )
+        mesures.jalon("sortie")
+        st.line_chart(pd.DataFrame({regime: indicateurs["tri"] for regime, indicateurs in sorties["regimes"].items()},
+                                   index=pd.Index(sorties["annee"], name="Année de revente")),
+                      x_label="Année de revente", y_label="TRI des fonds propres (%)")
+        st.caption(f"💡 TRI calculé sur l'apport ({sorties['apport']:,.0f} €), les cash-flows annuels après impôt "
+                   "et le produit net de la revente. Vide quand le régime cesse d'être applicable (plafond du "
+                   "micro dépassé) ou qu'aucun taux n'annule la valeur actuelle des flux : perte supérieure à l'apport "
+                   "(revente précoce), ou flux tous positifs sans apport.")
+
+        regime_sortie = st.selectbox("Détail pour le régime", list(sorties["regimes"]), index=3, key="sortie_regime")
+        detail = sorties["regimes"][regime_sortie]
+        st.dataframe(pd.DataFrame({
+            "Prix de vente (€)": sorties["prix_vente"],
+            "Amortissements réintégrés (€)": detail["amortissements_reintegres"],
+            "Plus-value brute (€)": detail["plus_value"],
+            "Impôt sur la plus-value (€)": detail["impot_plus_value"],
+            "Capital restant dû (€)": sorties["capital_restant_du"],
+            "Indemnités de remboursement (€)": sorties["indemnites_remboursement"],
+            "Produit net de la vente (€)": detail["produit_net"],
+            "Gain net cumulé (€)": detail["gain_net"],
+            "TRI (%)": detail["tri"],
+        }, index=pd.Index(sorties["annee"], name="Année de revente")).style.format("{:,.2f}", na_rep="—"),
+            use_container_width=True)
+
+
+# --- Portefeuille du foyer ---
+@section("portefeuille")
+def portefeuille_foyer():
+    scenario, options, cle_scenario = scenario_courant()
+    with st.expander("Imposer ensemble plusieurs biens locatifs du foyer"):
+        plafond_deficit = f"{parametres.plafond_deficit_foncier:,.0f}".replace(",", " ")
+        st.caption("💡 Les biens loués nus relèvent tous du même régime, les biens meublés aussi : les plafonds "
+                   "micro portent sur le total des loyers de la catégorie et le déficit foncier imputable "
+                   f"({plafond_deficit} €) s'entend pour le foyer. Le premier bien reprend le scénario saisi.")
+        colonnes_biens = ["nom", "type_loc", "loyers", "prix_bien", "frais_notaire", "valeur_mobilier",
+                          "taxe_fonciere", "provision_copro", "assurances", "capital", "taux_annuel",
+                          "duree_annees", "assurance_emprunteur"]
+        biens_defaut = pd.DataFrame([{**{c: scenario.get(c) for c in colonnes_biens},
+                                      "nom": "Bien simulé", "type_loc": "Meublée"}])
+        biens = st.data_editor(
+            biens_defaut, num_rows="dynamic", hide_index=True, use_container_width=True, key="portefeuille_biens",
+            column_config={
+                "nom": st.column_config.TextColumn("Bien"),
+                "type_loc": st.column_config.SelectboxColumn("Location", options=["Nue", "Meublée"], required=True),
+                "loyers": st.column_config.NumberColumn("Loyers annuels (€)", min_value=0.0),
+                "prix_bien": st.column_config.NumberColumn("Prix (€)", min_value=0.0),
+                "frais_notaire": st.column_config.NumberColumn("Frais de notaire (€)", min_value=0.0),
+                "valeur_mobilier": st.column_config.NumberColumn("Mobilier (€)", min_value=0.0),
+                "taxe_fonciere": st.column_config.NumberColumn("Taxe foncière (€)", min_value=0.0),
+                "provision_copro": st.column_config.NumberColumn("Copropriété (€)", min_value=0.0),
+                "assurances": st.column_config.NumberColumn("Assurances (€)", min_value=0.0),
+                "capital": st.column_config.NumberColumn("Emprunt (€)", min_value=0.0),
+                "taux_annuel": st.column_config.NumberColumn("Taux (%)", min_value=0.0),
+                "duree_annees": st.column_config.NumberColumn("Durée (ans)", min_value=1),
+                "assurance_emprunteur": st.column_config.NumberColumn("Assurance emprunteur (€)", min_value=0.0),
+            },
+        )
+
+        if st.button("Calculer le portefeuille", key="btn_portefeuille"):
+            lignes = [{c: v for c, v in ligne.items() if not pd.isna(v)} for ligne in biens.to_dict("records")]
+            try:
+                portefeuille = simuler_portefeuille(scenario["RFR"], scenario["parts"], lignes, parametres)
+                mesures.jalon("portefeuille")
+            except ValueError as erreur:
+                st.warning(str(erreur))
+            else:
+                st.dataframe(pd.DataFrame([{
+                    "Régimes": libelle,
+                    "Surcoût fiscal du foyer (€)": c["surcout_fiscal"] if c["applicable"] else np.nan,
+                    "Cash-flow mensuel (€)": c["cash_flow_mensuel"] if c["applicable"] else np.nan,
+                    "Rendement net (%)": c["rendement_net"] if c["applicable"] else np.nan,
+                } for libelle, c in portefeuille["combinaisons"].items()]).style.format({
+                    "Surcoût fiscal du foyer (€)": "{:,.2f}", "Cash-flow mensuel (€)": "{:,.2f}",
+                    "Rendement net (%)": "{:.2f}",
+                }, na_rep="non applicable"), hide_index=True, use_container_width=True)
+
+                meilleure = portefeuille["combinaisons"][portefeuille["meilleure"]]
+                st.write(f"💡 Meilleur cash-flow : **{portefeuille['meilleure']}**. Part de chaque bien "
+                         "(surcoût du foyer moins surcoût du foyer sans ce bien) :")
+                st.dataframe(pd.DataFrame({
+                    "Bien": portefeuille["biens"],
+                    "Location": portefeuille["types"],
+                    "Surcoût fiscal marginal (€)": meilleure["surcout_marginal"],
+                    "Cash-flow marginal (€/an)": meilleure["cash_flow_marginal"],
+                }).style.format({"Surcoût fiscal marginal (€)": "{:,.2f}", "Cash-flow marginal (€/an)": "{:,.2f}"}),
+                    hide_index=True, use_container_width=True)
+                st.caption(f"💡 Barème progressif : les parts diffèrent de {meilleure['ecart_attribution']:,.2f} € "
+                           "du surcoût total du foyer.")
+
+
+# --- Exécution de la page ---
+# Les mesures sont closes même si l'exécution est interrompue (st.rerun, erreur) : le profileur
+# ne reste jamais actif au-delà de l'exécution qui l'a démarré
+mesures = MesuresExecution()
+try:
+    saisies()
+    cartes_resultats()
+    graphiques()
+    export_pdf()
+    st.markdown("## 📁 Scénarios enregistrés")
+    scenarios_enregistres()
+    st.markdown("## 🔬 Analyse de sensibilité")
+    analyse_sensibilite()
+    st.markdown("## 🎲 Simulation de risques (Monte Carlo)")
+    simulation_risques()
+    st.markdown("## 🧭 Optimisation du régime et du financement")
+    optimisation_financement()
+    st.markdown("## 🎯 Recherche d'objectif")
+    recherche_objectif()
+    st.markdown("## 🚪 Revente et TRI")
+    revente()
+    st.markdown("## 🏘️ Portefeuille du foyer")
+    portefeuille_foyer()
+finally:
+    execution = mesures.terminer()
+
+# --- Mesures de l'exécution ---
+if mode_debug:
+    with st.expander("🛠️ Diagnostic de performance", expanded=True):
+        st.caption(f"Exécution {execution['execution']} : {execution['duree_ms']:.0f} ms au total")
+        st.dataframe(pd.DataFrame(execution["etapes"]).set_index("etape"), use_container_width=True)
+        if mesures.memoire:
+            st.caption("delta_processus_ko : écart net de mémoire de tout le processus pendant l'étape, "
+                       "autres sessions comprises (peut être négatif)")
+        st.write(f"Cache des résultats : {len(cache_resultats)} scénarios, "
+                 f"{cache_resultats.succes} succès, {cache_resultats.echecs} échecs")
+        st.write(f"Nœuds recalculés ({len(calcul.recalcules)}) : {', '.join(calcul.recalcules) or 'aucun'}")
+        st.write(f"Mémoire de la session : {calcul.memoire() / 1024:,.0f} Ko (hors images, tenues par le cache "
+                 f"partagé), {calcul.oublies} valeur(s) oubliée(s)")
+        from rapports.graphiques import cache_graphiques
+        st.write(f"Cache des graphiques : {len(cache_graphiques)} jeux d'images, "
+                 f"{cache_graphiques.volume / 2**20:,.1f} Mo sur {cache_graphiques.octets / 2**20:,.0f} Mo")
+        if "profil" in execution:
+            st.caption(f"Profil enregistré : {execution['profil']}")
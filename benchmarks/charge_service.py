@@ -0,0 +1,232 @@
+"""Test de charge du service HTTP : débit et latence d'un point d'entrée sous concurrence.
+
+Usage : python benchmarks/charge_service.py [--url http://127.0.0.1:8502] [--demarrer]
+                                            [--point simulation] [--connexions 32] [--duree 10]
+                                            [--taille-lot 1000] [--phase les-deux] [--min-debit 300]
+
+Chaque connexion (HTTP/1.1 persistante, un fil par connexion) envoie ses requêtes en boucle
+pendant la durée demandée, sur le jeu de scénarios fixe de benchmarks/performances.py.
+/simulation et /rapport passent par le cache de résultats du service, mesuré en deux phases :
+- à froid : chaque corps est unique (assurances décalées d'un millionième d'euro par requête),
+  aucune requête ne trouve son scénario en cache : c'est le débit du calcul, celui qui dimensionne ;
+- à chaud : les premiers scénarios du jeu fixe (autant que le cache du service en contient),
+  envoyés une première fois avant la mesure, sont servis depuis le cache.
+Le taux de succès du cache pendant chaque phase est relevé sur /sante.
+Les lots de /simulations ne passent pas par le cache : une seule phase.
+
+Pour chaque phase, le script affiche le débit (requêtes et scénarios par seconde), la latence vue
+du client (p50, p90, p99, max), les codes de réponse et les durées médianes lues dans l'en-tête
+Server-Timing. Avec --demarrer, un service local est lancé pour la durée du test. Le script échoue
+(code de sortie 1) si une requête échoue autrement que par un refus 503, ou si le débit d'une phase
+est inférieur à --min-debit.
+"""
+
+import argparse
+import http.client
+import itertools
+import json
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import numpy as np
+
+RACINE = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RACINE))
+
+from benchmarks.performances import scenarios_references  # noqa: E402
+
+
+def corps_requetes(point, scenarios, taille_lot):
+    # Corps JSON préparés à l'avance : le client ne mesure que l'aller-retour
+    if point == "simulations":
+        lots = [scenarios[i:i + taille_lot] for i in range(0, len(scenarios) - taille_lot + 1, taille_lot)]
+        return [json.dumps({"scenarios": lot}).encode() for lot in lots or [scenarios]], taille_lot
+    return [json.dumps(s).encode() for s in scenarios], 1
+
+
+def corps_uniques(scenarios):
+    # Corps tous différents, partagés par les connexions (next sur un compteur est atomique) : le
+    # début de chaque corps est préparé à l'avance, seul le montant des assurances est ajouté à l'envoi
+    compteur = itertools.count(1)
+    debuts = [json.dumps({cle: v for cle, v in s.items() if cle != "assurances"})[:-1].encode() for s in scenarios]
+    assurances = [s["assurances"] for s in scenarios]
+
+    def corps():
+        n = next(compteur)
+        k = n % len(scenarios)
+        return debuts[k] + b', "assurances": %r}' % (assurances[k] + n * 1e-6)
+    return corps
+
+
+def corps_cycliques(corps):
+    compteur = itertools.count()
+    return lambda: corps[next(compteur) % len(corps)]
+
+
+def client(hote, port, point, corps, fin, mesures):
+    # corps() renvoie le corps de la requête suivante ; fin : instant d'arrêt, ou None pour un seul
+    # passage sur les corps (préchauffage du cache, corps() renvoie alors None une fois épuisé)
+    connexion = http.client.HTTPConnection(hote, port, timeout=300)
+    while fin is None or time.perf_counter() < fin:
+        contenu = corps()
+        if contenu is None:
+            break
+        debut = time.perf_counter()
+        try:
+            connexion.request("POST", f"/{point}", contenu, {"Content-Type": "application/json"})
+            reponse = connexion.getresponse()
+            reponse.read()
+        except (OSError, http.client.HTTPException) as erreur:
+            mesures.append((type(erreur).__name__, time.perf_counter() - debut, None))
+            connexion.close()
+            connexion = http.client.HTTPConnection(hote, port, timeout=300)
+            continue
+        mesures.append((reponse.status, time.perf_counter() - debut, reponse.getheader("Server-Timing")))
+    connexion.close()
+
+
+def prechauffer(hote, port, point, corps, connexions):
+    # Un passage sur chaque corps, réparti sur les connexions : tous les scénarios entrent en cache
+    restants = iter(corps)
+    suivant = lambda: next(restants, None)  # noqa: E731
+    fils = [threading.Thread(target=client, args=(hote, port, point, suivant, None, []))
+            for _ in range(connexions)]
+    for f in fils:
+        f.start()
+    for f in fils:
+        f.join()
+
+
+def mesurer_phase(hote, port, point, corps, connexions, duree):
+    mesures = []  # list.append est atomique : une liste partagée par tous les fils
+    fin = time.perf_counter() + duree
+    fils = [threading.Thread(target=client, args=(hote, port, point, corps, fin, mesures))
+            for _ in range(connexions)]
+    debut = time.perf_counter()
+    for f in fils:
+        f.start()
+    for f in fils:
+        f.join()
+    return mesures, time.perf_counter() - debut
+
+
+def rapport_phase(titre, point, connexions, mesures, duree, scenarios_par_requete, cache):
+    statuts = Counter(statut for statut, _, _ in mesures)
+    reussies = [latence for statut, latence, _ in mesures if statut == 200]
+    debit = len(reussies) / duree
+    print(f"POST /{point} {titre}, {connexions} connexions, {duree:.1f} s : {len(mesures)} requêtes")
+    print(f"Débit : {debit:,.0f} requêtes/s ({debit * scenarios_par_requete:,.0f} scénarios/s)")
+    if reussies:
+        p50, p90, p99 = np.percentile(np.array(reussies) * 1000, [50, 90, 99])
+        print(f"Latence : p50 {p50:.1f} ms, p90 {p90:.1f} ms, p99 {p99:.1f} ms, max {max(reussies) * 1000:.1f} ms")
+    serveur = defaultdict(list)
+    for statut, _, entete in mesures:
+        if statut == 200:
+            for etape, duree_etape in lire_server_timing(entete).items():
+                serveur[etape].append(duree_etape)
+    if serveur:
+        print("Serveur (médianes) : " + ", ".join(f"{etape} {statistics.median(durees):.2f} ms"
+                                                   for etape, durees in serveur.items()))
+    print("Réponses : " + ", ".join(f"{statut} x {n}" for statut, n in sorted(statuts.items(), key=str)))
+    if cache is not None and sum(cache):
+        print(f"Cache de résultats : {cache[0] / sum(cache):.0%} de succès ({cache[0]} succès, {cache[1]} échecs)")
+    return debit, sum(n for statut, n in statuts.items() if statut not in (200, 503))
+
+
+def lire_server_timing(entete):
+    durees = {}
+    for element in (entete or "").split(","):
+        nom, _, duree = element.strip().partition(";dur=")
+        if duree:
+            durees[nom] = float(duree)
+    return durees
+
+
+def lire_sante(hote, port):
+    connexion = http.client.HTTPConnection(hote, port, timeout=10)
+    connexion.request("GET", "/sante")
+    sante = json.loads(connexion.getresponse().read())
+    connexion.close()
+    return sante
+
+
+def attendre_service(hote, port, delai=30):
+    limite = time.monotonic() + delai
+    while time.monotonic() < limite:
+        try:
+            connexion = http.client.HTTPConnection(hote, port, timeout=1)
+            connexion.request("GET", "/sante")
+            if connexion.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Le service ne répond pas sur {hote}:{port}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8502")
+    parser.add_argument("--demarrer", action="store_true", help="lancer un service local le temps du test")
+    parser.add_argument("--point", default="simulation", choices=["simulation", "simulations", "rapport"])
+    parser.add_argument("--connexions", type=int, default=32, help="clients simultanés")
+    parser.add_argument("--duree", type=float, default=10.0, help="durée du test en secondes")
+    parser.add_argument("--scenarios", type=int, default=1000, help="taille du jeu de scénarios fixe")
+    parser.add_argument("--taille-lot", type=int, default=1000, help="scénarios par requête de /simulations")
+    parser.add_argument("--phase", default="les-deux", choices=["froid", "chaud", "les-deux"],
+                        help="cache de résultats évité (froid), rempli avant la mesure (chaud) ou les deux")
+    parser.add_argument("--min-debit", type=float, default=0.0, help="débit minimal attendu (requêtes/s)")
+    args = parser.parse_args(argv)
+
+    adresse = urlsplit(args.url)
+    hote, port = adresse.hostname, adresse.port or 80
+    service = None
+    if args.demarrer:
+        service = subprocess.Popen([sys.executable, "-m", "service.serveur", "--hote", hote, "--port", str(port)],
+                                   cwd=RACINE)
+    scenarios = scenarios_references(args.scenarios)
+    corps, scenarios_par_requete = corps_requetes(args.point, scenarios, args.taille_lot)
+    if args.point == "simulations":
+        phases = [("sans cache", corps_cycliques(corps))]
+    else:
+        phases = [("à froid (corps uniques)", corps_uniques(scenarios))] if args.phase != "chaud" else []
+        if args.phase != "froid":
+            phases.append(("à chaud (cache rempli)", corps_cycliques(corps)))
+    resultats = []
+    try:
+        attendre_service(hote, port)
+        for titre, generateur in phases:
+            if titre.startswith("à chaud"):
+                # Jeu réduit à la capacité du cache : un cycle plus long n'y trouverait jamais ses scénarios
+                chauds = corps[:lire_sante(hote, port)["cache"].get("taille", 256)]
+                generateur = corps_cycliques(chauds)
+                prechauffer(hote, port, args.point, chauds, args.connexions)
+            avant = lire_sante(hote, port)["cache"]
+            mesures, duree = mesurer_phase(hote, port, args.point, generateur, args.connexions, args.duree)
+            apres = lire_sante(hote, port)["cache"]
+            resultats.append((titre, mesures, duree,
+                              (apres["succes"] - avant["succes"], apres["echecs"] - avant["echecs"])))
+    finally:
+        if service is not None:
+            service.terminate()
+            service.wait()
+
+    code = 0
+    for titre, mesures, duree, cache in resultats:
+        debit, echecs = rapport_phase(titre, args.point, args.connexions, mesures, duree, scenarios_par_requete,
+                                      None if args.point == "simulations" else cache)
+        if echecs or debit < args.min_debit:
+            print(f"ÉCHEC ({titre}) : {echecs} requêtes en erreur, débit minimal {args.min_debit:,.0f} requêtes/s",
+                  file=sys.stderr)
+            code = 1
+        print()
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""Mesure du temps de démarrage : import du moteur de calcul et premier affichage de la page.
+
+Usage : python benchmarks/demarrage.py [--repetitions 5] [--max-import 0.3] [--max-page 3.0]
+
+Chaque mesure est faite dans un processus neuf (démarrage à froid). Le script échoue
+(code de sortie 1) si une médiane dépasse son seuil, ou si la première page charge
+matplotlib ou reportlab, qui ne doivent l'être qu'à la demande.
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+RACINE = Path(__file__).resolve().parent.parent
+
+MESURE_IMPORT = """
+import json, time
+debut = time.perf_counter()
+import moteur_fiscal
+print(json.dumps({"duree": time.perf_counter() - debut}))
+"""
+
+MESURE_PAGE = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+debut = time.perf_counter()
+at = AppTest.from_file("Simulateur.py", default_timeout=60).run()
+duree = time.perf_counter() - debut
+print(json.dumps({
+    "duree": duree,
+    "erreurs": [str(e.value) for e in at.exception],
+    "modules_lourds": [m for m in ("matplotlib", "reportlab") if m in sys.modules],
+}))
+"""
+
+
+def mesurer(code, repetitions):
+    mesures = []
+    for _ in range(repetitions):
+        sortie = subprocess.run([sys.executable, "-c", code], cwd=RACINE, capture_output=True,
+                                text=True, check=True)
+        mesures.append(json.loads(sortie.stdout.strip().splitlines()[-1]))
+    return mesures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repetitions", type=int, default=5)
+    parser.add_argument("--max-import", type=float, default=0.3, help="seuil en secondes pour l'import du moteur")
+    parser.add_argument("--max-page", type=float, default=3.0, help="seuil en secondes pour le premier affichage")
+    args = parser.parse_args(argv)
+
+    echecs = []
+    imports = mesurer(MESURE_IMPORT, args.repetitions)
+    duree_import = statistics.median(m["duree"] for m in imports)
+    print(f"Import de moteur_fiscal : {duree_import * 1000:.1f} ms (médiane sur {args.repetitions})")
+    if duree_import > args.max_import:
+        echecs.append(f"import de moteur_fiscal au-delà de {args.max_import} s")
+
+    pages = mesurer(MESURE_PAGE, args.repetitions)
+    duree_page = statistics.median(m["duree"] for m in pages)
+    print(f"Premier affichage de la page : {duree_page * 1000:.0f} ms (médiane sur {args.repetitions})")
+    if duree_page > args.max_page:
+        echecs.append(f"premier affichage au-delà de {args.max_page} s")
+    for m in pages:
+        echecs.extend(f"erreur à l'affichage : {e}" for e in m["erreurs"])
+    modules_lourds = sorted({module for m in pages for module in m["modules_lourds"]})
+    if modules_lourds:
+        echecs.append(f"modules chargés dès le premier affichage : {', '.join(modules_lourds)}")
+
+    for echec in echecs:
+        print(f"ÉCHEC : {echec}", file=sys.stderr)
+    return 1 if echecs else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,307 @@
+"""Banc de performances des chemins critiques : impôt, prêt, revenu foncier, quatre régimes, graphiques et PDF.
+
+Usage : python benchmarks/performances.py [--rapide] [--cas impot] [--sans-rendu]
+                                          [--reference benchmarks/reference.json] [--enregistrer] [--tolerance 1.5]
+
+Les scénarios sont tirés avec une graine fixe (même jeu à chaque exécution). Pour chaque cas :
+débit (éléments par seconde), latence par appel (p50, p90, p99) et pic mémoire (tracemalloc, passe
+séparée pour ne pas fausser les temps). Les résultats sont comparés à la référence enregistrée ;
+le script échoue (code de sortie 1) si une médiane se dégrade au-delà de la tolérance, si un
+cas mesuré n'a pas de référence (hors --enregistrer, qui l'ajoute), si
+l'impôt calculé par le code actuel (scalaire ou vectorisé) diffère, même d'un bit, de la boucle
+d'origine sur le barème, ou si le graphe de calcul incrémental de la page ne donne pas exactement
+les résultats de simuler_scenario.
+"""
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+
+RACINE = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RACINE))
+
+from moteur_fiscal import (  # noqa: E402
+    GRAPHE_SIMULATION,
+    REGIMES,
+    CalculIncremental,
+    TableauRegimes,
+    bareme,
+    calcul_interets_annuels,
+    calcul_revenu_foncier,
+    calcul_revenu_foncier_batch,
+    echeance_batch,
+    entrees_regimes,
+    impot_progressif,
+    impot_progressif_batch,
+    normaliser_scenario,
+    simuler_regimes,
+    simuler_regimes_batch,
+    simuler_scenario,
+    tableau_amortissement,
+)
+from moteur_fiscal.batch import evaluer_lot  # noqa: E402
+from moteur_fiscal.parametres import PARAMETRES_DEFAUT  # noqa: E402
+
+REFERENCE = Path(__file__).resolve().parent / "reference.json"
+
+
+# --- Jeu de scénarios fixe ---
+def scenarios_references(n=1000, graine=2024):
+    rng = np.random.default_rng(graine)
+    prix = rng.choice(np.arange(80000, 800001, 5000), n)
+    maison = rng.random(n) < 0.3
+    scenarios = []
+    for i in range(n):
+        scenarios.append({
+            "RFR": float(rng.choice(np.arange(15000, 200001, 500))),
+            "parts": float(rng.choice([1, 1.5, 2, 2.5, 3, 4])),
+            "loyers": float(round(prix[i] * rng.uniform(0.035, 0.08), -1)),
+            "type_bien": "Maison individuelle" if maison[i] else "Appartement",
+            "prix_bien": float(prix[i]),
+            "type_achat": "Neuf" if rng.random() < 0.2 else "Ancien",
+            "valeur_mobilier": float(rng.choice(np.arange(0, 30001, 1000))),
+            "taxe_fonciere": float(round(prix[i] * rng.uniform(0.004, 0.012), -1)),
+            "provision_copro": 0.0 if maison[i] else float(rng.choice(np.arange(300, 4001, 100))),
+            "assurances": float(rng.choice(np.arange(150, 1001, 50))),
+            "capital": float(round(prix[i] * rng.uniform(0.5, 1.1), -3)),
+            "taux_annuel": float(round(rng.uniform(1.0, 5.0), 2)),
+            "duree_annees": float(rng.choice([10, 15, 20, 25])),
+            "assurance_emprunteur": float(rng.choice(np.arange(200, 1501, 50))),
+        })
+    return [normaliser_scenario(s) for s in scenarios]
+
+
+def colonnes(scenarios, *cles):
+    return [np.array([s[c] for s in scenarios]) for c in cles]
+
+
+# --- Implémentations d'origine (boucles scalaires), pour la vérification d'identité ---
+def impot_reference(revenu_imposable, parts=1):
+    revenu_par_part = revenu_imposable / parts
+    impots = 0
+    details = []
+    for bas, haut, taux in bareme:
+        if revenu_par_part > bas:
+            tranche_imposable = min(revenu_par_part, haut) - bas
+            impot_tranche = tranche_imposable * taux
+            impots += impot_tranche
+            details.append((bas, haut, taux, tranche_imposable, impot_tranche))
+        else:
+            break
+    return impots * parts, details
+
+
+def interets_reference(capital, taux_annuel, duree_annees):
+    n_mois = duree_annees * 12
+    taux_mensuel = taux_annuel / 100 / 12
+    mensualite = capital * (taux_mensuel / (1 - (1 + taux_mensuel) ** -n_mois))
+    interets_annuels = 0
+    capital_restant = capital
+    for _ in range(12):
+        interet_mois = capital_restant * taux_mensuel
+        interets_annuels += interet_mois
+        capital_restant -= mensualite - interet_mois
+    return interets_annuels, mensualite
+
+
+def verifier_identite(scenarios):
+    echecs = []
+    # Revenus du jeu de scénarios, plus chaque borne du barème (par part) et ses voisins immédiats
+    bornes = np.array([b for tranche in bareme for b in tranche[:2] if b != float("inf")])
+    parts_foyers = np.unique([s["parts"] for s in scenarios])
+    bornes_foyers = (bornes[:, np.newaxis, np.newaxis] * parts_foyers[np.newaxis, :, np.newaxis]
+                     + np.array([-0.01, 0.0, 0.01]))
+    revenus = np.concatenate([[s["RFR"] for s in scenarios], bornes_foyers.ravel()])
+    parts_revenus = np.concatenate([[s["parts"] for s in scenarios],
+                                    np.broadcast_to(parts_foyers[np.newaxis, :, np.newaxis], bornes_foyers.shape).ravel()])
+    attendus = [impot_reference(r, p) for r, p in zip(revenus.tolist(), parts_revenus.tolist())]
+    scalaires = [impot_progressif(r, p) for r, p in zip(revenus.tolist(), parts_revenus.tolist())]
+    if any(a != s for a, s in zip(attendus, scalaires)):
+        echecs.append("impot_progressif diffère de la boucle d'origine")
+    if not np.array_equal(impot_progressif_batch(revenus, parts_revenus), [a for a, _ in attendus]):
+        echecs.append("impot_progressif_batch diffère de la boucle d'origine")
+
+    # Impôt de chaque régime : simulation scalaire et vectorisée contre la boucle d'origine
+    ecart_pret = 0.0
+    for scenario in scenarios:
+        entrees = entrees_regimes(scenario)
+        RFR, parts_foyer, loyers, charges, interets, assurance = entrees[:6]
+        impots_base = impot_reference(RFR, parts_foyer)[0]
+        lot = simuler_regimes_batch(*entrees)
+        for r in simuler_regimes(*entrees):
+            if not r.applicable:
+                continue
+            attendu = impot_reference(RFR - r.res.deficit_global + r.res.revenu_imposable, parts_foyer)[0]
+            if r.total_impot != attendu:
+                echecs.append(f"impôt du régime {r.type_loc} {r.regime} différent (RFR {RFR})")
+            if (lot[r.libelle]["surcout_fiscal"] != r.surcout_fiscal
+                    or r.surcout_fiscal != attendu + r.prelev_sociaux - impots_base):
+                echecs.append(f"surcoût fiscal vectorisé du régime {r.type_loc} {r.regime} différent (RFR {RFR})")
+        attendu_pret = interets_reference(scenario["capital"], scenario["taux_annuel"], scenario["duree_annees"])
+        ecart_pret = max(ecart_pret, *(abs(a - b) / max(abs(b), 1.0) for a, b in zip(
+            calcul_interets_annuels(scenario["capital"], scenario["taux_annuel"], scenario["duree_annees"]),
+            attendu_pret)))
+    if ecart_pret > 1e-9:
+        echecs.append(f"calcul_interets_annuels s'écarte de la boucle d'origine ({ecart_pret:.2e} relatif)")
+    return echecs, ecart_pret
+
+
+def meme_resultat(a, b):
+    # Égalité exacte champ par champ, NaN compris (régimes inapplicables)
+    if isinstance(a, (tuple, list)) and isinstance(b, (tuple, list)):
+        return len(a) == len(b) and all(meme_resultat(x, y) for x, y in zip(a, b))
+    if isinstance(a, float) and isinstance(b, float) and a != a and b != b:
+        return True
+    return a == b
+
+
+def verifier_graphe(scenarios, n=300):
+    # Un seul calcul incrémental parcourt les scénarios, chacun suivi d'une variation d'une seule
+    # saisie : les nœuds réutilisés comme les nœuds recalculés doivent reproduire simuler_scenario
+    echecs = []
+    calcul = CalculIncremental(GRAPHE_SIMULATION)
+    calcul.definir(parametres=PARAMETRES_DEFAUT)
+    for i, scenario in enumerate(scenarios[:n]):
+        champ = ("assurances", "loyers", "taux_annuel", "RFR")[i % 4]
+        for variante in (scenario, {**scenario, champ: scenario[champ] * 1.1}):
+            calcul.definir(**{cle: variante[cle] for cle in GRAPHE_SIMULATION.entrees if cle in variante})
+            if not meme_resultat(list(calcul.evaluer("regimes")), simuler_scenario(variante)):
+                echecs.append(f"graphe de calcul différent de simuler_scenario (scénario {i}"
+                              f"{'' if variante is scenario else f', {champ} modifié'})")
+    return echecs, min(n, len(scenarios))
+
+
+# --- Cas mesurés ---
+def cas_de_mesure(scenarios, rendu=True):
+    revenus, parts, capital, taux, duree, loyers, prix, frais = colonnes(
+        scenarios, "RFR", "parts", "capital", "taux_annuel", "duree_annees", "loyers", "prix_bien", "frais_notaire")
+    entrees = [entrees_regimes(s) for s in scenarios]
+    entrees_lot = [np.array(c) for c in zip(*entrees)]
+    charges, interets, assurance = entrees_lot[3], entrees_lot[4], entrees_lot[5]
+
+    # nom -> (appels, éléments par appel, tours, action avant chaque tour)
+    cas = {
+        "impot_progressif": ([partial(impot_progressif, r, p) for r, p in zip(revenus.tolist(), parts.tolist())],
+                             1, 20, None),
+        "impot_progressif_batch": ([partial(impot_progressif_batch, revenus, parts)], len(scenarios), 500, None),
+        # Le cache LRU du tableau d'amortissement est vidé avant chaque tour : mesure à froid
+        "calcul_interets_annuels": ([partial(calcul_interets_annuels, c, t, d)
+                                     for c, t, d in zip(capital.tolist(), taux.tolist(), duree.tolist())],
+                                    1, 5, tableau_amortissement.cache_clear),
+        "echeance_batch": ([partial(echeance_batch, capital, taux, duree)], len(scenarios), 200, None),
+        "calcul_revenu_foncier": ([partial(calcul_revenu_foncier, e[2], e[3], e[4], e[5], type_loc, regime,
+                                           e[9] if (type_loc, regime) == ("Meublée", "Reel") else 0)
+                                   for e in entrees for type_loc, regime in REGIMES], 1, 10, None),
+        "calcul_revenu_foncier_batch": ([partial(calcul_revenu_foncier_batch, loyers, charges, interets, assurance,
+                                                 type_loc, regime, entrees_lot[9])
+                                         for type_loc, regime in REGIMES], len(scenarios), 200, None),
+        "simuler_scenario": ([partial(simuler_scenario, s) for s in scenarios], 1, 5,
+                             tableau_amortissement.cache_clear),
+        "simuler_regimes_batch": ([partial(simuler_regimes_batch, *entrees_lot)], len(scenarios), 200, None),
+        "evaluer_lot": ([partial(evaluer_lot, scenarios)], len(scenarios), 20, tableau_amortissement.cache_clear),
+    }
+    if rendu:
+        from rapports.graphiques import _figure_rendement, _figure_surcout, cache_graphiques, rendre_figure
+        from rapports.pdf import generate_pdf
+
+        exemples = scenarios[:5]
+        tableaux = [TableauRegimes.depuis_resultats(simuler_scenario(s)) for s in exemples]
+        cas["graphiques"] = ([partial(lambda t: (rendre_figure(_figure_surcout(t)), rendre_figure(_figure_rendement(t))),
+                                      t) for t in tableaux], 2, 2, None)
+
+        def pdf(scenario, tableau):
+            cache_graphiques.vider()  # graphiques rendus à chaque appel : coût complet du rapport
+            return generate_pdf(tableau, scenario["RFR"], scenario["parts"], scenario["loyers"],
+                                scenario["type_bien"], scenario["prix_bien"], scenario["valeur_terrain"])
+
+        cas["generate_pdf"] = ([partial(pdf, s, t) for s, t in zip(exemples, tableaux)], 1, 2, None)
+    return cas
+
+
+def mesurer(appels, elements, tours, avant_tour):
+    appels[0]()  # échauffement (imports paresseux, caches de code)
+    latences = []
+    for _ in range(tours):
+        if avant_tour:
+            avant_tour()
+        for appel in appels:
+            debut = time.perf_counter_ns()
+            appel()
+            latences.append(time.perf_counter_ns() - debut)
+    latences = np.array(latences) / 1e9
+
+    if avant_tour:
+        avant_tour()
+    # Quelques appels suffisent pour le pic (un seul pour les rendus) : tracemalloc ralentit fortement les appels
+    tracemalloc.start()
+    for appel in appels[:1 if np.median(latences) > 0.01 else 20]:
+        appel()
+    _, pic = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    p50, p90, p99 = np.percentile(latences, [50, 90, 99])
+    return {"appels": len(latences), "debit": elements * len(latences) / latences.sum(),
+            "p50": p50, "p90": p90, "p99": p99, "memoire_pic": pic}
+
+
+def duree_lisible(secondes):
+    if secondes < 1e-3:
+        return f"{secondes * 1e6:.1f} µs"
+    return f"{secondes * 1e3:.1f} ms" if secondes < 1 else f"{secondes:.2f} s"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", type=int, default=1000, help="taille du jeu de scénarios fixe")
+    parser.add_argument("--rapide", action="store_true", help="moins de tours (mesures plus bruitées)")
+    parser.add_argument("--cas", action="append", help="ne mesurer que les cas dont le nom contient ce texte")
+    parser.add_argument("--sans-rendu", action="store_true", help="ignorer les graphiques et le PDF")
+    parser.add_argument("--reference", type=Path, default=REFERENCE)
+    parser.add_argument("--enregistrer", action="store_true", help="remplacer la référence par cette exécution")
+    parser.add_argument("--tolerance", type=float, default=1.5,
+                        help="échec si une médiane dépasse la référence de ce facteur")
+    args = parser.parse_args(argv)
+
+    scenarios = scenarios_references(args.scenarios)
+    echecs, ecart_pret = verifier_identite(scenarios)
+    print(f"Identité de l'impôt avec la boucle d'origine : {'ÉCHEC' if echecs else 'OK'} "
+          f"(écart relatif max des intérêts : {ecart_pret:.1e})")
+    echecs_graphe, n_graphe = verifier_graphe(scenarios)
+    print(f"Identité du graphe de calcul avec simuler_scenario : {'ÉCHEC' if echecs_graphe else 'OK'} "
+          f"({n_graphe} scénarios, chacun avec une saisie modifiée)")
+    echecs += echecs_graphe
+
+    reference = json.loads(args.reference.read_text()) if args.reference.exists() else {}
+    resultats = {}
+    print(f"{'Cas':<30}{'Appels':>8}{'Débit (/s)':>14}{'p50':>11}{'p90':>11}{'p99':>11}{'Mémoire':>11}{'vs réf.':>9}")
+    for nom, (appels, elements, tours, avant_tour) in cas_de_mesure(scenarios, not args.sans_rendu).items():
+        if args.cas and not any(c in nom for c in args.cas):
+            continue
+        mesure = mesurer(appels, elements, max(1, tours // 5) if args.rapide else tours, avant_tour)
+        resultats[nom] = mesure
+        ratio = mesure["p50"] / reference[nom]["p50"] if nom in reference else None
+        print(f"{nom:<30}{mesure['appels']:>8}{mesure['debit']:>14,.0f}{duree_lisible(mesure['p50']):>11}"
+              f"{duree_lisible(mesure['p90']):>11}{duree_lisible(mesure['p99']):>11}"
+              f"{mesure['memoire_pic'] / 1024:>8,.0f} Ko{'   absente' if ratio is None else f'{ratio:>8.2f}x'}")
+        if ratio is None and not args.enregistrer:
+            # Un cas sans référence n'est jamais comparé : sa régression passerait inaperçue
+            echecs.append(f"{nom} : aucune référence (à enregistrer avec --enregistrer --cas {nom})")
+        elif ratio is not None and ratio > args.tolerance:
+            echecs.append(f"{nom} : médiane {ratio:.2f}x plus lente que la référence")
+
+    if args.enregistrer:
+        args.reference.write_text(json.dumps({**reference, **resultats}, indent=2, sort_keys=True) + "\n")
+        print(f"Référence enregistrée dans {args.reference}")
+    for echec in echecs:
+        print(f"ÉCHEC : {echec}", file=sys.stderr)
+    return 1 if echecs else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
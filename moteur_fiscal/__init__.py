@@ -0,0 +1,81 @@
+"""Cœur de calcul du simulateur fiscal immobilier, sans dépendance d'interface ni de graphique."""
+
+from .bareme import bareme, impot_progressif, impot_progressif_batch, tranche_marginale
+from .graphe import GRAPHE_SIMULATION, CalculIncremental, GrapheCalcul, Noeud
+from .monte_carlo import HypothesesRisque, simuler_monte_carlo
+from .objectif import resoudre_objectif
+from .optimisation import front_pareto, optimiser_financement
+from .parametres import ANNEE_FISCALE, PARAMETRES_FISCAUX, ParametresFiscaux, parametres_fiscaux
+from .portefeuille import simuler_portefeuille
+from .pret import EcheancierPret, calcul_interets_annuels, tableau_amortissement
+from .projection import EtatReports, avancer_annee, projection_pluriannuelle
+from .regimes import (
+    PLAFONDS_MICRO,
+    REGIMES,
+    TAUX_PRELEVEMENTS_SOCIAUX,
+    calcul_amortissements,
+    fiscalite_regime,
+    nom_regime,
+    regime_applicable,
+    resultat_regime,
+    revenu_regime,
+    simuler_regimes,
+)
+from .resultats import COLONNES_TABLEAU, ResultatRegime, RevenuFoncier, TableauRegimes
+from .revenus import calcul_revenu_foncier
+from .scenario import SCENARIO_DEFAUT, entrees_regimes, normaliser_scenario, simuler_scenario
+from .sensibilite import grille_sensibilite
+from .sortie import simuler_sorties, tri_par_sortie
+from .vectoriel import calcul_revenu_foncier_batch, echeance_batch, simuler_regimes_batch
+
+__all__ = [
+    "bareme",
+    "impot_progressif",
+    "impot_progressif_batch",
+    "tranche_marginale",
+    "GRAPHE_SIMULATION",
+    "CalculIncremental",
+    "GrapheCalcul",
+    "Noeud",
+    "ANNEE_FISCALE",
+    "PARAMETRES_FISCAUX",
+    "ParametresFiscaux",
+    "parametres_fiscaux",
+    "simuler_portefeuille",
+    "EcheancierPret",
+    "calcul_interets_annuels",
+    "tableau_amortissement",
+    "EtatReports",
+    "avancer_annee",
+    "projection_pluriannuelle",
+    "PLAFONDS_MICRO",
+    "REGIMES",
+    "TAUX_PRELEVEMENTS_SOCIAUX",
+    "calcul_amortissements",
+    "nom_regime",
+    "regime_applicable",
+    "revenu_regime",
+    "fiscalite_regime",
+    "resultat_regime",
+    "simuler_regimes",
+    "calcul_revenu_foncier",
+    "RevenuFoncier",
+    "ResultatRegime",
+    "TableauRegimes",
+    "COLONNES_TABLEAU",
+    "SCENARIO_DEFAUT",
+    "entrees_regimes",
+    "normaliser_scenario",
+    "simuler_scenario",
+    "grille_sensibilite",
+    "simuler_sorties",
+    "tri_par_sortie",
+    "HypothesesRisque",
+    "simuler_monte_carlo",
+    "resoudre_objectif",
+    "front_pareto",
+    "optimiser_financement",
+    "calcul_revenu_foncier_batch",
+    "echeance_batch",
+    "simuler_regimes_batch",
+]
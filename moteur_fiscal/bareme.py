@@ -0,0 +1,63 @@
+"""Barème progressif de l'impôt sur le revenu et calcul de l'impôt."""
+
+import numpy as np
+
+from .parametres import PARAMETRES_DEFAUT
+
+# --- Barème progressif 2025 ---
+# Jeu par défaut du registre (moteur_fiscal.parametres) ; les autres années se passent en argument
+bareme = list(PARAMETRES_DEFAUT.bareme)
+
+# Tables précalculées du barème : bornes, taux et impôt cumulé (par part)
+# au début de chaque tranche, pour un calcul vectorisé par searchsorted
+BAREME_BAS = PARAMETRES_DEFAUT.bareme_bas
+BAREME_HAUT = PARAMETRES_DEFAUT.bareme_haut
+BAREME_TAUX = PARAMETRES_DEFAUT.bareme_taux
+BAREME_IMPOT_CUMULE = PARAMETRES_DEFAUT.bareme_impot_cumule
+
+
+def impot_progressif_batch(revenus_imposables, parts=1, details=False, parametres=None):
+    p = parametres or PARAMETRES_DEFAUT
+    revenus_imposables = np.asarray(revenus_imposables, dtype=float)
+    parts = np.asarray(parts, dtype=float)
+    revenu_par_part = revenus_imposables / parts
+
+    # Indice de la dernière tranche entamée (revenu strictement supérieur à sa borne basse), -1 sinon
+    idx = np.searchsorted(p.bareme_bas, revenu_par_part, side="left") - 1
+    entame = idx >= 0
+    k = np.where(entame, idx, 0)
+    tranche_partielle = np.minimum(revenu_par_part, p.bareme_haut[k]) - p.bareme_bas[k]
+    impots_par_part = np.where(entame, p.bareme_impot_cumule[k] + tranche_partielle * p.bareme_taux[k], 0.0)
+    impots = impots_par_part * parts
+
+    if not details:
+        return impots
+
+    # Matrices (n, nb_tranches) : montant imposable et impôt de chaque tranche, par part
+    rpp = revenu_par_part[..., np.newaxis]
+    tranches_imposables = np.where(
+        rpp > p.bareme_bas, np.minimum(rpp, p.bareme_haut) - p.bareme_bas, 0.0
+    )
+    impots_tranches = tranches_imposables * p.bareme_taux
+    return impots, tranches_imposables, impots_tranches
+
+
+def impot_progressif(revenu_imposable, parts=1, parametres=None):
+    # Chemin scalaire en Python pur (un appel NumPy coûte plus cher que le calcul lui-même),
+    # mêmes opérations flottantes que impot_progressif_batch : résultats identiques au bit près
+    p = parametres or PARAMETRES_DEFAUT
+    revenu_par_part = revenu_imposable / parts
+    details = []
+    for bas, haut, taux in p.bareme:
+        if revenu_par_part <= bas:
+            break
+        tranche_imposable = min(revenu_par_part, haut) - bas
+        details.append((bas, haut, taux, float(tranche_imposable), float(tranche_imposable * taux)))
+    if not details:
+        return 0.0, details
+    return float((p.impot_cumule[len(details) - 1] + details[-1][4]) * parts), details
+
+
+def tranche_marginale(revenu_imposable, parts=1, parametres=None):
+    # Taux marginal d'imposition (TMI) : recherche dichotomique dans les bornes du barème
+    return (parametres or PARAMETRES_DEFAUT).tmi(revenu_imposable / parts)
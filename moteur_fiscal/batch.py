@@ -0,0 +1,176 @@
+"""Évaluation en lot des quatre régimes sur un fichier CSV ou Parquet de biens candidats.
+
+Usage : python -m moteur_fiscal.batch biens.csv resultats.parquet [--taille-lot 5000] [--workers 8]
+
+Chaque ligne d'entrée porte tout ou partie des champs de SCENARIO_DEFAUT ; les colonnes
+d'entrée sont recopiées telles quelles et complétées par les résultats de chaque régime.
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import numpy as np
+
+from .regimes import REGIMES, nom_regime
+from .resultats import TableauRegimes
+from .scenario import entrees_regimes, normaliser_scenario
+from .vectoriel import simuler_regimes_batch
+
+INDICATEURS = ("applicable", "surcout_fiscal", "rendement_net", "cash_flow_annuel", "cash_flow_mensuel")
+
+
+def cle_regime(type_loc, regime):
+    return f"{type_loc}_{regime}".lower().replace("é", "e")
+
+
+COLONNES_RESULTATS = [
+    f"{cle_regime(type_loc, regime)}_{indicateur}"
+    for type_loc, regime in REGIMES
+    for indicateur in INDICATEURS
+]
+
+
+def evaluer_lot(lignes, parametres=None):
+    # Prêt et amortissements ligne à ligne (mêmes fonctions que la page), puis les quatre régimes
+    # en une passe vectorisée : les résultats restent identiques à ceux de simuler_scenario.
+    # Seule la table revient du worker : l'appelant garde ses lignes, inutile de les sérialiser une seconde fois
+    entrees = np.array([entrees_regimes(normaliser_scenario(ligne)) for ligne in lignes], dtype=float)
+    return TableauRegimes.depuis_batch(simuler_regimes_batch(*entrees.T, parametres=parametres))
+
+
+def colonnes_resultats(tableau):
+    # Colonnes de sortie (vues sur la table, sans copie) : un bloc de lignes contigu par régime
+    colonnes = {}
+    n = len(tableau) // len(REGIMES)
+    for k, (type_loc, regime) in enumerate(REGIMES):
+        lignes = slice(k * n, (k + 1) * n)
+        bloc = tableau.par_regime(f"{type_loc} - {nom_regime(type_loc, regime)}")
+        for indicateur in INDICATEURS:
+            colonne = f"{cle_regime(type_loc, regime)}_{indicateur}"
+            if indicateur == "applicable":
+                colonnes[colonne] = tableau.applicable[lignes]
+            else:
+                colonnes[colonne] = bloc[TableauRegimes.indice(indicateur)]
+    return colonnes
+
+
+# --- Lecture et écriture en flux ---
+def lire_lots(chemin, taille_lot):
+    if chemin.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(chemin).iter_batches(batch_size=taille_lot):
+            yield batch.to_pylist()
+    else:
+        with open(chemin, newline="", encoding="utf-8") as f:
+            lecteur = csv.DictReader(f)
+            while lot := list(islice(lecteur, taille_lot)):
+                yield lot
+
+
+class EcrivainCSV:
+    def __init__(self, chemin):
+        self.fichier = open(chemin, "w", newline="", encoding="utf-8")
+        self.writer = None
+
+    def ecrire(self, lignes, tableau):
+        # Régimes inapplicables : cellules vides
+        resultats = {colonne: [None if v != v else v for v in valeurs.tolist()]
+                     for colonne, valeurs in colonnes_resultats(tableau).items()}
+        if self.writer is None:
+            self.writer = csv.DictWriter(self.fichier, fieldnames=list(lignes[0]) + COLONNES_RESULTATS)
+            self.writer.writeheader()
+        self.writer.writerows({**ligne, **{c: valeurs[i] for c, valeurs in resultats.items()}}
+                              for i, ligne in enumerate(lignes))
+
+    def fermer(self):
+        self.fichier.close()
+
+
+class EcrivainParquet:
+    def __init__(self, chemin):
+        self.chemin = chemin
+        self.writer = None
+
+    def ecrire(self, lignes, tableau):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self.writer is None:
+            # Schéma fixé au premier lot : le type des colonnes d'entrée ne doit pas varier d'un lot à l'autre
+            self.schema_entree = pa.Table.from_pylist(lignes).schema
+            self.schema = pa.schema(list(self.schema_entree) + [
+                pa.field(c, pa.bool_() if c.endswith("_applicable") else pa.float64())
+                for c in COLONNES_RESULTATS
+            ])
+            self.writer = pq.ParquetWriter(self.chemin, self.schema)
+        entree = pa.Table.from_pylist(lignes, schema=self.schema_entree)
+        # Colonnes de résultats converties sans copie ; NaN (régime inapplicable) devient null
+        resultats = [pa.array(valeurs, from_pandas=True) for valeurs in colonnes_resultats(tableau).values()]
+        self.writer.write_table(pa.Table.from_arrays(entree.columns + resultats, schema=self.schema))
+
+    def fermer(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def evaluer_fichier(entree, sortie, taille_lot=5000, workers=None, progression=True):
+    ecrivain = EcrivainParquet(sortie) if sortie.endswith(".parquet") else EcrivainCSV(sortie)
+    workers = workers or os.cpu_count() or 1
+    debut = time.perf_counter()
+    n_lignes = 0
+
+    # Au plus 2 lots en vol par worker : la mémoire reste bornée quelle que soit la taille du fichier,
+    # et les résultats sont écrits dans l'ordre des lignes d'entrée
+    en_vol = deque()
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            lots = lire_lots(entree, taille_lot)
+            for lot in lots:
+                en_vol.append((lot, pool.submit(evaluer_lot, lot)))
+                if len(en_vol) >= 2 * workers:
+                    n_lignes += _ecrire_suivant(en_vol, ecrivain)
+                    if progression:
+                        _afficher_progression(n_lignes, debut)
+            while en_vol:
+                n_lignes += _ecrire_suivant(en_vol, ecrivain)
+                if progression:
+                    _afficher_progression(n_lignes, debut)
+    finally:
+        ecrivain.fermer()
+    if progression:
+        print(file=sys.stderr)
+    return n_lignes
+
+
+def _ecrire_suivant(en_vol, ecrivain):
+    lignes, futur = en_vol.popleft()
+    ecrivain.ecrire(lignes, futur.result())
+    return len(lignes)
+
+
+def _afficher_progression(n_lignes, debut):
+    duree = time.perf_counter() - debut
+    print(f"\r{n_lignes:,} biens évalués en {duree:.1f} s ({n_lignes / duree:,.0f} biens/s)",
+          end="", file=sys.stderr, flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Comparaison des régimes fiscaux sur un portefeuille de biens.")
+    parser.add_argument("entree", help="fichier CSV ou Parquet des biens candidats")
+    parser.add_argument("sortie", help="fichier CSV ou Parquet de résultats")
+    parser.add_argument("--taille-lot", type=int, default=5000, help="nombre de lignes par lot (défaut : 5000)")
+    parser.add_argument("--workers", type=int, default=None, help="nombre de processus (défaut : nombre de cœurs)")
+    parser.add_argument("--silencieux", action="store_true", help="ne pas afficher la progression")
+    args = parser.parse_args(argv)
+    evaluer_fichier(args.entree, args.sortie, args.taille_lot, args.workers, not args.silencieux)
+
+
+if __name__ == "__main__":
+    main()
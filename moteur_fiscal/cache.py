@@ -0,0 +1,98 @@
+"""Cache des résultats de simulation indexé par une empreinte canonique des saisies.
+
+Le cache est partagé par tout le processus : sous Streamlit, toutes les sessions servies par le
+même serveur en profitent. Chaque entrée regroupe les artefacts d'un même scénario (résultats des
+régimes, projection, images des graphiques, PDF) et est évincée au-delà de `taille` entrées
+ou, si `octets` est donné, au-delà de ce volume total d'artefacts (la moins récemment utilisée
+d'abord), ou `ttl` secondes après sa création.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from .graphe import taille_valeur
+from .scenario import normaliser_scenario
+
+
+def empreinte_scenario(saisies, **options):
+    # Les nombres sont ramenés en float pour que 20 et 20.0 donnent la même empreinte
+    donnees = {**normaliser_scenario(saisies), **options}
+    donnees = {cle: float(valeur) if isinstance(valeur, (int, float)) and not isinstance(valeur, bool) else valeur
+               for cle, valeur in donnees.items()}
+    return hashlib.sha256(json.dumps(donnees, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+
+class CacheResultats:
+    def __init__(self, taille=None, ttl=None, octets=None):
+        self.taille = taille or int(os.environ.get("SIMULATEUR_CACHE_TAILLE", 256))
+        self.ttl = ttl or float(os.environ.get("SIMULATEUR_CACHE_TTL", 3600))
+        self.octets = octets  # volume maximal des artefacts (taille_valeur), None : sans limite
+        self._entrees = OrderedDict()  # empreinte -> (date de création, {artefact: valeur})
+        self._tailles = {}  # empreinte -> volume de ses artefacts
+        self.volume = 0
+        self._verrou = threading.Lock()
+        self.succes = 0
+        self.echecs = 0
+
+    def _entree(self, cle):
+        entree = self._entrees.get(cle)
+        if entree is None:
+            return None
+        if time.monotonic() - entree[0] > self.ttl:
+            self._retirer(cle)
+            return None
+        self._entrees.move_to_end(cle)
+        return entree[1]
+
+    def obtenir(self, cle, artefact, calcul):
+        with self._verrou:
+            artefacts = self._entree(cle)
+            if artefacts is not None and artefact in artefacts:
+                self.succes += 1
+                return artefacts[artefact]
+            self.echecs += 1
+
+        # Calcul hors verrou : les autres sessions ne sont pas bloquées pendant ce temps
+        return self.deposer(cle, artefact, calcul())
+
+    def deposer(self, cle, artefact, valeur):
+        # Range un artefact déjà connu (calculé, ou rechargé depuis l'archive des scénarios)
+        with self._verrou:
+            artefacts = self._entree(cle)
+            if artefacts is None:
+                artefacts = {}
+                self._entrees[cle] = (time.monotonic(), artefacts)
+            taille = taille_valeur(valeur) - (taille_valeur(artefacts[artefact]) if artefact in artefacts else 0)
+            artefacts[artefact] = valeur
+            self._tailles[cle] = self._tailles.get(cle, 0) + taille
+            self.volume += taille
+            # L'entrée qui vient d'être servie (la plus récente) est toujours gardée
+            while len(self._entrees) > 1 and (len(self._entrees) > self.taille
+                                              or (self.octets is not None and self.volume > self.octets)):
+                self._retirer(next(iter(self._entrees)))
+        return valeur
+
+    def _retirer(self, cle):
+        del self._entrees[cle]
+        self.volume -= self._tailles.pop(cle, 0)
+
+    def artefacts(self, cle):
+        # Copie des artefacts présents pour ce scénario (vide s'il n'est pas en cache)
+        with self._verrou:
+            return dict(self._entree(cle) or {})
+
+    def vider(self):
+        with self._verrou:
+            self._entrees.clear()
+            self._tailles.clear()
+            self.volume = 0
+
+    def __len__(self):
+        return len(self._entrees)
+
+
+cache_resultats = CacheResultats()
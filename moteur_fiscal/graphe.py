@@ -0,0 +1,261 @@
+"""Graphe de calcul incrémental : nœuds nommés, recalcul limité à l'aval des entrées modifiées.
+
+Le calcul d'un scénario est décrit par des nœuds (prêt, amortissements, revenu, fiscalité et
+résultat de chaque régime, projection...) qui déclarent les entrées ou nœuds dont ils dépendent.
+Un CalculIncremental garde la dernière valeur de chaque nœud avec un numéro de version :
+un nœud n'est recalculé que si la version d'une de ses dépendances a changé depuis son dernier
+calcul, et un nœud recalculé à l'identique garde sa version, ce qui épargne son aval.
+L'évaluation est paresseuse : seuls les nœuds nécessaires aux valeurs demandées sont calculés.
+Une valeur peut être oubliée (celles d'une simulation périmée) : redemandée, elle est recalculée
+sans changer de version. memoire() compte les valeurs propres au calcul ; celles des nœuds
+partagés (tenues par un cache commun à toutes les sessions, comme les images des graphiques)
+n'en font pas partie : la session n'en retient qu'une référence.
+
+Modifier les assurances, par exemple, recalcule les charges, le revenu et la fiscalité des seuls
+régimes réels, puis le résultat de chaque régime (le cash-flow d'un régime micro dépend aussi des
+charges), sans toucher au prêt, aux amortissements ni au revenu et à la fiscalité des régimes micro.
+"""
+
+import itertools
+import sys
+from typing import Callable, NamedTuple
+
+import numpy as np
+
+from .bareme import impot_progressif
+from .pret import calcul_interets_annuels, tableau_amortissement
+from .projection import projection_pluriannuelle
+from .regimes import (
+    REGIMES,
+    calcul_amortissements,
+    fiscalite_regime,
+    nom_regime,
+    regime_applicable,
+    resultat_regime,
+    revenu_regime,
+)
+from .resultats import ResultatRegime, TableauRegimes
+
+
+class Noeud(NamedTuple):
+    nom: str
+    dependances: tuple
+    calcul: Callable  # appelé avec les valeurs des dépendances, dans l'ordre
+    partage: bool = False  # valeur tenue par un cache partagé : hors du budget mémoire de la session
+
+
+class GrapheCalcul:
+    def __init__(self, entrees, noeuds):
+        self.entrees = tuple(entrees)
+        self.noeuds = {}
+        for noeud in noeuds:
+            if noeud.nom in self.noeuds or noeud.nom in self.entrees:
+                raise ValueError(f"Nœud en double : {noeud.nom}")
+            self.noeuds[noeud.nom] = noeud
+        connus = set(self.entrees) | set(self.noeuds)
+        for noeud in self.noeuds.values():
+            inconnues = [d for d in noeud.dependances if d not in connus]
+            if inconnues:
+                raise ValueError(f"Dépendances inconnues du nœud {noeud.nom} : {', '.join(inconnues)}")
+        self.ordre = self._ordre_topologique()
+        self._extensions = {}
+
+    def _ordre_topologique(self):
+        ordre, etats = [], {}
+
+        def visiter(nom):
+            if etats.get(nom) == "fait" or nom in self.entrees:
+                return
+            if etats.get(nom) == "en_cours":
+                raise ValueError(f"Cycle dans le graphe de calcul au nœud {nom}")
+            etats[nom] = "en_cours"
+            for dependance in self.noeuds[nom].dependances:
+                visiter(dependance)
+            etats[nom] = "fait"
+            ordre.append(nom)
+
+        for nom in self.noeuds:
+            visiter(nom)
+        return tuple(ordre)
+
+    def etendre(self, noeuds):
+        # Graphe avec des nœuds supplémentaires (ceux déjà présents sous le même nom sont ignorés) ;
+        # construit une fois par ensemble de nœuds, puis partagé par tous les calculs qui l'étendent
+        noeuds = tuple(noeuds)
+        if noeuds not in self._extensions:
+            self._extensions[noeuds] = GrapheCalcul(
+                self.entrees, [*self.noeuds.values(), *(n for n in noeuds if n.nom not in self.noeuds)])
+        return self._extensions[noeuds]
+
+
+def _identique(a, b):
+    if a is b:
+        return True
+    if type(a) is not type(b):
+        return False
+    try:
+        return bool(a == b)
+    except (ValueError, TypeError):  # tableaux NumPy, dictionnaires de tableaux... : considérés modifiés
+        return False
+
+
+def taille_valeur(valeur):
+    # Octets retenus par une valeur (estimation : tampons, tableaux NumPy et conteneurs parcourus)
+    if isinstance(valeur, (bytes, bytearray)):
+        return len(valeur)
+    if isinstance(valeur, np.ndarray):
+        return valeur.nbytes
+    if isinstance(valeur, dict):
+        return sum(taille_valeur(v) for v in valeur.values())
+    if isinstance(valeur, (list, tuple)):
+        return sum(taille_valeur(v) for v in valeur)
+    if hasattr(type(valeur), "__slots__"):  # TableauRegimes
+        return sum(taille_valeur(getattr(valeur, attribut)) for attribut in type(valeur).__slots__)
+    return sys.getsizeof(valeur)
+
+
+class CalculIncremental:
+    def __init__(self, graphe):
+        self.graphe = graphe
+        self._valeurs = {}
+        self._versions = {}
+        self._signatures = {}  # nœud -> versions des dépendances lors de son dernier calcul
+        self._compteur = itertools.count(1)
+        self._tailles = {}  # nœud -> taille_valeur de sa valeur
+        self.recalcules = []  # nœuds recalculés, dans l'ordre (remis à zéro par l'appelant)
+        self.oublies = 0
+
+    def etendre(self, noeuds):
+        self.graphe = self.graphe.etendre(noeuds)
+
+    def definir(self, **entrees):
+        for nom, valeur in entrees.items():
+            if nom not in self.graphe.entrees:
+                raise ValueError(f"Entrée inconnue : {nom}")
+            if nom not in self._valeurs or not _identique(valeur, self._valeurs[nom]):
+                self._valeurs[nom] = valeur
+                self._versions[nom] = next(self._compteur)
+
+    def evaluer(self, *noms):
+        valeurs = [self._valeur(nom) for nom in noms]
+        return valeurs[0] if len(noms) == 1 else valeurs
+
+    def _valeur(self, nom):
+        if nom in self.graphe.entrees:
+            if nom not in self._valeurs:
+                raise KeyError(f"Entrée non définie : {nom}")
+            return self._valeurs[nom]
+        noeud = self.graphe.noeuds[nom]
+        arguments = [self._valeur(dependance) for dependance in noeud.dependances]
+        signature = tuple(self._versions[dependance] for dependance in noeud.dependances)
+        if self._signatures.get(nom) == signature:
+            if nom in self._valeurs:
+                return self._valeurs[nom]
+            # Valeur oubliée : mêmes dépendances, donc même valeur, et la version est conservée
+            self._valeurs[nom] = noeud.calcul(*arguments)
+            self.recalcules.append(nom)
+        else:
+            valeur = noeud.calcul(*arguments)
+            self.recalcules.append(nom)
+            if nom not in self._valeurs or not _identique(valeur, self._valeurs[nom]):
+                self._valeurs[nom] = valeur
+                self._versions[nom] = next(self._compteur)
+            self._signatures[nom] = signature
+        self._tailles[nom] = taille_valeur(self._valeurs[nom])
+        return self._valeurs[nom]
+
+    def _propre(self, nom):
+        # Valeur d'un nœud détenue par la seule session (ni entrée, ni nœud partagé)
+        noeud = self.graphe.noeuds.get(nom)
+        return noeud is not None and not noeud.partage
+
+    def memoire(self):
+        # Octets retenus par les valeurs propres à la session (entrées et nœuds partagés non comptés)
+        return sum(self._tailles.get(nom, 0) for nom in self._valeurs if self._propre(nom))
+
+    def oublier(self, *noms):
+        for nom in noms:
+            if nom in self.graphe.noeuds and nom in self._valeurs:
+                del self._valeurs[nom]
+                self._tailles.pop(nom, None)
+                self.oublies += 1
+
+
+# --- Graphe d'un scénario de la page ---
+# Entrées : champs numériques de normaliser_scenario, options de la projection et jeu de paramètres fiscaux
+ENTREES_SIMULATION = (
+    "RFR", "parts", "loyers", "prix_bien", "frais_notaire", "valeur_terrain",
+    "duree_amortissement_bati", "valeur_mobilier", "duree_amortissement_mobilier",
+    "taxe_fonciere", "provision_copro", "assurances", "capital", "taux_annuel", "duree_annees",
+    "assurance_emprunteur", "nb_annees_projection", "indexation_loyers", "inflation_charges", "parametres",
+)
+
+
+def _noeuds_regime(type_loc, regime):
+    libelle = f"{type_loc} - {nom_regime(type_loc, regime)}"
+    micro = regime == "Micro"
+    meuble_reel = type_loc == "Meublée" and regime == "Reel"
+
+    # Le régime micro ignore les charges et l'amortissement, le réel nu l'amortissement
+    dependances_revenu = ("loyers", "pret", "assurance_emprunteur", "parametres")
+    if not micro:
+        dependances_revenu += ("charges_classiques",)
+    if meuble_reel:
+        dependances_revenu += ("amortissements",)
+
+    def revenu(loyers, pret, assurance_emprunteur, parametres, charges_classiques=0, amortissements=(0, 0, 0)):
+        return revenu_regime(type_loc, regime, loyers, charges_classiques, pret[0], assurance_emprunteur,
+                             amortissements[2], parametres)
+
+    def resultat(applicable, res, fiscalite, impots_base, loyers, charges_classiques, pret, assurance_emprunteur,
+                 prix_bien, frais_notaire):
+        if not applicable:
+            return ResultatRegime(type_loc, regime, nom_regime(type_loc, regime), applicable=False)
+        interets_emprunt, mensualite = pret
+        return resultat_regime(type_loc, regime, res, fiscalite, impots_base, loyers, charges_classiques,
+                               interets_emprunt, assurance_emprunteur, mensualite, prix_bien, frais_notaire)
+
+    return [
+        Noeud(f"applicable:{libelle}", ("loyers", "parametres"),
+              lambda loyers, parametres: regime_applicable(type_loc, regime, loyers, parametres)),
+        Noeud(f"revenu:{libelle}", dependances_revenu, revenu),
+        Noeud(f"fiscalite:{libelle}", (f"revenu:{libelle}", "RFR", "parts", "parametres"),
+              lambda res, RFR, parts, parametres: fiscalite_regime(type_loc, regime, res, RFR, parts, parametres)),
+        Noeud(f"resultat:{libelle}", (f"applicable:{libelle}", f"revenu:{libelle}", f"fiscalite:{libelle}",
+                                      "impot_base", "loyers", "charges_classiques", "pret", "assurance_emprunteur",
+                                      "prix_bien", "frais_notaire"), resultat),
+    ]
+
+
+def _projection(nb_annees, RFR, parts, loyers, charges_classiques, capital, taux_annuel, duree_annees,
+                assurance_emprunteur, prix_bien, frais_notaire, amortissements, duree_amortissement_bati,
+                duree_amortissement_mobilier, indexation_loyers, inflation_charges, parametres):
+    amortissement_bati, amortissement_mobilier, _ = amortissements
+    return projection_pluriannuelle(
+        nb_annees, RFR, parts, loyers, charges_classiques, capital, taux_annuel,
+        duree_annees, assurance_emprunteur, prix_bien, frais_notaire,
+        amortissement_bati, duree_amortissement_bati, amortissement_mobilier, duree_amortissement_mobilier,
+        indexation_loyers / 100, inflation_charges / 100, parametres
+    )
+
+
+GRAPHE_SIMULATION = GrapheCalcul(ENTREES_SIMULATION, [
+    Noeud("charges_classiques", ("taxe_fonciere", "provision_copro", "assurances"),
+          lambda taxe_fonciere, provision_copro, assurances: taxe_fonciere + provision_copro + assurances),
+    Noeud("amortissements", ("prix_bien", "valeur_terrain", "duree_amortissement_bati", "valeur_mobilier",
+                             "duree_amortissement_mobilier"),
+          lambda prix_bien, valeur_terrain, duree_bati, valeur_mobilier, duree_mobilier: calcul_amortissements(
+              prix_bien - valeur_terrain, duree_bati, valeur_mobilier, duree_mobilier)),
+    Noeud("pret", ("capital", "taux_annuel", "duree_annees"), calcul_interets_annuels),
+    Noeud("echeancier", ("capital", "taux_annuel", "duree_annees"), tableau_amortissement),
+    Noeud("impot_base", ("RFR", "parts", "parametres"),
+          lambda RFR, parts, parametres: impot_progressif(RFR, parts, parametres)[0]),
+    *(noeud for type_loc, regime in REGIMES for noeud in _noeuds_regime(type_loc, regime)),
+    Noeud("regimes", tuple(f"resultat:{type_loc} - {nom_regime(type_loc, regime)}" for type_loc, regime in REGIMES),
+          lambda *resultats: list(resultats)),
+    Noeud("tableau", ("regimes",), TableauRegimes.depuis_resultats),
+    Noeud("projection", ("nb_annees_projection", "RFR", "parts", "loyers", "charges_classiques", "capital",
+                         "taux_annuel", "duree_annees", "assurance_emprunteur", "prix_bien", "frais_notaire",
+                         "amortissements", "duree_amortissement_bati", "duree_amortissement_mobilier",
+                         "indexation_loyers", "inflation_charges", "parametres"), _projection),
+])
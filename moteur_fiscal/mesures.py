@@ -0,0 +1,102 @@
+"""Mesures d'exécution : durée et allocations de chaque étape d'un affichage, profil cProfile optionnel.
+
+Une exécution est découpée par des jalons : chaque jalon clôt l'étape commencée au jalon
+précédent. Chaque étape produit une ligne de journal JSON (logger « moteur_fiscal.mesures »,
+niveau INFO) et l'exécution complète une ligne récapitulative.
+
+Variables d'environnement :
+- SIMULATEUR_MESURES_MEMOIRE=1 : suit aussi la mémoire (tracemalloc, démarré une fois pour tout le
+  processus et jamais arrêté, qui ralentit l'exécution) ; chaque étape relève l'écart net de mémoire
+  tracée du processus entre ses deux jalons (delta_processus_ko). Cet écart inclut ce que les autres
+  sessions ont alloué ou libéré pendant l'étape et peut être négatif : ce n'est pas la consommation
+  de l'étape, seulement un ordre de grandeur quand le serveur n'a qu'une session active ;
+- SIMULATEUR_MESURES_FICHIER=chemin : ajoute le récapitulatif de chaque exécution à ce fichier (JSON Lines) ;
+- SIMULATEUR_PROFIL=dossier : enregistre un profil cProfile (.prof) de chaque exécution complète,
+  à analyser hors ligne (python -m pstats, snakeviz...).
+
+Ces suivis coûteux ne dépendent que de l'environnement du serveur, jamais d'un paramètre de la page.
+"""
+
+import cProfile
+import json
+import logging
+import os
+import time
+import tracemalloc
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+journal = logging.getLogger(__name__)
+
+
+class MesuresExecution:
+    def __init__(self, memoire=None, fichier=None, profil=None):
+        if memoire is None:
+            memoire = os.environ.get("SIMULATEUR_MESURES_MEMOIRE") == "1"
+        self.fichier = fichier if fichier is not None else os.environ.get("SIMULATEUR_MESURES_FICHIER")
+        dossier_profil = profil if profil is not None else os.environ.get("SIMULATEUR_PROFIL")
+        self.identifiant = uuid.uuid4().hex[:12]
+        self.etapes = []
+        self.terminee = False
+
+        # tracemalloc est global au processus : démarré au besoin, jamais arrêté par une exécution
+        # (une autre session peut être en train de mesurer)
+        self.memoire = memoire
+        if memoire and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self._dossier_profil = Path(dossier_profil) if dossier_profil else None
+        self._profil = None
+        if self._dossier_profil:
+            self._profil = cProfile.Profile()
+            try:
+                self._profil.enable()
+            except ValueError:  # un autre profileur est déjà actif dans ce processus
+                self._profil = None
+        self.debut = self._dernier_jalon = time.perf_counter()
+        self._memoire_jalon = self._memoire_courante()
+
+    def _memoire_courante(self):
+        if not self.memoire:
+            return None
+        return tracemalloc.get_traced_memory()[0]
+
+    def jalon(self, etape):
+        maintenant = time.perf_counter()
+        mesure = {"etape": etape, "duree_ms": round((maintenant - self._dernier_jalon) * 1000, 3)}
+        if self.memoire:
+            # Écart net de tout le processus, pas les allocations de cette étape
+            mesure["delta_processus_ko"] = round((self._memoire_courante() - self._memoire_jalon) / 1024, 1)
+        self.etapes.append(mesure)
+        journal.info(json.dumps({"evenement": "etape", "execution": self.identifiant, **mesure}, ensure_ascii=False))
+        # Le temps passé à mesurer n'est imputé à aucune étape
+        self._memoire_jalon = self._memoire_courante()
+        self._dernier_jalon = time.perf_counter()
+        return mesure
+
+    def terminer(self, etape="fin"):
+        # Appelé dans un finally : une exécution déjà close n'est pas comptée deux fois
+        if self.terminee:
+            return self.recapitulatif
+        self.jalon(etape)
+        self.terminee = True
+        recapitulatif = {
+            "evenement": "execution",
+            "execution": self.identifiant,
+            "horodatage": datetime.now().isoformat(timespec="seconds"),
+            "duree_ms": round((time.perf_counter() - self.debut) * 1000, 3),
+            "etapes": self.etapes,
+        }
+        if self._profil is not None:
+            self._profil.disable()
+            self._dossier_profil.mkdir(parents=True, exist_ok=True)
+            chemin = self._dossier_profil / f"simulateur-{datetime.now():%Y%m%d-%H%M%S}-{self.identifiant}.prof"
+            self._profil.dump_stats(chemin)
+            recapitulatif["profil"] = str(chemin)
+            self._profil = None
+        journal.info(json.dumps(recapitulatif, ensure_ascii=False))
+        if self.fichier:
+            with open(self.fichier, "a", encoding="utf-8") as f:
+                f.write(json.dumps(recapitulatif, ensure_ascii=False) + "\n")
+        self.recapitulatif = recapitulatif
+        return recapitulatif
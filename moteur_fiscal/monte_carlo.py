@@ -0,0 +1,214 @@
+"""Simulation de Monte Carlo : vacance locative, indexation des loyers, inflation des charges et taux variable.
+
+Chaque tirage suit la même logique que projection_pluriannuelle (reports de déficit et
+d'amortissement compris), mais tous les tirages d'un lot avancent ensemble, année par année,
+sous forme de tableaux NumPy. Les lots ont chacun leur flux aléatoire, dérivé de la graine par
+SeedSequence : à graine et taille de lot identiques, les résultats sont reproductibles.
+
+Chaque lot est réduit dès sa sortie en agrégats de taille fixe (comptes, et pour les centiles un
+histogramme par année), si bien que la mémoire ne dépend que de la taille d'un lot, jamais du
+nombre de tirages. Les centiles sont interpolés dans l'histogramme : les classes sont bornées
+d'après le premier lot (élargi de moitié de chaque côté), les valeurs qui en sortent comptent dans
+la classe extrême, et les extrêmes exacts bornent le résultat. L'erreur reste inférieure à la
+largeur d'une classe (1/2048 de l'étendue).
+"""
+
+import warnings
+from typing import NamedTuple
+
+import numpy as np
+
+from .bareme import impot_progressif_batch
+from .parametres import PARAMETRES_DEFAUT
+from .regimes import REGIMES, calcul_amortissements, nom_regime
+from .projection import DUREE_REPORT_DEFICIT
+from .scenario import normaliser_scenario
+from .vectoriel import calcul_revenu_foncier_batch
+
+CENTILES = (5, 25, 50, 75, 95)
+CLASSES_HISTOGRAMME = 2048
+
+
+class HypothesesRisque(NamedTuple):
+    vacance_mois: float = 0.5                 # mois vacants par an, en moyenne
+    indexation_moyenne: float = 0.015         # revalorisation annuelle des loyers
+    indexation_ecart_type: float = 0.01
+    inflation_charges_moyenne: float = 0.02
+    inflation_charges_ecart_type: float = 0.01
+    taux_variable: bool = False
+    volatilite_taux: float = 0.5              # écart-type de la variation annuelle du taux (points)
+
+
+def _simuler_lot(scenario, hypotheses, nb_annees, n, rng, parametres=PARAMETRES_DEFAUT):
+    annees = np.arange(1, nb_annees + 1)
+    charges_base = scenario["taxe_fonciere"] + scenario["provision_copro"] + scenario["assurances"]
+    amortissement_bati, amortissement_mobilier, _ = calcul_amortissements(
+        scenario["prix_bien"] - scenario["valeur_terrain"], scenario["duree_amortissement_bati"],
+        scenario["valeur_mobilier"], scenario["duree_amortissement_mobilier"]
+    )
+    impots_base = impot_progressif_batch(scenario["RFR"], scenario["parts"], parametres=parametres)
+    cout_total_acquisition = scenario["prix_bien"] + scenario["frais_notaire"]
+
+    # Tirages (n, années) : la première année part des valeurs saisies
+    indexation = rng.normal(hypotheses.indexation_moyenne, hypotheses.indexation_ecart_type, (n, nb_annees))
+    inflation = rng.normal(hypotheses.inflation_charges_moyenne, hypotheses.inflation_charges_ecart_type,
+                           (n, nb_annees))
+    indexation[:, 0] = inflation[:, 0] = 0.0
+    mois_vacants = rng.binomial(12, min(hypotheses.vacance_mois / 12, 1.0), (n, nb_annees))
+    loyers = scenario["loyers"] * np.cumprod(1 + indexation, axis=1) * (1 - mois_vacants / 12)
+    charges = charges_base * np.cumprod(1 + inflation, axis=1)
+    taux = np.full((n, nb_annees), scenario["taux_annuel"])
+    if hypotheses.taux_variable:
+        chocs = rng.normal(0.0, hypotheses.volatilite_taux, (n, nb_annees))
+        chocs[:, 0] = 0.0
+        taux = np.maximum(0.0, scenario["taux_annuel"] + np.cumsum(chocs, axis=1))
+
+    sorties = {f"{type_loc} - {nom_regime(type_loc, regime)}": {
+        "cash_flow_annuel": np.empty((n, nb_annees)), "rendement_net": np.empty((n, nb_annees))
+    } for type_loc, regime in REGIMES}
+    deficits = np.zeros((n, nb_annees))         # location nue au réel, par année d'origine
+    amortissement_reporte = np.zeros(n)         # location meublée au réel (Art. 39 C)
+    capital_restant = np.full(n, float(scenario["capital"]))
+    mois_restants = int(round(scenario["duree_annees"] * 12))
+
+    for i, annee in enumerate(annees):
+        # Prêt : mensualité recalculée chaque année sur le capital et la durée restants (taux révisable)
+        mois = min(12, mois_restants)
+        if mois > 0:
+            r = taux[:, i] / 100 / 12
+            taux_nul = r == 0
+            r_calc = np.where(taux_nul, 1.0, r)
+            mensualite = np.where(taux_nul, capital_restant / mois_restants,
+                                  capital_restant * r_calc / (1 - (1 + r_calc) ** -mois_restants))
+            facteur = (1 + r_calc) ** mois
+            capital_fin = np.where(taux_nul, capital_restant - mensualite * mois,
+                                   capital_restant * facteur - mensualite * (facteur - 1) / r_calc)
+            interets = mensualite * mois - (capital_restant - capital_fin)
+            annuites = mensualite * mois
+            assurance = scenario["assurance_emprunteur"]
+            capital_restant, mois_restants = capital_fin, mois_restants - mois
+        else:
+            interets = annuites = np.zeros(n)
+            assurance = 0.0
+        amortissement = ((amortissement_bati if annee <= scenario["duree_amortissement_bati"] else 0.0)
+                         + (amortissement_mobilier if annee <= scenario["duree_amortissement_mobilier"] else 0.0))
+
+        for type_loc, regime in REGIMES:
+            meuble_reel = type_loc == "Meublée" and regime == "Reel"
+            res = calcul_revenu_foncier_batch(
+                loyers[:, i], charges[:, i], interets, assurance, type_loc, regime,
+                amortissement + amortissement_reporte if meuble_reel else 0, parametres
+            )
+            assiette = res["revenu_imposable"]
+            assiette_ps = res["assiette_ps"]
+            if meuble_reel:
+                amortissement_reporte = res["amortissement_non_deductible"]
+            elif type_loc == "Nue" and regime == "Reel":
+                # Imputation des déficits non prescrits, les plus anciens d'abord
+                for j in range(max(0, i - DUREE_REPORT_DEFICIT), i):
+                    impute = np.minimum(deficits[:, j], assiette)
+                    deficits[:, j] -= impute
+                    assiette = assiette - impute
+                deficits[:, i] = res["deficit_interets"]
+                assiette_ps = assiette
+
+            total_impot = impot_progressif_batch(scenario["RFR"] - res["deficit_global"] + assiette,
+                                                 scenario["parts"], parametres=parametres)
+            surcout_fiscal = (total_impot + np.maximum(0, assiette_ps) * parametres.taux_prelevements_sociaux
+                              - impots_base)
+            revenu_net_apres_impot = loyers[:, i] - (charges[:, i] + interets + assurance) - surcout_fiscal
+            cash_flow = loyers[:, i] - (charges[:, i] + annuites) - surcout_fiscal
+            rendement = (revenu_net_apres_impot / cout_total_acquisition * 100
+                         if cout_total_acquisition else np.zeros(n))
+
+            if regime == "Micro":
+                inapplicable = loyers[:, i] > parametres.plafonds_micro[type_loc]
+                cash_flow = np.where(inapplicable, np.nan, cash_flow)
+                rendement = np.where(inapplicable, np.nan, rendement)
+            sortie = sorties[f"{type_loc} - {nom_regime(type_loc, regime)}"]
+            sortie["cash_flow_annuel"][:, i] = cash_flow
+            sortie["rendement_net"][:, i] = rendement
+    return sorties
+
+
+class RepartitionAnnuelle:
+    # Répartition par année de valeurs reçues par lots (n, années), en mémoire fixe : histogramme
+    # à classes égales par année, extrêmes exacts ; les NaN (régime inapplicable) sont ignorés
+    def __init__(self, nb_annees, n_classes=CLASSES_HISTOGRAMME):
+        self.n_classes = n_classes
+        self.bas = np.full(nb_annees, np.nan)
+        self.largeur = np.full(nb_annees, np.nan)
+        self.minimum = np.full(nb_annees, np.inf)
+        self.maximum = np.full(nb_annees, -np.inf)
+        self.comptes = np.zeros((nb_annees, n_classes), dtype=np.int64)
+
+    def ajouter(self, valeurs):
+        finies = np.isfinite(valeurs)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # années sans valeur dans ce lot
+            bas_lot, haut_lot = np.nanmin(valeurs, axis=0), np.nanmax(valeurs, axis=0)
+        # Classes fixées au premier lot où l'année a des valeurs, étendue élargie de moitié de chaque côté
+        nouvelles = np.isnan(self.bas) & np.isfinite(bas_lot)
+        etendue = np.maximum(haut_lot - bas_lot, np.maximum(np.abs(bas_lot), 1.0) * 1e-6)
+        self.bas = np.where(nouvelles, bas_lot - etendue / 2, self.bas)
+        self.largeur = np.where(nouvelles, 2 * etendue / self.n_classes, self.largeur)
+        self.minimum = np.fmin(self.minimum, bas_lot)
+        self.maximum = np.fmax(self.maximum, haut_lot)
+
+        annee = np.broadcast_to(np.arange(valeurs.shape[1]), valeurs.shape)[finies]
+        classe = np.clip(((valeurs[finies] - self.bas[annee]) / self.largeur[annee]).astype(np.int64),
+                         0, self.n_classes - 1)
+        self.comptes += np.bincount(annee * self.n_classes + classe,
+                                    minlength=self.comptes.size).reshape(self.comptes.shape)
+
+    def centiles(self, centiles):
+        # Interpolation linéaire dans la classe qui contient le rang visé (convention de np.percentile),
+        # bornée par les extrêmes observés ; NaN pour une année sans valeur
+        resultat = np.full((len(centiles), len(self.bas)), np.nan)
+        cumul = np.cumsum(self.comptes, axis=1)
+        for a, total in enumerate(cumul[:, -1]):
+            if total == 0:
+                continue
+            rangs = np.asarray(centiles, dtype=float) / 100 * (total - 1) + 0.5
+            k = np.searchsorted(cumul[a], rangs, side="left")
+            avant = np.where(k > 0, cumul[a][np.maximum(k - 1, 0)], 0)
+            fraction = (rangs - avant) / self.comptes[a, k]
+            valeurs = self.bas[a] + (k + fraction) * self.largeur[a]
+            resultat[:, a] = np.clip(valeurs, self.minimum[a], self.maximum[a])
+        return resultat
+
+
+def simuler_monte_carlo(saisies, n_tirages=10000, nb_annees=20, hypotheses=HypothesesRisque(), graine=0,
+                        taille_lot=20000, centiles=CENTILES, parametres=None):
+    scenario = normaliser_scenario(saisies)
+    tailles = [min(taille_lot, n_tirages - debut) for debut in range(0, n_tirages, taille_lot)]
+    flux = [np.random.default_rng(s) for s in np.random.SeedSequence(graine).spawn(len(tailles))]
+
+    # Chaque lot est réduit en agrégats de taille fixe avant le suivant : rien n'est gardé par tirage
+    agregats = {}
+    for taille, rng in zip(tailles, flux):
+        for regime, indicateurs in _simuler_lot(scenario, hypotheses, nb_annees, taille, rng,
+                                                    parametres or PARAMETRES_DEFAUT).items():
+            cash_flow = indicateurs["cash_flow_annuel"]
+            applicable = ~np.isnan(cash_flow)
+            agregat = agregats.setdefault(regime, {
+                **{cle: RepartitionAnnuelle(nb_annees) for cle in ("cash_flow_annuel", "rendement_net",
+                                                                   "cash_flow_cumule")},
+                "negatifs": np.zeros(nb_annees), "applicables": np.zeros(nb_annees),
+            })
+            agregat["cash_flow_annuel"].ajouter(cash_flow)
+            agregat["rendement_net"].ajouter(indicateurs["rendement_net"])
+            agregat["cash_flow_cumule"].ajouter(np.cumsum(cash_flow, axis=1))
+            agregat["negatifs"] += (applicable & (cash_flow < 0)).sum(axis=0)
+            agregat["applicables"] += applicable.sum(axis=0)
+
+    regimes = {}
+    for regime, agregat in agregats.items():
+        regimes[regime] = {
+            "cash_flow_annuel": agregat["cash_flow_annuel"].centiles(centiles),
+            "rendement_net": agregat["rendement_net"].centiles(centiles),
+            "cash_flow_cumule": agregat["cash_flow_cumule"].centiles(centiles),
+            "probabilite_cash_flow_negatif": agregat["negatifs"] / np.maximum(1, agregat["applicables"]),
+            "part_applicable": agregat["applicables"] / n_tirages,
+        }
+    return {"annee": np.arange(1, nb_annees + 1), "centiles": np.asarray(centiles), "regimes": regimes}
@@ -0,0 +1,123 @@
+"""Recherche d'objectif : valeur d'une saisie qui atteint un cash-flow, un rendement ou un surcoût cible.
+
+Exemple : prix maximal permettant un cash-flow mensuel nul en location meublée au réel.
+L'indicateur est continu mais seulement linéaire par morceaux : le barème, le plafond de
+déficit foncier et le plafond d'amortissement y créent des cassures. La recherche procède donc
+en deux temps :
+- un balayage grossier de l'intervalle, évalué en une seule passe vectorisée, repère les
+  changements de signe (un même indicateur peut croiser la cible plusieurs fois) ;
+- chaque intervalle encadrant est resserré par fausse position (variante d'Illinois), exacte
+  dès que les deux bornes sont sur un même segment linéaire, avec repli sur la bissection
+  lorsque l'intervalle ne se réduit pas assez, ce qui garantit la convergence malgré les cassures.
+Le budget d'évaluations est commun à tous les intervalles : s'il s'épuise avant que la solution
+retenue soit resserrée à la tolérance, le milieu de son intervalle est renvoyé avec converge=False.
+La variation du prix suit les conventions de grille_sensibilite (frais, terrain et emprunt proportionnels).
+"""
+
+import numpy as np
+
+from .regimes import PLAFONDS_MICRO, nom_regime
+from .scenario import normaliser_scenario
+from .sensibilite import grille_sensibilite
+
+INDICATEURS_OBJECTIF = ("cash_flow_mensuel", "rendement_net", "surcout_fiscal")
+VARIABLES_OBJECTIF = ("prix_bien", "loyers", "capital", "taux_annuel")
+
+
+def bornes_par_defaut(scenario, variable):
+    if variable == "taux_annuel":
+        return 0.0, 15.0
+    if variable == "capital":
+        return 0.0, 2 * (scenario["prix_bien"] + scenario["frais_notaire"])
+    return 0.0, 3 * max(scenario[variable], 1.0)
+
+
+def resoudre_objectif(saisies, indicateur, cible, type_loc, regime, variable, borne_min=None, borne_max=None,
+                      tolerance=1e-6, n_balayage=16, max_evaluations=60):
+    if indicateur not in INDICATEURS_OBJECTIF:
+        raise ValueError(f"Indicateur inconnu : {indicateur}")
+    if variable not in VARIABLES_OBJECTIF:
+        raise ValueError(f"Variable inconnue : {variable}")
+    scenario = normaliser_scenario(saisies)
+    defaut_min, defaut_max = bornes_par_defaut(scenario, variable)
+    borne_min = defaut_min if borne_min is None else float(borne_min)
+    borne_max = defaut_max if borne_max is None else float(borne_max)
+    if variable == "prix_bien":
+        borne_min = max(borne_min, 1.0)  # le prix sert d'échelle aux frais, au terrain et à l'emprunt
+    if regime == "Micro":
+        if variable == "loyers":
+            borne_max = min(borne_max, PLAFONDS_MICRO[type_loc])
+        elif scenario["loyers"] > PLAFONDS_MICRO[type_loc]:
+            raise ValueError(f"Régime {nom_regime(type_loc, regime)} inapplicable : loyers au-dessus du plafond")
+    if borne_min >= borne_max:
+        raise ValueError("Intervalle de recherche vide")
+    cle_regime = f"{type_loc} - {nom_regime(type_loc, regime)}"
+    evaluations = 0
+
+    def ecart(valeurs):
+        nonlocal evaluations
+        valeurs = np.atleast_1d(np.asarray(valeurs, dtype=float))
+        evaluations += valeurs.size
+        grille = grille_sensibilite(scenario, **{variable: valeurs})
+        return grille["regimes"][cle_regime][indicateur] - cible
+
+    # Balayage grossier : tous les changements de signe en une passe
+    points = np.linspace(borne_min, borne_max, n_balayage + 1)
+    ecarts = ecart(points)
+    tolerance_x = tolerance * (borne_max - borne_min)
+    solutions = [(float(x), True) for x, e in zip(points, ecarts) if e == 0]  # (valeur, convergée)
+    encadrements = [i for i in range(n_balayage) if ecarts[i] * ecarts[i + 1] < 0]
+
+    for i in encadrements:
+        a, b, fa, fb = points[i], points[i + 1], ecarts[i], ecarts[i + 1]
+        solution, cote = None, None
+        while solution is None and evaluations < max_evaluations and b - a > tolerance_x:
+            largeur = b - a
+            x = (a * fb - b * fa) / (fb - fa)
+            fx = ecart(x)[0]
+            if abs(fx) <= tolerance:
+                solution = x
+            elif fx * fa < 0:
+                b, fb = x, fx
+                fa = fa / 2 if cote == "b" else fa  # Illinois : la borne restée fixe perd du poids
+                cote = "b"
+            else:
+                a, fa = x, fx
+                fb = fb / 2 if cote == "a" else fb
+                cote = "a"
+            if solution is None and b - a > largeur / 2 and evaluations < max_evaluations:
+                # Cassure dans l'intervalle : un pas de bissection garantit la réduction
+                m = (a + b) / 2
+                fm = ecart(m)[0]
+                if abs(fm) <= tolerance:
+                    solution = m
+                elif fm * fa < 0:
+                    b, fb = m, fm
+                else:
+                    a, fa = m, fm
+                cote = None
+        if solution is not None:
+            solutions.append((float(solution), True))
+        else:
+            solutions.append((float((a + b) / 2), b - a <= tolerance_x))
+
+    solutions.sort()
+    if solutions:
+        # Prix, emprunt ou taux maximal acceptable ; loyer minimal nécessaire
+        solution, converge = solutions[0] if variable == "loyers" else solutions[-1]
+        atteint = float(ecart(solution)[0] + cible)
+    else:
+        solution = atteint = None
+        converge = False
+    return {
+        "variable": variable,
+        "indicateur": indicateur,
+        "cible": cible,
+        "solution": solution,
+        "converge": converge,
+        "valeur_atteinte": atteint,
+        "solutions": [x for x, _ in solutions],
+        "evaluations": evaluations,
+        "bornes": (borne_min, borne_max),
+        "plage_indicateur": (float(np.nanmin(ecarts) + cible), float(np.nanmax(ecarts) + cible)),
+    }
@@ -0,0 +1,107 @@
+"""Optimisation du régime et du financement : front de Pareto cash-flow / rendement après impôt.
+
+L'espace de recherche croise le régime, la durée du prêt, l'apport et la valeur du mobilier.
+Le mobilier s'achète avec le bien : il s'ajoute au coût d'acquisition (rendement net) et au
+montant emprunté, qui vaut prix + frais de notaire + mobilier − apport. Chaque régime est évalué en
+une passe par simuler_regimes_batch, après élagage des zones qui ne peuvent rien apporter :
+- les régimes micro dont le plafond (15 000 / 77 700 €) est dépassé par les loyers ;
+- le mobilier, qui n'influe que sur la location meublée au réel, et seulement jusqu'à ce que
+  l'amortissement atteigne le plafond de l'Art. 39 C (au-delà, le résultat ne change plus).
+L'assurance emprunteur suit le montant emprunté (même taux que le scénario de départ).
+"""
+
+import numpy as np
+
+from .regimes import PLAFONDS_MICRO, REGIMES, nom_regime
+from .scenario import normaliser_scenario
+from .vectoriel import echeance_batch, simuler_regimes_batch
+
+DUREES_PRET = (10, 15, 20, 25)
+INDICATEURS_RENDEMENT = ("rendement_net", "rendement_fonds_propres")
+
+
+def front_pareto(cash_flow, rendement):
+    # Indices des points non dominés (les deux critères sont à maximiser), par cash-flow décroissant.
+    # À égalité, le premier point rencontré est conservé (ordre d'énumération de la grille).
+    ordre = np.lexsort((np.arange(len(cash_flow)), -rendement, -cash_flow))
+    rendement_trie = rendement[ordre]
+    meilleur_precedent = np.concatenate(([-np.inf], np.maximum.accumulate(rendement_trie)[:-1]))
+    return ordre[rendement_trie > meilleur_precedent]
+
+
+def optimiser_financement(saisies, durees=DUREES_PRET, apport_min=0.0, apport_max=None, valeur_mobilier_max=None,
+                          n_apport=41, n_mobilier=21, indicateur_rendement="rendement_net"):
+    if indicateur_rendement not in INDICATEURS_RENDEMENT:
+        raise ValueError(f"Indicateur de rendement inconnu : {indicateur_rendement}")
+    scenario = normaliser_scenario(saisies)
+    cout_total_acquisition = scenario["prix_bien"] + scenario["frais_notaire"]
+    if apport_max is None:
+        apport_max = cout_total_acquisition
+    if valeur_mobilier_max is None:
+        valeur_mobilier_max = scenario["valeur_mobilier"]
+    apport_max = min(apport_max, cout_total_acquisition)
+    taux_assurance = scenario["assurance_emprunteur"] / scenario["capital"] if scenario["capital"] else 0.0
+    charges_classiques = scenario["taxe_fonciere"] + scenario["provision_copro"] + scenario["assurances"]
+    amortissement_bati = (scenario["prix_bien"] - scenario["valeur_terrain"]) / scenario["duree_amortissement_bati"]
+
+    # Grille (durée, apport, mobilier) ; sans mobilier pour les régimes sur lesquels il est sans effet
+    duree = np.asarray(durees, dtype=float)[:, np.newaxis, np.newaxis]
+    apport = np.linspace(apport_min, apport_max, n_apport)[np.newaxis, :, np.newaxis]
+    capital = cout_total_acquisition - apport
+    interets_emprunt, _ = echeance_batch(capital, scenario["taux_annuel"], duree)
+    assurance_emprunteur = capital * taux_assurance
+
+    # Plafond de l'Art. 39 C : au-delà de ce mobilier, l'amortissement supplémentaire n'est plus déductible
+    # (mobilier qui ne fait alors qu'augmenter le coût). Calculé avec les intérêts hors mobilier, le
+    # plafond est un majorant : l'élagage ne retire aucun point utile
+    plafond_amortissement = np.maximum(0, scenario["loyers"] - interets_emprunt - assurance_emprunteur
+                                       - charges_classiques)
+    mobilier_utile = np.maximum(0, plafond_amortissement - amortissement_bati) * scenario["duree_amortissement_mobilier"]
+    valeurs_mobilier = np.linspace(0, valeur_mobilier_max, n_mobilier)
+    pas_mobilier = valeurs_mobilier[1] - valeurs_mobilier[0] if n_mobilier > 1 else 0.0
+    valeurs_mobilier = valeurs_mobilier[valeurs_mobilier <= mobilier_utile.max() + pas_mobilier]
+
+    candidats = []
+    nb_evalues = 0
+    for type_loc, regime in REGIMES:
+        if regime == "Micro" and scenario["loyers"] > PLAFONDS_MICRO[type_loc]:
+            continue
+        if type_loc == "Meublée" and regime == "Reel":
+            mobilier = valeurs_mobilier[np.newaxis, np.newaxis, :]
+        else:
+            mobilier = np.zeros((1, 1, 1))  # sans effet fiscal hors location meublée au réel
+        capital_r = cout_total_acquisition + mobilier - apport
+        interets_r, mensualite_r = echeance_batch(capital_r, scenario["taux_annuel"], duree)
+        assurance_r = capital_r * taux_assurance
+        amortissement_total = amortissement_bati + mobilier / scenario["duree_amortissement_mobilier"]
+
+        resultats = simuler_regimes_batch(
+            scenario["RFR"], scenario["parts"], scenario["loyers"], charges_classiques, interets_r, assurance_r,
+            mensualite_r, scenario["prix_bien"] + mobilier, scenario["frais_notaire"], amortissement_total,
+            regimes=[(type_loc, regime)]
+        )[f"{type_loc} - {nom_regime(type_loc, regime)}"]
+        forme = resultats["cash_flow_annuel"].shape
+        valeurs = {
+            "duree_annees": duree, "apport": apport, "valeur_mobilier": mobilier,
+            "capital": capital_r, "mensualite": mensualite_r, "surcout_fiscal": resultats["surcout_fiscal"],
+            "cash_flow_annuel": resultats["cash_flow_annuel"], "cash_flow_mensuel": resultats["cash_flow_mensuel"],
+            "rendement_net": resultats["rendement_net"],
+        }
+        valeurs = {cle: np.broadcast_to(v, forme).ravel() for cle, v in valeurs.items()}
+        with np.errstate(divide="ignore", invalid="ignore"):
+            valeurs["rendement_fonds_propres"] = np.where(
+                valeurs["apport"] > 0, resultats["revenu_net_apres_impot"].ravel() / valeurs["apport"] * 100, np.nan
+            )
+        nb_evalues += valeurs["cash_flow_annuel"].size
+
+        # Front du régime d'abord : seuls ses points non dominés entrent dans la comparaison finale
+        garde = ~np.isnan(valeurs[indicateur_rendement])
+        valeurs = {cle: v[garde] for cle, v in valeurs.items()}
+        indices = front_pareto(valeurs["cash_flow_annuel"], valeurs[indicateur_rendement])
+        for i in indices:
+            candidats.append({"type_loc": type_loc, "regime": regime, "regime_name": nom_regime(type_loc, regime),
+                              **{cle: float(v[i]) for cle, v in valeurs.items()}})
+
+    indices = front_pareto(np.array([c["cash_flow_annuel"] for c in candidats]),
+                           np.array([c[indicateur_rendement] for c in candidats]))
+    return {"front": [candidats[i] for i in indices], "candidats_evalues": nb_evalues}
@@ -0,0 +1,105 @@
+"""Paramètres fiscaux par année : registre versionné et tables précalculées du barème.
+
+Chaque jeu (barème de l'impôt, plafond du déficit foncier, taux des prélèvements sociaux,
+abattements et plafonds des régimes micro) est construit une seule fois, à l'import, avec les
+tables dérivées de son barème : bornes, taux et impôt cumulé au début de chaque tranche, en
+NumPy pour les calculs vectorisés et en listes pour le chemin scalaire. L'impôt et la tranche
+marginale d'un revenu s'obtiennent par recherche dichotomique dans ces tables ; changer d'année
+revient à passer un autre jeu (argument `parametres` des fonctions de calcul), sans recalcul.
+L'année est celle du barème (barème 2025 : revenus perçus en 2024).
+"""
+
+from bisect import bisect_right
+from typing import NamedTuple
+
+import numpy as np
+
+
+class ParametresFiscaux(NamedTuple):
+    annee: int
+    bareme: tuple                    # tranches (bas, haut, taux), bornes par part
+    plafond_deficit_foncier: float   # déficit imputable sur le revenu global (hors intérêts)
+    taux_prelevements_sociaux: float
+    abattements_micro: dict          # abattement forfaitaire (%) par type de location
+    plafonds_micro: dict             # loyers annuels maximum du régime micro
+    # Tables précalculées du barème
+    bareme_bas: np.ndarray
+    bareme_haut: np.ndarray
+    bareme_taux: np.ndarray
+    bareme_impot_cumule: np.ndarray  # impôt (par part) au début de chaque tranche
+    bornes_basses: list
+    impot_cumule: list
+
+    def tmi(self, revenu_par_part):
+        # Taux de la dernière tranche dont la borne basse est atteinte
+        i = bisect_right(self.bornes_basses, revenu_par_part) - 1
+        return self.bareme[i][2] if i >= 0 else 0.0
+
+
+def creer_parametres(annee, bareme, plafond_deficit_foncier, taux_prelevements_sociaux,
+                     abattements_micro, plafonds_micro):
+    bareme = tuple(bareme)
+    bas = np.array([b for b, _, _ in bareme], dtype=float)
+    haut = np.array([h for _, h, _ in bareme], dtype=float)
+    taux = np.array([t for _, _, t in bareme], dtype=float)
+    impot_cumule = np.concatenate(([0.0], np.cumsum((haut[:-1] - bas[:-1]) * taux[:-1])))
+    for tableau in (bas, haut, taux, impot_cumule):
+        tableau.flags.writeable = False
+    return ParametresFiscaux(
+        annee=annee,
+        bareme=bareme,
+        plafond_deficit_foncier=plafond_deficit_foncier,
+        taux_prelevements_sociaux=taux_prelevements_sociaux,
+        abattements_micro=dict(abattements_micro),
+        plafonds_micro=dict(plafonds_micro),
+        bareme_bas=bas,
+        bareme_haut=haut,
+        bareme_taux=taux,
+        bareme_impot_cumule=impot_cumule,
+        bornes_basses=[b for b, _, _ in bareme],
+        impot_cumule=impot_cumule.tolist(),
+    )
+
+
+# --- Registre ---
+PARAMETRES_FISCAUX = {
+    2023: creer_parametres(
+        2023,
+        [(0, 10777, 0.00), (10778, 27478, 0.11), (27479, 78570, 0.30), (78571, 168994, 0.41),
+         (168995, float("inf"), 0.45)],
+        plafond_deficit_foncier=10700,
+        taux_prelevements_sociaux=0.172,
+        abattements_micro={"Nue": 30, "Meublée": 50},
+        plafonds_micro={"Nue": 15000, "Meublée": 72600},
+    ),
+    2024: creer_parametres(
+        2024,
+        [(0, 11294, 0.00), (11295, 28797, 0.11), (28798, 82341, 0.30), (82342, 177106, 0.41),
+         (177107, float("inf"), 0.45)],
+        plafond_deficit_foncier=10700,
+        taux_prelevements_sociaux=0.172,
+        abattements_micro={"Nue": 30, "Meublée": 50},
+        plafonds_micro={"Nue": 15000, "Meublée": 77700},
+    ),
+    2025: creer_parametres(
+        2025,
+        [(0, 11497, 0.00), (11498, 29315, 0.11), (29316, 83823, 0.30), (83824, 180294, 0.41),
+         (180295, float("inf"), 0.45)],
+        plafond_deficit_foncier=10700,
+        taux_prelevements_sociaux=0.172,
+        abattements_micro={"Nue": 30, "Meublée": 50},
+        plafonds_micro={"Nue": 15000, "Meublée": 77700},
+    ),
+}
+ANNEE_FISCALE = 2025
+PARAMETRES_DEFAUT = PARAMETRES_FISCAUX[ANNEE_FISCALE]
+
+
+def parametres_fiscaux(annee=None):
+    if annee is None:
+        return PARAMETRES_DEFAUT
+    try:
+        return PARAMETRES_FISCAUX[int(annee)]
+    except KeyError:
+        raise ValueError(f"Année fiscale inconnue : {annee} (disponibles : "
+                         f"{', '.join(map(str, PARAMETRES_FISCAUX))})") from None
@@ -0,0 +1,124 @@
+"""Portefeuille du foyer : plusieurs biens locatifs dans une même imposition.
+
+Les loyers d'un foyer sont imposés par catégorie, pas bien par bien : tous les biens loués nus
+relèvent du même régime (micro-foncier ou réel), tous les biens meublés aussi (micro-BIC ou réel),
+et les plafonds des régimes micro portent sur le total des loyers de la catégorie. Au réel, les
+résultats des biens se compensent avant l'application du plafond du déficit foncier (10 700 €),
+qui s'entend par foyer, et de la limite de l'amortissement (Art. 39 C).
+
+L'impôt étant progressif, la part de chaque bien ne s'obtient pas en sommant des simulations
+séparées : elle est mesurée par retrait (impôt du foyer moins impôt du foyer sans ce bien). Le
+foyer complet et les N foyers privés d'un bien forment N + 1 lignes d'une matrice d'inclusion,
+évaluées ensemble par les fonctions vectorisées, pour chaque combinaison de régimes.
+"""
+
+import itertools
+
+import numpy as np
+
+from .bareme import impot_progressif_batch
+from .parametres import PARAMETRES_DEFAUT
+from .regimes import nom_regime
+from .scenario import entrees_regimes, normaliser_scenario
+from .vectoriel import calcul_revenu_foncier_batch
+
+TYPES_LOCATION = ("Nue", "Meublée")
+
+
+def libelle_combinaison(regimes):
+    # {"Nue": "Micro", "Meublée": "Reel"} -> "Nue - micro-foncier / Meublée - Reel"
+    return " / ".join(f"{type_loc} - {nom_regime(type_loc, regime)}" for type_loc, regime in regimes.items())
+
+
+def simuler_portefeuille(RFR, parts, biens, parametres=None):
+    # biens : saisies de chaque bien (champs de SCENARIO_DEFAUT), avec "type_loc" ("Nue" ou "Meublée")
+    # et un "nom" facultatif ; RFR et parts sont ceux du foyer
+    p = parametres or PARAMETRES_DEFAUT
+    if not biens:
+        raise ValueError("Le portefeuille ne contient aucun bien")
+    types = [bien.get("type_loc", "Nue") for bien in biens]
+    inconnus = sorted(set(types) - set(TYPES_LOCATION))
+    if inconnus:
+        raise ValueError(f"Types de location inconnus : {', '.join(inconnus)}")
+
+    # Entrées par bien (vecteurs de longueur N), mêmes calculs que pour un bien seul
+    entrees = np.array([entrees_regimes(normaliser_scenario(bien))[2:] for bien in biens], dtype=float)
+    (loyers, charges_classiques, interets_emprunt, assurance_emprunteur, mensualite,
+     prix_bien, frais_notaire, amortissement_total) = entrees.T
+
+    # Ligne 0 : foyer complet ; ligne i + 1 : foyer sans le bien i
+    n = len(biens)
+    inclusion = np.vstack([np.ones(n), 1 - np.eye(n)])
+    par_type = {}
+    for type_loc in TYPES_LOCATION:
+        masque = np.array([t == type_loc for t in types], dtype=float)
+        par_type[type_loc] = {
+            nom: inclusion @ (valeurs * masque)
+            for nom, valeurs in (("loyers", loyers), ("charges_classiques", charges_classiques),
+                                 ("interets_emprunt", interets_emprunt),
+                                 ("assurance_emprunteur", assurance_emprunteur),
+                                 ("amortissement_total", amortissement_total))
+        }
+    presents = [type_loc for type_loc in TYPES_LOCATION if type_loc in types]
+
+    impots_base = impot_progressif_batch(RFR, parts, parametres=p)
+    loyers_foyer = inclusion @ loyers
+    charges_totales = inclusion @ (charges_classiques + interets_emprunt + assurance_emprunteur)
+    charges_annuelles = inclusion @ (charges_classiques + mensualite * 12)
+    cout_total_acquisition = inclusion @ (prix_bien + frais_notaire)
+
+    combinaisons = {}
+    for choix in itertools.product(("Micro", "Reel"), repeat=len(presents)):
+        regimes = dict(zip(presents, choix))
+        revenu_global = RFR + np.zeros(n + 1)
+        assiette_ps = np.zeros(n + 1)
+        applicable = np.ones(n + 1, dtype=bool)
+        categories = {}
+        for type_loc, regime in regimes.items():
+            totaux = par_type[type_loc]
+            amortissement = totaux["amortissement_total"] if (type_loc == "Meublée" and regime == "Reel") else 0
+            res = calcul_revenu_foncier_batch(totaux["loyers"], totaux["charges_classiques"],
+                                              totaux["interets_emprunt"], totaux["assurance_emprunteur"],
+                                              type_loc, regime, amortissement, p)
+            revenu_global += res["revenu_imposable"] - res["deficit_global"]
+            assiette_ps += np.maximum(0, res["assiette_ps"])
+            if regime == "Micro":
+                applicable &= totaux["loyers"] <= p.plafonds_micro[type_loc]
+            categories[type_loc] = {cle: valeurs[0] for cle, valeurs in res.items()}
+
+        total_impot = impot_progressif_batch(revenu_global, parts, parametres=p)
+        prelev_sociaux = assiette_ps * p.taux_prelevements_sociaux
+        surcout_fiscal = total_impot + prelev_sociaux - impots_base
+        revenu_net_apres_impot = loyers_foyer - charges_totales - surcout_fiscal
+        cash_flow_annuel = loyers_foyer - charges_annuelles - surcout_fiscal
+
+        # Part de chaque bien : surcoût du foyer moins surcoût du foyer sans lui (NaN si le régime
+        # n'est pas applicable au foyer complet)
+        surcout_marginal = np.where(applicable[0], surcout_fiscal[0] - surcout_fiscal[1:], np.nan)
+        combinaisons[libelle_combinaison(regimes)] = {
+            "regimes": regimes,
+            "applicable": bool(applicable[0]),
+            "categories": categories,
+            "revenu_global": revenu_global[0],
+            "total_impot": total_impot[0],
+            "prelev_sociaux": prelev_sociaux[0],
+            "surcout_fiscal": surcout_fiscal[0],
+            "revenu_net_apres_impot": revenu_net_apres_impot[0],
+            "rendement_net": (revenu_net_apres_impot[0] / cout_total_acquisition[0] * 100
+                              if cout_total_acquisition[0] else 0.0),
+            "cash_flow_annuel": cash_flow_annuel[0],
+            "cash_flow_mensuel": cash_flow_annuel[0] / 12,
+            "surcout_marginal": surcout_marginal,
+            "cash_flow_marginal": loyers - charges_classiques - mensualite * 12 - surcout_marginal,
+            # Les parts ne s'additionnent pas exactement au surcoût du foyer (barème progressif)
+            "ecart_attribution": surcout_fiscal[0] - np.sum(surcout_marginal),
+        }
+
+    applicables = [libelle for libelle, c in combinaisons.items() if c["applicable"]]
+    return {
+        "biens": [bien.get("nom") or f"Bien {i + 1}" for i, bien in enumerate(biens)],
+        "types": types,
+        "impots_base": float(impots_base),
+        "combinaisons": combinaisons,
+        "meilleure": max(applicables, key=lambda libelle: combinaisons[libelle]["cash_flow_annuel"]),
+    }
@@ -0,0 +1,56 @@
+"""Tableau d'amortissement du prêt immobilier."""
+
+from functools import lru_cache
+from typing import NamedTuple
+
+import numpy as np
+
+
+# --- Tableau d'amortissement du prêt sur toute sa durée ---
+class EcheancierPret(NamedTuple):
+    mensualite: float
+    interets: np.ndarray                 # par mois
+    principal: np.ndarray                # par mois
+    capital_restant: np.ndarray          # par mois, après l'échéance
+    interets_annuels: np.ndarray         # par année
+    principal_annuel: np.ndarray         # par année
+    capital_restant_annuel: np.ndarray   # par année, en fin d'année
+
+
+@lru_cache(maxsize=256)
+def tableau_amortissement(capital, taux_annuel, duree_annees):
+    n_mois = int(round(duree_annees * 12))
+    taux_mensuel = taux_annuel / 100 / 12
+    k = np.arange(1, n_mois + 1)
+
+    # Formules fermées de l'annuité constante : capital restant après k échéances
+    if taux_mensuel == 0:
+        mensualite = capital / n_mois
+        capital_restant = capital - mensualite * k
+    else:
+        mensualite = capital * (taux_mensuel / (1 - (1 + taux_mensuel) ** -n_mois))
+        facteur = (1 + taux_mensuel) ** k
+        capital_restant = capital * facteur - mensualite * (facteur - 1) / taux_mensuel
+    capital_restant[-1] = 0.0
+
+    capital_debut = np.concatenate(([capital], capital_restant[:-1]))
+    interets = capital_debut * taux_mensuel
+    principal = capital_debut - capital_restant
+
+    # Agrégation annuelle (la dernière année peut être incomplète)
+    debuts_annees = np.arange(0, n_mois, 12)
+    interets_annuels = np.add.reduceat(interets, debuts_annees)
+    principal_annuel = np.add.reduceat(principal, debuts_annees)
+    capital_restant_annuel = capital_restant[np.minimum(debuts_annees + 11, n_mois - 1)]
+
+    tableaux = [interets, principal, capital_restant,
+                interets_annuels, principal_annuel, capital_restant_annuel]
+    for tableau in tableaux:
+        tableau.flags.writeable = False  # partagé via le cache
+    return EcheancierPret(float(mensualite), *tableaux)
+
+
+# --- Calcul intérêts réels sur 12 mois ---
+def calcul_interets_annuels(capital, taux_annuel, duree_annees):
+    echeancier = tableau_amortissement(capital, taux_annuel, duree_annees)
+    return float(echeancier.interets_annuels[0]), echeancier.mensualite
@@ -0,0 +1,129 @@
+"""Projection pluriannuelle par régime avec reports de déficit et d'amortissement."""
+
+from typing import NamedTuple
+
+import numpy as np
+
+from .bareme import impot_progressif, impot_progressif_batch
+from .parametres import PARAMETRES_DEFAUT
+from .pret import tableau_amortissement
+from .regimes import REGIMES, nom_regime
+from .revenus import calcul_revenu_foncier
+
+
+# --- Projection pluriannuelle avec reports de déficit et d'amortissement ---
+DUREE_REPORT_DEFICIT = 10
+
+
+class EtatReports(NamedTuple):
+    deficits_interets: tuple = ()      # ((année d'origine, montant), ...) reportables 10 ans
+    amortissement_reporte: float = 0.0  # Art. 39 C : reportable sans limite de durée
+
+
+def avancer_annee(etat, annee, type_loc, regime, loyers, charges_classiques, interets_emprunt,
+                  assurance_emprunteur, amortissement_annee, parametres=None):
+    if type_loc == "Meublée" and regime == "Reel":
+        # L'amortissement reporté s'ajoute à la dotation de l'année, sous le même plafond
+        res = calcul_revenu_foncier(loyers, charges_classiques, interets_emprunt, assurance_emprunteur,
+                                    type_loc, regime, amortissement_annee + etat.amortissement_reporte, parametres)
+        return etat._replace(amortissement_reporte=res.amortissement_non_deductible), res, res.revenu_imposable
+
+    res = calcul_revenu_foncier(loyers, charges_classiques, interets_emprunt, assurance_emprunteur,
+                                type_loc, regime, parametres=parametres)
+    if regime == "Micro":
+        return etat, res, res.revenu_imposable
+
+    # Location nue au réel : imputation des déficits non prescrits, les plus anciens d'abord
+    assiette = res.revenu_imposable
+    deficits = []
+    for annee_origine, montant in etat.deficits_interets:
+        if annee - annee_origine > DUREE_REPORT_DEFICIT:
+            continue
+        impute = min(montant, assiette)
+        assiette -= impute
+        if montant > impute:
+            deficits.append((annee_origine, montant - impute))
+    if res.deficit_interets > 0:
+        deficits.append((annee, res.deficit_interets))
+    return etat._replace(deficits_interets=tuple(deficits)), res, assiette
+
+
+def projection_pluriannuelle(nb_annees, RFR, parts, loyers, charges_classiques, capital, taux_annuel,
+                             duree_annees, assurance_emprunteur, prix_bien, frais_notaire,
+                             amortissement_bati, duree_amortissement_bati,
+                             amortissement_mobilier, duree_amortissement_mobilier,
+                             indexation_loyers=0.0, inflation_charges=0.0, parametres=None):
+    p = parametres or PARAMETRES_DEFAUT
+    annees = np.arange(1, nb_annees + 1)
+    echeancier = tableau_amortissement(capital, taux_annuel, duree_annees)
+    n_mois = len(echeancier.interets)
+    en_cours = annees <= len(echeancier.interets_annuels)
+
+    # Trajectoires annuelles communes à tous les régimes
+    loyers_annee = loyers * (1 + indexation_loyers) ** (annees - 1)
+    charges_annee = charges_classiques * (1 + inflation_charges) ** (annees - 1)
+    interets_annee = np.zeros(nb_annees)
+    interets_annee[en_cours] = echeancier.interets_annuels[annees[en_cours] - 1]
+    assurance_annee = np.where(en_cours, assurance_emprunteur, 0.0)
+    mois_payes = np.clip(n_mois - 12 * (annees - 1), 0, 12)
+    annuites_annee = echeancier.mensualite * mois_payes
+    amortissement_annee = (np.where(annees <= duree_amortissement_bati, amortissement_bati, 0.0)
+                           + np.where(annees <= duree_amortissement_mobilier, amortissement_mobilier, 0.0))
+
+    impots_base, _ = impot_progressif(RFR, parts, p)
+    cout_total_acquisition = prix_bien + frais_notaire
+
+    projections = {}
+    for type_loc, regime in REGIMES:
+        etat = EtatReports()
+        assiette = np.zeros(nb_annees)
+        deficit_global = np.zeros(nb_annees)
+        assiette_ps = np.zeros(nb_annees)
+        deficit_reportable = np.zeros(nb_annees)
+        amortissement_reporte = np.zeros(nb_annees)
+
+        # Seuls les reports sont séquentiels : une passe sur les années suffit pour tous les horizons
+        for i, annee in enumerate(annees):
+            amort = amortissement_annee[i] if type_loc == "Meublée" and regime == "Reel" else 0
+            etat, res, assiette[i] = avancer_annee(
+                etat, annee, type_loc, regime, loyers_annee[i], charges_annee[i],
+                interets_annee[i], assurance_annee[i], amort, p
+            )
+            deficit_global[i] = res.deficit_global
+            if type_loc == "Meublée" and regime == "Reel":
+                assiette_ps[i] = res.revenu_avant_amortissement
+            else:
+                assiette_ps[i] = assiette[i]
+            deficit_reportable[i] = sum(montant for _, montant in etat.deficits_interets)
+            amortissement_reporte[i] = etat.amortissement_reporte
+
+        # Impôt et prélèvements sociaux calculés en une passe vectorisée
+        total_impot = impot_progressif_batch(RFR - deficit_global + assiette, parts, parametres=p)
+        prelev_sociaux = np.maximum(0, assiette_ps) * p.taux_prelevements_sociaux
+        surcout_fiscal = total_impot + prelev_sociaux - impots_base
+        revenu_net_apres_impot = (loyers_annee - (charges_annee + interets_annee + assurance_annee)
+                                  - surcout_fiscal)
+        rendement_net = (revenu_net_apres_impot / cout_total_acquisition * 100
+                         if cout_total_acquisition else np.zeros(nb_annees))
+        cash_flow = loyers_annee - (charges_annee + annuites_annee) - surcout_fiscal
+
+        applicable = np.ones(nb_annees, dtype=bool)
+        if regime == "Micro":
+            applicable = loyers_annee <= p.plafonds_micro[type_loc]
+
+        colonnes = {
+            "assiette_imposable": assiette,
+            "impot_revenu": total_impot - impots_base,
+            "prelevements_sociaux": prelev_sociaux,
+            "surcout_fiscal": surcout_fiscal,
+            "rendement_net": rendement_net,
+            "cash_flow": cash_flow,
+            "deficit_reportable": deficit_reportable,
+            "amortissement_reporte": amortissement_reporte,
+        }
+        for valeurs in colonnes.values():
+            valeurs[~applicable] = np.nan
+        projections[f"{type_loc} - {nom_regime(type_loc, regime)}"] = {
+            "annee": annees, "loyers": loyers_annee, "applicable": applicable, **colonnes
+        }
+    return projections
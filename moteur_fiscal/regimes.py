@@ -0,0 +1,120 @@
+"""Comparaison des quatre régimes (Nue/Meublée × Micro/Réel) sur la première année."""
+
+from .bareme import impot_progressif
+from .parametres import PARAMETRES_DEFAUT
+from .resultats import ResultatRegime
+from .revenus import calcul_revenu_foncier
+
+REGIMES = [("Nue", "Micro"), ("Nue", "Reel"), ("Meublée", "Micro"), ("Meublée", "Reel")]
+# Valeurs de l'année par défaut (moteur_fiscal.parametres)
+PLAFONDS_MICRO = PARAMETRES_DEFAUT.plafonds_micro
+TAUX_PRELEVEMENTS_SOCIAUX = PARAMETRES_DEFAUT.taux_prelevements_sociaux
+
+
+def nom_regime(type_loc, regime):
+    if regime == "Micro":
+        return "micro-foncier" if type_loc == "Nue" else "micro-BIC"
+    return regime
+
+
+# --- Calcul des amortissements (LMNP) ---
+def calcul_amortissements(valeur_amortissable, duree_amortissement_bati,
+                          valeur_mobilier, duree_amortissement_mobilier):
+    amortissement_bati = valeur_amortissable / duree_amortissement_bati
+    amortissement_mobilier = valeur_mobilier / duree_amortissement_mobilier
+    return amortissement_bati, amortissement_mobilier, amortissement_bati + amortissement_mobilier
+
+
+# --- Étapes du calcul d'un régime ---
+# Découpage partagé par simuler_regimes et le graphe de calcul incrémental (moteur_fiscal.graphe)
+def regime_applicable(type_loc, regime, loyers, parametres=None):
+    p = parametres or PARAMETRES_DEFAUT
+    return not (regime == "Micro" and loyers > p.plafonds_micro[type_loc])
+
+
+def revenu_regime(type_loc, regime, loyers, charges_classiques, interets_emprunt, assurance_emprunteur,
+                  amortissement_total, parametres=None):
+    # L'amortissement ne s'applique qu'en meublé au réel
+    amort_a_appliquer = amortissement_total if (type_loc == "Meublée" and regime == "Reel") else 0
+    return calcul_revenu_foncier(
+        loyers, charges_classiques, interets_emprunt, assurance_emprunteur,
+        type_loc, regime, amort_a_appliquer, parametres
+    )
+
+
+def fiscalite_regime(type_loc, regime, res, RFR, parts, parametres=None):
+    p = parametres or PARAMETRES_DEFAUT
+    # Calcul de l'impact fiscal
+    revenu_total = RFR - res.deficit_global + res.revenu_imposable
+    total_impot, details = impot_progressif(revenu_total, parts, p)
+
+    # Calcul des prélèvements sociaux
+    if type_loc == "Meublée" and regime == "Reel":
+        # Pour le LMNP au réel, les PS sont calculés sur le revenu avant amortissement
+        assiette_ps = res.revenu_avant_amortissement
+    else:
+        # Pour les autres cas, sur le revenu imposable
+        assiette_ps = res.revenu_imposable
+
+    prelev_sociaux = max(0, assiette_ps) * p.taux_prelevements_sociaux  # On applique les PS uniquement sur les revenus positifs
+    return revenu_total, total_impot, details, prelev_sociaux
+
+
+def resultat_regime(type_loc, regime, res, fiscalite, impots_base, loyers, charges_classiques, interets_emprunt,
+                    assurance_emprunteur, mensualite, prix_bien, frais_notaire):
+    revenu_total, total_impot, details, prelev_sociaux = fiscalite
+    impot_total_avec_prelev = total_impot + prelev_sociaux
+    surcout_fiscal = impot_total_avec_prelev - impots_base
+
+    # Calcul du rendement net-net
+    cout_total_acquisition = prix_bien + frais_notaire
+    charges_totales = charges_classiques + interets_emprunt + assurance_emprunteur
+    revenu_net_apres_charges = loyers - charges_totales
+    revenu_net_apres_impot = revenu_net_apres_charges - surcout_fiscal
+    rendement_net = (revenu_net_apres_impot / cout_total_acquisition) * 100 if cout_total_acquisition else 0
+
+    # Calcul du cash-flow
+    mensualites_annuelles = mensualite * 12
+    charges_annuelles = charges_classiques + mensualites_annuelles
+    cash_flow_annuel = loyers - charges_annuelles - surcout_fiscal
+    cash_flow_mensuel = cash_flow_annuel / 12
+
+    return ResultatRegime(
+        type_loc=type_loc,
+        regime=regime,
+        regime_name=nom_regime(type_loc, regime),
+        applicable=True,
+        res=res,
+        revenu_total=revenu_total,
+        total_impot=total_impot,
+        details=details,
+        prelev_sociaux=prelev_sociaux,
+        impot_total_avec_prelev=impot_total_avec_prelev,
+        surcout_fiscal=surcout_fiscal,
+        revenu_net_apres_impot=revenu_net_apres_impot,
+        rendement_net=rendement_net,
+        cash_flow_annuel=cash_flow_annuel,
+        cash_flow_mensuel=cash_flow_mensuel,
+    )
+
+
+# --- Simulation des quatre régimes ---
+def simuler_regimes(RFR, parts, loyers, charges_classiques, interets_emprunt, assurance_emprunteur,
+                    mensualite, prix_bien, frais_notaire, amortissement_total, parametres=None):
+    p = parametres or PARAMETRES_DEFAUT
+    impots_base, _ = impot_progressif(RFR, parts, p)
+
+    resultats = []
+    for type_loc, regime in REGIMES:
+        # Vérification plafond micro
+        if not regime_applicable(type_loc, regime, loyers, p):
+            resultats.append(ResultatRegime(type_loc, regime, nom_regime(type_loc, regime), applicable=False))
+            continue
+
+        res = revenu_regime(type_loc, regime, loyers, charges_classiques, interets_emprunt, assurance_emprunteur,
+                            amortissement_total, p)
+        resultats.append(resultat_regime(
+            type_loc, regime, res, fiscalite_regime(type_loc, regime, res, RFR, parts, p), impots_base,
+            loyers, charges_classiques, interets_emprunt, assurance_emprunteur, mensualite, prix_bien, frais_notaire
+        ))
+    return resultats
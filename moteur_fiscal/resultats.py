@@ -0,0 +1,135 @@
+"""Structures de résultats compactes : enregistrements pour un scénario, table en colonnes pour un lot.
+
+- RevenuFoncier et ResultatRegime sont des NamedTuple (pas de dictionnaire par instance) ;
+- TableauRegimes range les indicateurs par colonne dans une seule matrice NumPy de forme
+  (nb_colonnes, nb_lignes) : chaque colonne est contiguë, et la conversion vers NumPy, pandas
+  ou Arrow se fait sans copie des valeurs numériques (pandas range justement un bloc de
+  colonnes de même type sous cette forme).
+pandas et pyarrow ne sont importés qu'à la conversion.
+"""
+
+from typing import NamedTuple
+
+import numpy as np
+
+
+class RevenuFoncier(NamedTuple):
+    revenu_brut: float
+    abattement_pct: float
+    revenu_imposable: float
+    charges_classiques: float
+    interets: float
+    assurance_pret: float
+    amortissement_total: float
+    amortissement_deductible: float
+    amortissement_non_deductible: float
+    revenu_apres_interets: float
+    revenu_apres_charges: float
+    revenu_avant_amortissement: float
+    deficit_global: float
+    deficit_interets: float
+
+
+class ResultatRegime(NamedTuple):
+    type_loc: str
+    regime: str
+    regime_name: str
+    applicable: bool
+    res: RevenuFoncier = None
+    revenu_total: float = float("nan")
+    total_impot: float = float("nan")
+    details: list = None
+    prelev_sociaux: float = float("nan")
+    impot_total_avec_prelev: float = float("nan")
+    surcout_fiscal: float = float("nan")
+    revenu_net_apres_impot: float = float("nan")
+    rendement_net: float = float("nan")
+    cash_flow_annuel: float = float("nan")
+    cash_flow_mensuel: float = float("nan")
+
+    @property
+    def libelle(self):
+        return f"{self.type_loc} - {self.regime_name}"
+
+
+COLONNES_TABLEAU = ("revenu_imposable", "total_impot", "prelev_sociaux", "surcout_fiscal",
+                    "revenu_net_apres_impot", "rendement_net", "cash_flow_annuel", "cash_flow_mensuel")
+_INDICE_COLONNE = {colonne: i for i, colonne in enumerate(COLONNES_TABLEAU)}
+
+
+class TableauRegimes:
+    # Une ligne par (scénario, régime) ; les régimes inapplicables valent NaN
+    __slots__ = ("libelles", "scenarios", "applicable", "valeurs")
+
+    def __init__(self, libelles, scenarios, applicable, valeurs):
+        self.libelles = np.asarray(libelles, dtype=object)
+        self.scenarios = np.asarray(scenarios, dtype=np.int64)
+        self.applicable = np.asarray(applicable, dtype=bool)
+        self.valeurs = np.asarray(valeurs, dtype=float)
+
+    @classmethod
+    def depuis_resultats(cls, resultats):
+        # Liste de ResultatRegime d'un seul scénario (simuler_regimes, simuler_scenario)
+        valeurs = np.array([[r.res.revenu_imposable if r.applicable else np.nan for r in resultats]]
+                           + [[getattr(r, c) for r in resultats] for c in COLONNES_TABLEAU[1:]], dtype=float)
+        return cls([r.libelle for r in resultats], np.zeros(len(resultats)), [r.applicable for r in resultats], valeurs)
+
+    @classmethod
+    def depuis_batch(cls, resultats_batch):
+        # Sortie de simuler_regimes_batch sur n scénarios : lignes groupées par régime (ordre de REGIMES),
+        # puis par scénario
+        regimes = list(resultats_batch)
+        n = np.size(resultats_batch[regimes[0]]["cash_flow_annuel"])
+        valeurs = np.empty((len(COLONNES_TABLEAU), len(regimes) * n))
+        applicable = np.empty(len(regimes) * n, dtype=bool)
+        for k, libelle in enumerate(regimes):
+            indicateurs = resultats_batch[libelle]
+            lignes = slice(k * n, (k + 1) * n)
+            applicable[lignes] = np.ravel(indicateurs["applicable"])
+            for colonne, i in _INDICE_COLONNE.items():
+                valeurs[i, lignes] = np.ravel(indicateurs[colonne])
+        valeurs[:, ~applicable] = np.nan
+        return cls(np.repeat(regimes, n), np.tile(np.arange(n), len(regimes)), applicable, valeurs)
+
+    @staticmethod
+    def indice(colonne):
+        # Ligne de la matrice valeurs portant cette colonne
+        return _INDICE_COLONNE[colonne]
+
+    def __len__(self):
+        return len(self.libelles)
+
+    def __getitem__(self, colonne):
+        return self.valeurs[_INDICE_COLONNE[colonne]]
+
+    def applicables(self):
+        return TableauRegimes(self.libelles[self.applicable], self.scenarios[self.applicable],
+                              self.applicable[self.applicable], self.valeurs[:, self.applicable])
+
+    def par_regime(self, libelle):
+        # Vue (sans copie) sur les lignes d'un régime : elles sont contiguës dans depuis_batch
+        lignes = np.flatnonzero(self.libelles == libelle)
+        return self.valeurs[:, lignes[0]:lignes[-1] + 1]
+
+    # --- Conversions ---
+    def vers_numpy(self):
+        return self.valeurs
+
+    def vers_pandas(self):
+        import pandas as pd
+
+        df = pd.DataFrame(self.valeurs.T, columns=list(COLONNES_TABLEAU), copy=False)
+        df.insert(0, "applicable", self.applicable)
+        df.insert(0, "scenario", self.scenarios)
+        df.insert(0, "regime", self.libelles)
+        return df
+
+    def vers_arrow(self):
+        import pyarrow as pa
+
+        return pa.table({
+            "regime": pa.array(self.libelles.tolist(), pa.string()),
+            "scenario": self.scenarios,
+            "applicable": self.applicable,
+            **{colonne: self.valeurs[i] for colonne, i in _INDICE_COLONNE.items()},
+        })
@@ -0,0 +1,92 @@
+"""Revenu foncier (location nue) ou BIC (location meublée) selon le régime."""
+
+from .parametres import PARAMETRES_DEFAUT
+from .resultats import RevenuFoncier
+
+
+# --- Calcul revenu foncier ou BIC ---
+def calcul_revenu_foncier(loyers, charges_classiques, interets_emprunt, assurance_emprunteur, 
+                          type_loc, regime, amortissement_total=0, parametres=None):
+    p = parametres or PARAMETRES_DEFAUT
+    revenu_brut = loyers
+    total_charges_pret = interets_emprunt + assurance_emprunteur
+    
+    if regime.startswith("Micro"):
+        abattement = p.abattements_micro[type_loc]
+        revenu_imposable = revenu_brut * (1 - abattement / 100)
+        return RevenuFoncier(
+            revenu_brut=revenu_brut,
+            abattement_pct=abattement,
+            revenu_imposable=revenu_imposable,
+            charges_classiques=0,
+            interets=interets_emprunt,
+            assurance_pret=assurance_emprunteur,
+            amortissement_total=0,
+            amortissement_deductible=0,
+            amortissement_non_deductible=0,
+            revenu_apres_interets=revenu_brut,
+            revenu_apres_charges=revenu_brut,
+            revenu_avant_amortissement=revenu_brut,
+            deficit_global=0,
+            deficit_interets=0,
+        )
+    else:
+        # Régime réel
+        revenu_apres_interets = revenu_brut - total_charges_pret
+        deficit_interets = max(0, total_charges_pret - revenu_brut)
+        revenu_apres_charges = revenu_apres_interets - charges_classiques
+        
+        # Pour location nue : déficit foncier classique
+        if type_loc == "Nue":
+            # Déficit imputable limité à 10 700 € en 2025 (charges hors intérêts)
+            # Les intérêts créent un déficit reportable séparément
+            deficit_charges_seules = max(0, charges_classiques - revenu_apres_interets)
+            deficit_global = min(deficit_charges_seules, p.plafond_deficit_foncier)
+            assiette_imposable = max(0, revenu_apres_charges)
+            
+            return RevenuFoncier(
+                revenu_brut=revenu_brut,
+                abattement_pct=0,
+                revenu_imposable=assiette_imposable,
+                charges_classiques=charges_classiques,
+                interets=interets_emprunt,
+                assurance_pret=assurance_emprunteur,
+                amortissement_total=0,
+                amortissement_deductible=0,
+                amortissement_non_deductible=0,
+                revenu_apres_interets=revenu_apres_interets,
+                revenu_apres_charges=revenu_apres_charges,
+                revenu_avant_amortissement=revenu_apres_charges,
+                deficit_global=deficit_global,
+                deficit_interets=deficit_interets,
+            )
+        
+        # Pour location meublée : amortissement avec limitation Art. 39 C
+        else:
+            revenu_avant_amortissement = revenu_apres_charges
+            
+            # Article 39 C du CGI : l'amortissement ne peut excéder
+            # la différence entre loyers et autres charges
+            plafond_amortissement = max(0, revenu_avant_amortissement)
+            amortissement_deductible = min(amortissement_total, plafond_amortissement)
+            amortissement_non_deductible = amortissement_total - amortissement_deductible
+            
+            revenu_apres_amortissement = revenu_avant_amortissement - amortissement_deductible
+            assiette_imposable = max(0, revenu_apres_amortissement)
+            
+            return RevenuFoncier(
+                revenu_brut=revenu_brut,
+                abattement_pct=0,
+                revenu_imposable=assiette_imposable,
+                charges_classiques=charges_classiques,
+                interets=interets_emprunt,
+                assurance_pret=assurance_emprunteur,
+                amortissement_total=amortissement_total,
+                amortissement_deductible=amortissement_deductible,
+                amortissement_non_deductible=amortissement_non_deductible,
+                revenu_apres_interets=revenu_apres_interets,
+                revenu_apres_charges=revenu_apres_charges,
+                revenu_avant_amortissement=revenu_avant_amortissement,
+                deficit_global=0,
+                deficit_interets=0,
+            )
@@ -0,0 +1,64 @@
+"""Scénario complet (saisies de la page) et simulation des quatre régimes à partir de ces saisies."""
+
+from .pret import calcul_interets_annuels
+from .regimes import calcul_amortissements, simuler_regimes
+
+# Valeurs par défaut des champs de la page de simulation
+SCENARIO_DEFAUT = {
+    "RFR": 50000,
+    "parts": 1,
+    "loyers": 10000,
+    "type_bien": "Appartement",
+    "prix_bien": 200000,
+    "type_achat": "Ancien",
+    "frais_notaire": None,            # par défaut : 8 % (ancien) ou 3 % (neuf) du prix
+    "valeur_terrain": None,           # par défaut : 15 % du prix pour une maison, 0 sinon
+    "duree_amortissement_bati": 25,
+    "valeur_mobilier": 10000,
+    "duree_amortissement_mobilier": 7,
+    "taxe_fonciere": 2000,
+    "provision_copro": 1000,
+    "assurances": 500,
+    "capital": 200000,
+    "taux_annuel": 2.0,
+    "duree_annees": 20,
+    "assurance_emprunteur": 600,
+}
+CHAMPS_TEXTE = ("type_bien", "type_achat")
+
+
+def normaliser_scenario(saisies):
+    scenario = dict(SCENARIO_DEFAUT)
+    scenario.update({cle: valeur for cle, valeur in saisies.items()
+                     if cle in SCENARIO_DEFAUT and valeur not in (None, "")})
+    for cle, valeur in scenario.items():
+        if cle not in CHAMPS_TEXTE and valeur is not None:
+            scenario[cle] = float(valeur)
+
+    if scenario["frais_notaire"] is None:
+        taux_notaire = 0.08 if scenario["type_achat"] == "Ancien" else 0.03
+        scenario["frais_notaire"] = float(int(scenario["prix_bien"] * taux_notaire))
+    if scenario["type_bien"] != "Maison individuelle":
+        scenario["valeur_terrain"] = 0.0
+    elif scenario["valeur_terrain"] is None:
+        scenario["valeur_terrain"] = float(int(scenario["prix_bien"] * 0.15))
+    return scenario
+
+
+def entrees_regimes(scenario):
+    # Arguments de simuler_regimes (et de simuler_regimes_batch) pour un scénario normalisé
+    interets_emprunt, mensualite = calcul_interets_annuels(
+        scenario["capital"], scenario["taux_annuel"], scenario["duree_annees"]
+    )
+    _, _, amortissement_total = calcul_amortissements(
+        scenario["prix_bien"] - scenario["valeur_terrain"], scenario["duree_amortissement_bati"],
+        scenario["valeur_mobilier"], scenario["duree_amortissement_mobilier"]
+    )
+    charges_classiques = scenario["taxe_fonciere"] + scenario["provision_copro"] + scenario["assurances"]
+    return (scenario["RFR"], scenario["parts"], scenario["loyers"], charges_classiques,
+            interets_emprunt, scenario["assurance_emprunteur"], mensualite,
+            scenario["prix_bien"], scenario["frais_notaire"], amortissement_total)
+
+
+def simuler_scenario(saisies, parametres=None):
+    return simuler_regimes(*entrees_regimes(normaliser_scenario(saisies)), parametres=parametres)
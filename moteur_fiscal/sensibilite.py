@@ -0,0 +1,50 @@
+"""Analyse de sensibilité : grille 2-D ou 3-D sur le taux, les loyers, le prix d'achat et le montant emprunté.
+
+Toute la grille est évaluée en une passe par simuler_regimes_batch. Quand le prix varie,
+les frais de notaire, la valeur du terrain et le montant emprunté varient dans la même
+proportion (même structure de financement que le scénario de départ), sauf si le montant
+emprunté est lui-même un axe de la grille.
+"""
+
+import numpy as np
+
+from .scenario import normaliser_scenario
+from .vectoriel import echeance_batch, simuler_regimes_batch
+
+AXES_SENSIBILITE = ("taux_annuel", "loyers", "prix_bien", "capital")
+
+
+def grille_sensibilite(saisies, parametres=None, **axes):
+    scenario = normaliser_scenario(saisies)
+    inconnus = set(axes) - set(AXES_SENSIBILITE)
+    if inconnus:
+        raise ValueError(f"Axes de sensibilité inconnus : {', '.join(sorted(inconnus))}")
+
+    # Un axe par dimension, dans l'ordre des arguments ; grilles creuses diffusées par NumPy
+    noms = list(axes)
+    grilles = dict(zip(noms, np.meshgrid(*(np.asarray(axes[n], dtype=float) for n in noms),
+                                         indexing="ij", sparse=True)))
+    taux_annuel = grilles.get("taux_annuel", scenario["taux_annuel"])
+    loyers = grilles.get("loyers", scenario["loyers"])
+    echelle_prix = grilles.get("prix_bien", scenario["prix_bien"]) / scenario["prix_bien"]
+
+    prix_bien = scenario["prix_bien"] * echelle_prix
+    frais_notaire = scenario["frais_notaire"] * echelle_prix
+    valeur_terrain = scenario["valeur_terrain"] * echelle_prix
+    capital = grilles.get("capital", scenario["capital"] * echelle_prix)
+
+    interets_emprunt, mensualite = echeance_batch(capital, taux_annuel, scenario["duree_annees"])
+    amortissement_total = ((prix_bien - valeur_terrain) / scenario["duree_amortissement_bati"]
+                           + scenario["valeur_mobilier"] / scenario["duree_amortissement_mobilier"])
+    charges_classiques = scenario["taxe_fonciere"] + scenario["provision_copro"] + scenario["assurances"]
+
+    regimes = simuler_regimes_batch(
+        scenario["RFR"], scenario["parts"], loyers, charges_classiques, interets_emprunt,
+        scenario["assurance_emprunteur"], mensualite, prix_bien, frais_notaire, amortissement_total,
+        parametres=parametres
+    )
+    forme = tuple(len(axes[n]) for n in noms)
+    for indicateurs in regimes.values():
+        for cle, valeurs in indicateurs.items():
+            indicateurs[cle] = np.broadcast_to(valeurs, forme)
+    return {"axes": {n: np.asarray(axes[n], dtype=float) for n in noms}, "regimes": regimes}
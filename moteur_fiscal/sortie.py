@@ -0,0 +1,172 @@
+"""Revente du bien : plus-value, produit net et TRI pour chaque année de sortie possible.
+
+Pour une revente à la fin de l'année n (n = 1 à 30), le calcul suit le régime des plus-values
+immobilières des particuliers, qui s'applique aussi au LMNP :
+- prix d'acquisition majoré des frais d'acquisition (réels ou forfait de 7,5 %) et, après cinq ans
+  de détention, du forfait travaux de 15 % ;
+- en LMNP au réel, les amortissements du bâti effectivement déduits sont retranchés du prix
+  d'acquisition (réintégration, Art. 150 VB du CGI) ;
+- abattements pour durée de détention (exonération d'impôt après 22 ans, de prélèvements sociaux
+  après 30 ans), impôt de 19 %, prélèvements sociaux de 17,2 % et surtaxe au-delà de 50 000 € ;
+- remboursement du capital restant dû et indemnités de remboursement anticipé.
+
+Les flux annuels viennent de projection_pluriannuelle (reports compris), calculée une fois sur
+30 ans. Toutes les années de sortie de tous les régimes forment une matrice évaluée en une
+passe, y compris la recherche du TRI (dichotomie menée en parallèle sur chaque ligne).
+"""
+
+import numpy as np
+
+from .parametres import PARAMETRES_DEFAUT
+from .pret import tableau_amortissement
+from .projection import projection_pluriannuelle
+from .regimes import calcul_amortissements
+from .scenario import normaliser_scenario
+
+ANNEES_SORTIE = 30
+TAUX_IMPOT_PLUS_VALUE = 0.19
+TAUX_PS_PLUS_VALUE = 0.172
+FORFAIT_FRAIS_ACQUISITION = 0.075
+FORFAIT_TRAVAUX = 0.15  # au-delà de cinq ans de détention
+# Surtaxe sur les plus-values imposables de plus de 50 000 € : (borne basse, borne haute, taux, lissage)
+# sur chaque tranche lissée, surtaxe = taux × PV − lissage × (borne haute − PV)
+SURTAXE_PLUS_VALUE = (
+    (50000, 60000, 0.02, 1 / 20), (60000, 100000, 0.02, 0.0),
+    (100000, 110000, 0.03, 1 / 10), (110000, 150000, 0.03, 0.0),
+    (150000, 160000, 0.04, 15 / 100), (160000, 200000, 0.04, 0.0),
+    (200000, 210000, 0.05, 20 / 100), (210000, 250000, 0.05, 0.0),
+    (250000, 260000, 0.06, 25 / 100), (260000, np.inf, 0.06, 0.0),
+)
+SURTAXE_BAS, SURTAXE_HAUT, SURTAXE_TAUX, SURTAXE_LISSAGE = (np.array(c, dtype=float) for c in zip(*SURTAXE_PLUS_VALUE))
+
+
+def abattements_detention(annees):
+    # Abattements (fractions) pour durée de détention : 6 % par an de la 6e à la 21e année, 4 % la 22e
+    # (impôt) ; 1,65 % par an de la 6e à la 21e, 1,60 % la 22e, 9 % par an ensuite (prélèvements sociaux)
+    annees = np.asarray(annees)
+    au_dela_5 = np.clip(annees - 5, 0, 16)
+    annee_22 = annees >= 22
+    abattement_ir = 0.06 * au_dela_5 + 0.04 * annee_22
+    abattement_ps = 0.0165 * au_dela_5 + 0.016 * annee_22 + 0.09 * np.clip(annees - 22, 0, 8)
+    return np.minimum(abattement_ir, 1.0), np.minimum(abattement_ps, 1.0)
+
+
+def surtaxe_plus_value(plus_value_imposable):
+    plus_value_imposable = np.asarray(plus_value_imposable, dtype=float)
+    i = np.searchsorted(SURTAXE_BAS, plus_value_imposable, side="left") - 1
+    k = np.maximum(i, 0)
+    surtaxe = (SURTAXE_TAUX[k] * plus_value_imposable
+               - SURTAXE_LISSAGE[k] * np.where(np.isfinite(SURTAXE_HAUT[k]), SURTAXE_HAUT[k] - plus_value_imposable, 0))
+    return np.where(i >= 0, surtaxe, 0.0)
+
+
+def tri_par_sortie(mise, flux, produits, taux_min=-0.99, taux_max=1.0, iterations=60, elargissements=12):
+    # TRI annuel de chaque ligne (..., n) : pour la sortie en fin d'année j, flux −mise, flux[1..j],
+    # puis produits[j] ; dichotomie sur toutes les lignes à la fois. La borne haute est doublée pour
+    # les lignes sans changement de signe (rentabilités très élevées, apport faible ou nul) ; NaN si
+    # aucun taux n'annule la valeur actuelle (flux tous de même signe) ou si un flux est NaN
+    flux = np.asarray(flux, dtype=float)
+    produits = np.asarray(produits, dtype=float)
+    n = flux.shape[-1]
+    annees = np.arange(1, n + 1)
+    avant_sortie = annees[np.newaxis, :] <= annees[:, np.newaxis]  # (sortie, année)
+
+    def valeur_actuelle(taux):
+        actualisation = (1 + taux[..., np.newaxis]) ** -annees  # (..., sortie, année)
+        flux_actualises = np.where(avant_sortie, flux[..., np.newaxis, :] * actualisation, 0.0).sum(axis=-1)
+        return -mise + flux_actualises + produits * actualisation[..., annees - 1, annees - 1]
+
+    bas = np.full(produits.shape, taux_min)
+    haut = np.full(produits.shape, taux_max)
+    with np.errstate(invalid="ignore", over="ignore", divide="ignore"):
+        valeur_bas = valeur_actuelle(bas)
+        encadre = np.sign(valeur_bas) * np.sign(valeur_actuelle(haut)) < 0
+        for _ in range(elargissements):
+            a_elargir = ~encadre & np.isfinite(valeur_bas)
+            if not a_elargir.any():
+                break
+            haut = np.where(a_elargir, haut * 2, haut)
+            encadre = np.sign(valeur_bas) * np.sign(valeur_actuelle(haut)) < 0
+        for _ in range(iterations):
+            milieu = (bas + haut) / 2
+            valeur_milieu = valeur_actuelle(milieu)
+            meme_signe = np.sign(valeur_milieu) == np.sign(valeur_bas)
+            bas = np.where(meme_signe, milieu, bas)
+            valeur_bas = np.where(meme_signe, valeur_milieu, valeur_bas)
+            haut = np.where(meme_signe, haut, milieu)
+    return np.where(encadre, (bas + haut) / 2, np.nan)
+
+
+def simuler_sorties(saisies, revalorisation_prix=0.0, frais_vente=0.0, indexation_loyers=0.0,
+                    inflation_charges=0.0, nb_annees=ANNEES_SORTIE, parametres=None):
+    # revalorisation_prix, frais_vente (part du prix de vente), indexation_loyers et inflation_charges
+    # sont des fractions (0.02 pour 2 %)
+    p = parametres or PARAMETRES_DEFAUT
+    scenario = normaliser_scenario(saisies)
+    annees = np.arange(1, nb_annees + 1)
+    amortissement_bati, amortissement_mobilier, _ = calcul_amortissements(
+        scenario["prix_bien"] - scenario["valeur_terrain"], scenario["duree_amortissement_bati"],
+        scenario["valeur_mobilier"], scenario["duree_amortissement_mobilier"]
+    )
+    charges_classiques = scenario["taxe_fonciere"] + scenario["provision_copro"] + scenario["assurances"]
+    projections = projection_pluriannuelle(
+        nb_annees, scenario["RFR"], scenario["parts"], scenario["loyers"], charges_classiques,
+        scenario["capital"], scenario["taux_annuel"], scenario["duree_annees"], scenario["assurance_emprunteur"],
+        scenario["prix_bien"], scenario["frais_notaire"], amortissement_bati, scenario["duree_amortissement_bati"],
+        amortissement_mobilier, scenario["duree_amortissement_mobilier"], indexation_loyers, inflation_charges, p
+    )
+    regimes = list(projections)
+
+    # Communs à tous les régimes (vecteurs par année de sortie)
+    prix_vente = scenario["prix_bien"] * (1 + revalorisation_prix) ** annees
+    prix_acquisition = (scenario["prix_bien"]
+                        + max(scenario["frais_notaire"], FORFAIT_FRAIS_ACQUISITION * scenario["prix_bien"])
+                        + np.where(annees > 5, FORFAIT_TRAVAUX * scenario["prix_bien"], 0.0))
+    echeancier = tableau_amortissement(scenario["capital"], scenario["taux_annuel"], scenario["duree_annees"])
+    en_cours = annees <= len(echeancier.capital_restant_annuel)
+    capital_restant_du = np.zeros(nb_annees)
+    capital_restant_du[en_cours] = echeancier.capital_restant_annuel[annees[en_cours] - 1]
+    indemnites = np.minimum(capital_restant_du * scenario["taux_annuel"] / 100 / 2, 0.03 * capital_restant_du)
+    abattement_ir, abattement_ps = abattements_detention(annees)
+
+    # Amortissements du bâti déduits à la fin de chaque année (LMNP au réel) : dotations cumulées moins
+    # le reliquat reporté, la part du bâti étant celle des dotations
+    dotations_bati = np.cumsum(np.where(annees <= scenario["duree_amortissement_bati"], amortissement_bati, 0.0))
+    dotations = dotations_bati + np.cumsum(
+        np.where(annees <= scenario["duree_amortissement_mobilier"], amortissement_mobilier, 0.0))
+    reintegration = np.zeros((len(regimes), nb_annees))
+    for i, libelle in enumerate(regimes):
+        if libelle.startswith("Meublée") and not libelle.endswith("micro-BIC"):
+            deduits = dotations - projections[libelle]["amortissement_reporte"]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                reintegration[i] = np.where(dotations > 0, deduits * dotations_bati / dotations, 0.0)
+
+    # Matrices (régime, année de sortie)
+    plus_value = np.maximum(0.0, prix_vente * (1 - frais_vente) - (prix_acquisition - reintegration))
+    plus_value_ir = plus_value * (1 - abattement_ir)
+    impot_plus_value = (plus_value_ir * TAUX_IMPOT_PLUS_VALUE + surtaxe_plus_value(plus_value_ir)
+                        + plus_value * (1 - abattement_ps) * TAUX_PS_PLUS_VALUE)
+    produit_net = prix_vente * (1 - frais_vente) - impot_plus_value - capital_restant_du - indemnites
+    flux = np.array([projections[libelle]["cash_flow"] for libelle in regimes])
+    apport = scenario["prix_bien"] + scenario["frais_notaire"] - scenario["capital"]
+    gain_net = produit_net + np.cumsum(flux, axis=1) - apport
+    tri = tri_par_sortie(apport, flux, produit_net)
+
+    return {
+        "annee": annees,
+        "apport": apport,
+        "prix_vente": prix_vente,
+        "capital_restant_du": capital_restant_du,
+        "indemnites_remboursement": indemnites,
+        "abattement_ir": abattement_ir,
+        "abattement_ps": abattement_ps,
+        "regimes": {libelle: {
+            "applicable": projections[libelle]["applicable"],
+            "amortissements_reintegres": reintegration[i],
+            "plus_value": plus_value[i],
+            "impot_plus_value": impot_plus_value[i],
+            "produit_net": produit_net[i],
+            "gain_net": gain_net[i],
+            "tri": tri[i] * 100,
+        } for i, libelle in enumerate(regimes)},
+    }
@@ -0,0 +1,203 @@
+"""Archive locale des scénarios simulés (SQLite), indexée par l'empreinte des saisies normalisées.
+
+Chaque scénario est une ligne de la table « scenarios » (client, bien, dates, saisies en JSON) ;
+ses artefacts (résultats des régimes, projection, images des graphiques, PDF) sont rangés à part
+dans la table « artefacts », de sorte que la liste des scénarios ne lit jamais de BLOB. Un même
+scénario enregistré deux fois reste une seule ligne : seuls son libellé et sa date de
+modification sont mis à jour, ses artefacts complétés.
+Recharger un scénario rend ses artefacts tels qu'ils ont été calculés, sans nouvelle simulation.
+
+Emplacement de la base : SIMULATEUR_ARCHIVE (par défaut scenarios.sqlite3 dans le dossier courant).
+"""
+
+import io
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from .resultats import ResultatRegime, RevenuFoncier
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scenarios (
+    cle TEXT PRIMARY KEY,
+    client TEXT NOT NULL DEFAULT '' COLLATE NOCASE,
+    bien TEXT NOT NULL DEFAULT '' COLLATE NOCASE,
+    cree_le TEXT NOT NULL,
+    modifie_le TEXT NOT NULL,
+    saisies TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scenarios_client ON scenarios (client, modifie_le);
+CREATE INDEX IF NOT EXISTS scenarios_bien ON scenarios (bien, modifie_le);
+CREATE INDEX IF NOT EXISTS scenarios_date ON scenarios (modifie_le);
+CREATE TABLE IF NOT EXISTS artefacts (
+    cle TEXT NOT NULL REFERENCES scenarios (cle) ON DELETE CASCADE,
+    nom TEXT NOT NULL,
+    contenu BLOB NOT NULL,
+    PRIMARY KEY (cle, nom)
+) WITHOUT ROWID;
+"""
+
+COLONNES_LISTE = ("cle", "client", "bien", "cree_le", "modifie_le")
+
+
+# --- Sérialisation des artefacts ---
+def resultats_vers_octets(resultats):
+    # Liste de ResultatRegime -> JSON (les NaN des régimes inapplicables sont conservés)
+    return json.dumps([{**r._asdict(), "res": r.res._asdict() if r.res is not None else None}
+                       for r in resultats], ensure_ascii=False).encode()
+
+
+def resultats_depuis_octets(contenu):
+    return [ResultatRegime(**{**r, "res": RevenuFoncier(**r["res"]) if r["res"] is not None else None,
+                              "details": [tuple(d) for d in r["details"]] if r["details"] is not None else None})
+            for r in json.loads(contenu)]
+
+
+def projection_vers_octets(projections):
+    # {régime: {colonne: tableau NumPy}} -> archive .npz (types et valeurs exacts)
+    tampon = io.BytesIO()
+    np.savez(tampon, **{f"{regime}|{colonne}": valeurs
+                        for regime, proj in projections.items() for colonne, valeurs in proj.items()})
+    return tampon.getvalue()
+
+
+def projection_depuis_octets(contenu):
+    projections = {}
+    with np.load(io.BytesIO(contenu), allow_pickle=False) as archive:
+        for nom in archive.files:
+            regime, colonne = nom.split("|", 1)
+            projections.setdefault(regime, {})[colonne] = archive[nom]
+    return projections
+
+
+SERIALISEURS = {
+    "regimes": (resultats_vers_octets, resultats_depuis_octets),
+    "projection": (projection_vers_octets, projection_depuis_octets),
+}
+
+
+class ArchiveScenarios:
+    def __init__(self, chemin=None):
+        self.chemin = chemin or os.environ.get("SIMULATEUR_ARCHIVE", "scenarios.sqlite3")
+        # Une connexion par archive, partagée entre les sessions sous verrou
+        self._connexion = sqlite3.connect(self.chemin, check_same_thread=False)
+        self._verrou = threading.Lock()
+        with self._verrou, self._connexion as c:
+            c.execute("PRAGMA foreign_keys = ON")
+            if self.chemin != ":memory:":
+                c.execute("PRAGMA journal_mode = WAL")
+            c.executescript(SCHEMA)
+
+    def enregistrer(self, cle, saisies, client="", bien="", artefacts=None):
+        # Renvoie True si le scénario est nouveau, False s'il était déjà archivé
+        maintenant = datetime.now().isoformat(timespec="seconds")
+        contenus = [(cle, nom, sqlite3.Binary(self._encoder(nom, valeur)))
+                    for nom, valeur in (artefacts or {}).items() if valeur is not None]
+        with self._verrou, self._connexion as c:
+            nouveau = c.execute(
+                "INSERT OR IGNORE INTO scenarios (cle, client, bien, cree_le, modifie_le, saisies)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (cle, client, bien, maintenant, maintenant, json.dumps(saisies, ensure_ascii=False)),
+            ).rowcount == 1
+            if not nouveau:
+                c.execute("UPDATE scenarios SET client = coalesce(nullif(?, ''), client),"
+                          " bien = coalesce(nullif(?, ''), bien), modifie_le = ? WHERE cle = ?",
+                          (client, bien, maintenant, cle))
+            c.executemany("INSERT OR REPLACE INTO artefacts (cle, nom, contenu) VALUES (?, ?, ?)", contenus)
+        return nouveau
+
+    def completer(self, cle, artefacts):
+        # Ajoute ou remplace des artefacts d'un scénario déjà archivé ; False s'il ne l'est pas
+        contenus = [(cle, nom, sqlite3.Binary(self._encoder(nom, valeur)))
+                    for nom, valeur in artefacts.items() if valeur is not None]
+        with self._verrou, self._connexion as c:
+            if c.execute("SELECT 1 FROM scenarios WHERE cle = ?", (cle,)).fetchone() is None:
+                return False
+            c.executemany("INSERT OR REPLACE INTO artefacts (cle, nom, contenu) VALUES (?, ?, ?)", contenus)
+        return True
+
+    def lister(self, client=None, bien=None, depuis=None, jusqu_a=None, limite=1000):
+        # Métadonnées seulement, les plus récentes d'abord ; client et bien filtrent par préfixe
+        conditions, parametres = [], []
+        if client:
+            conditions.append("client LIKE ? ESCAPE '\\'")
+            parametres.append(self._prefixe(client))
+        if bien:
+            conditions.append("bien LIKE ? ESCAPE '\\'")
+            parametres.append(self._prefixe(bien))
+        if depuis:
+            conditions.append("modifie_le >= ?")
+            parametres.append(str(depuis))
+        if jusqu_a:
+            conditions.append("modifie_le < ?")
+            parametres.append(str(jusqu_a))
+        requete = f"SELECT {', '.join(COLONNES_LISTE)} FROM scenarios"
+        if conditions:
+            requete += " WHERE " + " AND ".join(conditions)
+        requete += " ORDER BY modifie_le DESC, rowid DESC LIMIT ?"
+        with self._verrou:
+            lignes = self._connexion.execute(requete, (*parametres, limite)).fetchall()
+        return [dict(zip(COLONNES_LISTE, ligne)) for ligne in lignes]
+
+    def charger(self, cle, artefacts=None):
+        # Scénario archivé avec ses artefacts décodés (tous, ou seulement ceux nommés), None s'il est inconnu
+        with self._verrou:
+            ligne = self._connexion.execute(
+                f"SELECT {', '.join(COLONNES_LISTE)}, saisies FROM scenarios WHERE cle = ?", (cle,)
+            ).fetchone()
+            if ligne is None:
+                return None
+            requete, parametres = "SELECT nom, contenu FROM artefacts WHERE cle = ?", [cle]
+            if artefacts is not None:
+                requete += f" AND nom IN ({', '.join('?' * len(artefacts))})"
+                parametres.extend(artefacts)
+            contenus = self._connexion.execute(requete, parametres).fetchall()
+        scenario = dict(zip(COLONNES_LISTE, ligne[:-1]))
+        scenario["saisies"] = json.loads(ligne[-1])
+        scenario["artefacts"] = {nom: self._decoder(nom, contenu) for nom, contenu in contenus}
+        return scenario
+
+    def supprimer(self, cle):
+        with self._verrou, self._connexion as c:
+            return c.execute("DELETE FROM scenarios WHERE cle = ?", (cle,)).rowcount == 1
+
+    def fermer(self):
+        with self._verrou:
+            self._connexion.close()
+
+    def __contains__(self, cle):
+        with self._verrou:
+            return self._connexion.execute("SELECT 1 FROM scenarios WHERE cle = ?", (cle,)).fetchone() is not None
+
+    def __len__(self):
+        with self._verrou:
+            return self._connexion.execute("SELECT count(*) FROM scenarios").fetchone()[0]
+
+    @staticmethod
+    def _prefixe(texte):
+        return texte.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+    @staticmethod
+    def _encoder(nom, valeur):
+        return SERIALISEURS[nom][0](valeur) if nom in SERIALISEURS else bytes(valeur)
+
+    @staticmethod
+    def _decoder(nom, contenu):
+        return SERIALISEURS[nom][1](contenu) if nom in SERIALISEURS else bytes(contenu)
+
+
+_archive = None
+_verrou_archive = threading.Lock()
+
+
+def archive_scenarios():
+    # Archive partagée par tout le processus, ouverte à la première utilisation
+    global _archive
+    with _verrou_archive:
+        if _archive is None:
+            _archive = ArchiveScenarios()
+        return _archive
@@ -0,0 +1,113 @@
+"""Version vectorisée (NumPy) de la comparaison des quatre régimes.
+
+Même logique que calcul_revenu_foncier et simuler_regimes, mais chaque entrée peut être un
+tableau : les entrées sont diffusées (broadcasting) les unes contre les autres, ce qui permet
+d'évaluer des grilles ou des milliers de tirages en une seule passe.
+"""
+
+import numpy as np
+
+from .bareme import impot_progressif_batch
+from .parametres import PARAMETRES_DEFAUT
+from .regimes import REGIMES, nom_regime
+
+PLAFOND_DEFICIT_FONCIER = PARAMETRES_DEFAUT.plafond_deficit_foncier
+
+
+# --- Prêt : intérêts de la première année et mensualité ---
+def echeance_batch(capital, taux_annuel, duree_annees):
+    capital = np.asarray(capital, dtype=float)
+    taux_mensuel = np.asarray(taux_annuel, dtype=float) / 100 / 12
+    n_mois = np.rint(np.asarray(duree_annees, dtype=float) * 12)
+
+    taux_nul = taux_mensuel == 0
+    r = np.where(taux_nul, 1.0, taux_mensuel)  # évite la division par zéro, corrigé ci-dessous
+    mensualite = np.where(taux_nul, capital / n_mois, capital * (r / (1 - (1 + r) ** -n_mois)))
+
+    # Capital restant dû au début de chacun des 12 premiers mois (formule fermée), axe final = mois
+    k = np.arange(12)
+    facteur = (1 + r[..., np.newaxis]) ** k
+    capital_debut = capital[..., np.newaxis] * facteur - mensualite[..., np.newaxis] * (facteur - 1) / r[..., np.newaxis]
+    interets = np.where(k < n_mois[..., np.newaxis], capital_debut * taux_mensuel[..., np.newaxis], 0.0)
+    return interets.sum(axis=-1), mensualite
+
+
+# --- Revenu imposable par régime ---
+def calcul_revenu_foncier_batch(loyers, charges_classiques, interets_emprunt, assurance_emprunteur,
+                                type_loc, regime, amortissement_total=0, parametres=None):
+    p = parametres or PARAMETRES_DEFAUT
+    loyers = np.asarray(loyers, dtype=float)
+    zeros = np.zeros_like(loyers)
+
+    if regime == "Micro":
+        abattement = p.abattements_micro[type_loc]
+        revenu_imposable = loyers * (1 - abattement / 100)
+        return {"revenu_imposable": revenu_imposable, "assiette_ps": revenu_imposable,
+                "deficit_global": zeros, "deficit_interets": zeros, "amortissement_non_deductible": zeros}
+
+    total_charges_pret = interets_emprunt + assurance_emprunteur
+    revenu_apres_interets = loyers - total_charges_pret
+    revenu_apres_charges = revenu_apres_interets - charges_classiques
+
+    if type_loc == "Nue":
+        deficit_charges_seules = np.maximum(0, charges_classiques - revenu_apres_interets)
+        assiette_imposable = np.maximum(0, revenu_apres_charges)
+        return {"revenu_imposable": assiette_imposable, "assiette_ps": assiette_imposable,
+                "deficit_global": np.minimum(deficit_charges_seules, p.plafond_deficit_foncier),
+                "deficit_interets": np.maximum(0, total_charges_pret - loyers),
+                "amortissement_non_deductible": zeros}
+
+    # Meublé : amortissement plafonné (Art. 39 C), PS sur le revenu avant amortissement
+    plafond_amortissement = np.maximum(0, revenu_apres_charges)
+    amortissement_deductible = np.minimum(amortissement_total, plafond_amortissement)
+    return {"revenu_imposable": np.maximum(0, revenu_apres_charges - amortissement_deductible),
+            "assiette_ps": revenu_apres_charges, "deficit_global": zeros, "deficit_interets": zeros,
+            "amortissement_non_deductible": amortissement_total - amortissement_deductible}
+
+
+# --- Simulation des quatre régimes ---
+def simuler_regimes_batch(RFR, parts, loyers, charges_classiques, interets_emprunt, assurance_emprunteur,
+                          mensualite, prix_bien, frais_notaire, amortissement_total, regimes=REGIMES,
+                          parametres=None):
+    p = parametres or PARAMETRES_DEFAUT
+    loyers, charges_classiques, interets_emprunt, mensualite, prix_bien, frais_notaire = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) for x in (loyers, charges_classiques, interets_emprunt, mensualite,
+                                                prix_bien, frais_notaire))
+    )
+    impots_base = impot_progressif_batch(RFR, parts, parametres=p)
+    cout_total_acquisition = prix_bien + frais_notaire
+    charges_totales = charges_classiques + interets_emprunt + assurance_emprunteur
+    charges_annuelles = charges_classiques + mensualite * 12
+
+    resultats = {}
+    for type_loc, regime in regimes:
+        amort_a_appliquer = amortissement_total if (type_loc == "Meublée" and regime == "Reel") else 0
+        res = calcul_revenu_foncier_batch(loyers, charges_classiques, interets_emprunt, assurance_emprunteur,
+                                          type_loc, regime, amort_a_appliquer, p)
+        total_impot = impot_progressif_batch(RFR - res["deficit_global"] + res["revenu_imposable"], parts,
+                                             parametres=p)
+        prelev_sociaux = np.maximum(0, res["assiette_ps"]) * p.taux_prelevements_sociaux
+        surcout_fiscal = total_impot + prelev_sociaux - impots_base
+        revenu_net_apres_impot = loyers - charges_totales - surcout_fiscal
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rendement_net = np.where(cout_total_acquisition != 0,
+                                     revenu_net_apres_impot / cout_total_acquisition * 100, 0.0)
+        cash_flow_annuel = loyers - charges_annuelles - surcout_fiscal
+
+        applicable = np.ones(loyers.shape, dtype=bool)
+        if regime == "Micro":
+            applicable = loyers <= p.plafonds_micro[type_loc]
+
+        resultats[f"{type_loc} - {nom_regime(type_loc, regime)}"] = {
+            "applicable": applicable,
+            "revenu_imposable": res["revenu_imposable"],
+            "total_impot": total_impot,
+            "prelev_sociaux": prelev_sociaux,
+            "surcout_fiscal": surcout_fiscal,
+            "revenu_net_apres_impot": revenu_net_apres_impot,
+            "rendement_net": rendement_net,
+            "cash_flow_annuel": cash_flow_annuel,
+            "cash_flow_mensuel": cash_flow_annuel / 12,
+            "amortissement_non_deductible": res["amortissement_non_deductible"],
+        }
+    return resultats
@@ -0,0 +1 @@
+"""Rendus du simulateur (graphiques, rapports PDF), importés à la demande depuis la page."""
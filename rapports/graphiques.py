@@ -0,0 +1,125 @@
+"""Graphiques comparatifs des régimes, rendus en PNG ou SVG et mis en cache.
+
+Les figures sont construites avec l'API objet de matplotlib (sans pyplot) : elles ne sont
+enregistrées dans aucun état global et sont libérées dès que l'image est produite, ce qui
+évite toute accumulation de figures sur un serveur Streamlit de longue durée.
+"""
+
+import hashlib
+import io
+import json
+import os
+
+import numpy as np
+from matplotlib.figure import Figure
+
+from moteur_fiscal.cache import CacheResultats
+from moteur_fiscal.graphe import Noeud
+
+COULEURS = ["#1f6f4a", "#3c9b70", "#b69329", "#d4af37"]
+
+# Images indexées par les données affichées : une page et son PDF partagent le même rendu. C'est là,
+# et non dans les sessions, que réside la mémoire des images : volume borné (SIMULATEUR_CACHE_GRAPHIQUES, en Mo)
+cache_graphiques = CacheResultats(octets=int(os.environ.get("SIMULATEUR_CACHE_GRAPHIQUES", 64)) * 1024 * 1024)
+
+
+def empreinte_donnees(tableau):
+    # Régimes applicables d'un TableauRegimes : libellés et valeurs affichées
+    tableau = tableau.applicables()
+    empreinte = hashlib.sha256(json.dumps(tableau.libelles.tolist(), ensure_ascii=False).encode())
+    for colonne in ("surcout_fiscal", "rendement_net", "revenu_net_apres_impot"):
+        empreinte.update(np.ascontiguousarray(tableau[colonne]).tobytes())
+    return empreinte.hexdigest()
+
+
+def rendre_figure(fig, format="png"):
+    buffer = io.BytesIO()
+    try:
+        fig.savefig(buffer, format=format, bbox_inches="tight", dpi=200)
+    finally:
+        fig.clear()
+    return buffer.getvalue()
+
+
+def _figure_barres(types, valeurs, ylabel, titre, **etiquettes):
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    bars = ax.bar(list(types), list(valeurs), color=COULEURS)
+    ax.set_ylabel(ylabel)
+    ax.set_title(titre)
+    for label in ax.get_xticklabels():
+        label.set_rotation(45)
+        label.set_horizontalalignment("right")
+    ax.bar_label(bars, label_type="center", color="white", fontweight="bold", fontsize=10, **etiquettes)
+    fig.tight_layout()
+    return fig
+
+
+def _figure_surcout(tableau):
+    tableau = tableau.applicables()
+    return _figure_barres(tableau.libelles, tableau["surcout_fiscal"], "Montant (€)",
+                          "Surcoût fiscal induit par l'investissement selon le régime", fmt="%.0f €")
+
+
+def _figure_rendement(tableau):
+    tableau = tableau.applicables()
+    return _figure_barres(tableau.libelles, tableau["rendement_net"], "Rendement net (%)",
+                          "Rendement net après impôts (%)",
+                          labels=[f"{v:.0f} €" for v in tableau["revenu_net_apres_impot"]])
+
+
+def graphique_surcout(tableau, format="png"):
+    return cache_graphiques.obtenir(empreinte_donnees(tableau), f"surcout.{format}",
+                                    lambda: rendre_figure(_figure_surcout(tableau), format))
+
+
+def graphique_rendement(tableau, format="png"):
+    return cache_graphiques.obtenir(empreinte_donnees(tableau), f"rendement.{format}",
+                                    lambda: rendre_figure(_figure_rendement(tableau), format))
+
+
+# Nœuds du graphe de calcul de la page, en aval du tableau des régimes ; images tenues par cache_graphiques
+NOEUDS_GRAPHIQUES = (
+    Noeud("graphique_surcout", ("tableau",), graphique_surcout, partage=True),
+    Noeud("graphique_rendement", ("tableau",), graphique_rendement, partage=True),
+)
+
+
+def carte_sensibilite(axe_x, axe_y, valeurs_par_regime, titre_x, titre_y, titre_indicateur, format="png"):
+    # Une carte de chaleur par régime (grille 2 × 2) ; valeurs_par_regime[regime] a la forme (len(axe_y), len(axe_x)),
+    # les points où le régime est inapplicable valant NaN
+    fig = Figure(figsize=(12, 9))
+    axes = fig.subplots(2, 2, sharex=True, sharey=True)
+    for ax, (regime, valeurs) in zip(axes.flat, valeurs_par_regime.items()):
+        maillage = ax.pcolormesh(axe_x, axe_y, valeurs, shading="auto", cmap="RdYlGn")
+        fig.colorbar(maillage, ax=ax, label=titre_indicateur)
+        ax.set_title(regime)
+    for ax in axes[-1]:
+        ax.set_xlabel(titre_x)
+    for ax in axes[:, 0]:
+        ax.set_ylabel(titre_y)
+    fig.tight_layout()
+    return rendre_figure(fig, format)
+
+
+def bandes_centiles(annees, centiles_par_regime, centiles, titre_indicateur, format="png"):
+    # Éventail par régime : bandes entre centiles symétriques (5-95, 25-75) et médiane en trait plein ;
+    # centiles_par_regime[regime] a la forme (len(centiles), len(annees))
+    fig = Figure(figsize=(12, 9))
+    axes = fig.subplots(2, 2, sharex=True, sharey=True)
+    for ax, couleur, (regime, valeurs) in zip(axes.flat, COULEURS, centiles_par_regime.items()):
+        for bas in range(len(centiles) // 2):
+            ax.fill_between(annees, valeurs[bas], valeurs[-1 - bas], color=couleur, alpha=0.2 + 0.2 * bas, linewidth=0,
+                            label=f"P{centiles[bas]:g} – P{centiles[-1 - bas]:g}")
+        if len(centiles) % 2:
+            ax.plot(annees, valeurs[len(centiles) // 2], color=couleur, linewidth=2,
+                    label=f"P{centiles[len(centiles) // 2]:g}")
+        ax.axhline(0, color="grey", linewidth=0.8)
+        ax.set_title(regime)
+        ax.legend(loc="best", fontsize=8)
+    for ax in axes[-1]:
+        ax.set_xlabel("Année")
+    for ax in axes[:, 0]:
+        ax.set_ylabel(titre_indicateur)
+    fig.tight_layout()
+    return rendre_figure(fig, format)
@@ -0,0 +1,314 @@
+"""Dossier d'investissement PDF : génération unitaire et en lot.
+
+Les feuilles de style et les styles de tableaux sont construits une seule fois à l'import
+du module (lui-même importé à la demande) et réutilisés pour chaque rapport. Les graphiques
+sont repris du cache de rapports.graphiques plutôt que redessinés.
+
+Usage en lot : python -m rapports.pdf scenarios.csv dossiers.zip [--workers 8]
+"""
+
+import argparse
+import io
+import os
+import re
+import sys
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.lib.utils import ImageReader
+from reportlab.platypus import Image, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+from moteur_fiscal import simuler_scenario, tranche_marginale
+from moteur_fiscal.resultats import TableauRegimes
+from moteur_fiscal.scenario import normaliser_scenario
+from rapports.graphiques import graphique_rendement, graphique_surcout
+
+# --- Styles (construits une fois) ---
+styles = getSampleStyleSheet()
+title_style = ParagraphStyle(
+    'CustomTitle',
+    parent=styles['Heading1'],
+    fontSize=24,
+    spaceAfter=30,
+    alignment=1  # Center alignment
+)
+heading_style = ParagraphStyle(
+    'CustomHeading',
+    parent=styles['Heading2'],
+    fontSize=16,
+    spaceAfter=15,
+    textColor=colors.HexColor('#0b3d2e'),
+    borderPadding=10,
+    borderWidth=1,
+    borderColor=colors.HexColor('#d4af37'),
+    borderRadius=5
+)
+subheading_style = ParagraphStyle(
+    'CustomSubheading',
+    parent=styles['Heading3'],
+    fontSize=14,
+    spaceAfter=10,
+    textColor=colors.HexColor('#1f6f4a')
+)
+body_style = ParagraphStyle(
+    'CustomBody',
+    parent=styles['Normal'],
+    fontSize=11,
+    spaceAfter=8,
+    leading=16
+)
+note_style = ParagraphStyle(
+    'Note',
+    parent=styles['Italic'],
+    fontSize=9,
+    textColor=colors.grey
+)
+
+# Tableaux à deux colonnes (profil investisseur, caractéristiques du bien)
+info_table_style = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#f5f2e7')),
+    ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#0b3d2e')),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 11),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+    ('PADDING', (0, 0), (-1, -1), 8)
+])
+# Tableau comparatif des régimes
+results_table_style = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0b3d2e')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+    ('PADDING', (0, 0), (-1, -1), 8),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#f5f2e7')),
+    ('TEXTCOLOR', (0, 1), (-1, -1), colors.HexColor('#0b3d2e'))
+])
+
+
+def image_pdf(png, largeur=6.5*inch):
+    # Image mise à l'échelle de la largeur utile, proportions conservées
+    largeur_px, hauteur_px = ImageReader(io.BytesIO(png)).getSize()
+    return Image(io.BytesIO(png), width=largeur, height=largeur * hauteur_px / largeur_px)
+
+
+def generate_pdf(tableau, RFR, parts, loyers, type_bien, prix_bien, valeur_terrain=0, destination=None,
+                 graphiques=True, parametres=None):
+    # Créer le PDF en mémoire, ou directement dans le fichier de destination
+    pdf_buffer = destination if destination is not None else io.BytesIO()
+    doc = SimpleDocTemplate(pdf_buffer, pagesize=letter, leftMargin=40, rightMargin=40, topMargin=40, bottomMargin=40)
+    story = []
+
+    # En-tête
+    story.append(Paragraph("Dossier d'Investissement Immobilier", title_style))
+    story.append(Paragraph(f"Analyse fiscale et financière générée le {datetime.now().strftime('%d/%m/%Y')}",
+                           note_style))
+    story.append(Spacer(1, 30))
+
+    # Résumé exécutif
+    story.append(Paragraph("Résumé de l'Investissement", heading_style))
+    exec_summary = f"""
+    Ce document présente une analyse détaillée d'un projet d'investissement immobilier
+    {type_bien.lower()} pour un montant de {prix_bien:,.0f} €. La simulation inclut une étude
+    fiscale complète et une analyse de rentabilité selon différents régimes fiscaux.
+    """
+    story.append(Paragraph(exec_summary, body_style))
+    story.append(Spacer(1, 20))
+
+    # Profil de l'investisseur
+    story.append(Paragraph("Profil de l'Investisseur", heading_style))
+    # Tranche marginale d'imposition : recherche dans les bornes précalculées du barème
+    tmi = tranche_marginale(RFR, parts, parametres)
+    investor_data = [
+        ["Revenu Fiscal de Référence", f"{RFR:,.2f} €"],
+        ["Nombre de parts fiscales", f"{parts}"],
+        ["Tranche marginale d'imposition", f"{tmi*100:.0f}%"]
+    ]
+    t = Table(investor_data, colWidths=[4*inch, 2.5*inch])
+    t.setStyle(info_table_style)
+    story.append(t)
+    story.append(Spacer(1, 20))
+
+    # Caractéristiques du bien
+    story.append(Paragraph("Caractéristiques de l'Investissement", heading_style))
+    property_data = [
+        ["Type de bien", type_bien],
+        ["Prix d'acquisition", f"{prix_bien:,.2f} €"],
+        ["Revenus locatifs annuels", f"{loyers:,.2f} €"],
+        ["Rentabilité locative brute", f"{(loyers/prix_bien)*100:.2f}%"]
+    ]
+    if type_bien == "Maison individuelle":
+        property_data.extend([
+            ["Valeur du terrain", f"{valeur_terrain:,.2f} €"],
+            ["Valeur du bâti", f"{prix_bien-valeur_terrain:,.2f} €"]
+        ])
+    t = Table(property_data, colWidths=[4*inch, 2.5*inch])
+    t.setStyle(info_table_style)
+    story.append(t)
+    story.append(Spacer(1, 20))
+
+    # Analyse des différents régimes
+    story.append(Paragraph("Analyse Comparative des Régimes Fiscaux", heading_style))
+    results_data = [["Régime", "Surcoût fiscal", "Rendement net", "Revenu net annuel", "Cash-flow mensuel"]]
+    applicables = tableau.applicables()
+    for type_regime, surcout, rendement, revenu_net in zip(
+        applicables.libelles, applicables["surcout_fiscal"], applicables["rendement_net"],
+        applicables["revenu_net_apres_impot"]
+    ):
+        results_data.append([
+            type_regime,
+            f"{surcout:,.0f} €",
+            f"{rendement:.2f}%",
+            f"{revenu_net:,.0f} €",
+            f"{revenu_net/12:,.0f} €"
+        ])
+    t = Table(results_data, colWidths=[2*inch, 1.5*inch, 1.5*inch, 1.5*inch, 1.5*inch])
+    t.setStyle(results_table_style)
+    story.append(t)
+
+    # Graphiques : mêmes images que sur la page (cache indexé par les résultats)
+    if graphiques:
+        story.append(Spacer(1, 20))
+        story.append(Paragraph("Comparaison Graphique des Régimes", heading_style))
+        story.append(image_pdf(graphique_surcout(tableau)))
+        story.append(Spacer(1, 10))
+        story.append(image_pdf(graphique_rendement(tableau)))
+
+    # Recommandations
+    story.append(Spacer(1, 20))
+    story.append(Paragraph("Points Clés pour le Financement", heading_style))
+    key_points = [
+        f"• <b>Prix d'acquisition :</b> {prix_bien:,.0f} € (hors frais de notaire)",
+        f"• <b>Revenus locatifs annuels :</b> {loyers:,.0f} €",
+        f"• <b>Rentabilité locative brute :</b> {(loyers/prix_bien)*100:.2f}%",
+        "• <b>Points forts :</b>",
+        f"  - Revenus locatifs réguliers de {loyers/12:,.0f} € par mois",
+        "  - Plusieurs options de régimes fiscaux disponibles",
+        "• <b>Points d'attention :</b>",
+        "  - Prévoir une réserve pour les charges et travaux",
+        "  - Anticiper la fiscalité dans le plan de financement"
+    ]
+    for point in key_points:
+        story.append(Paragraph(point, body_style))
+
+    # Note de conclusion
+    story.append(Spacer(1, 20))
+    conclusion = """
+    <i>Note : Cette simulation constitue une aide à la décision et doit être complétée par une analyse
+    personnalisée avec un professionnel (expert-comptable, avocat fiscaliste) pour choisir
+    le régime fiscal le plus adapté à votre situation.</i>
+    """
+    story.append(Paragraph(conclusion, note_style))
+
+    # Pied de page
+    footer = f"""
+    Document généré le {datetime.now().strftime('%d/%m/%Y à %H:%M')}
+    Simulation réalisée avec le Simulateur fiscal immobilier et rendement
+    """
+    story.append(Spacer(1, 30))
+    story.append(Paragraph(footer, note_style))
+
+    # Générer le PDF
+    doc.build(story)
+    return pdf_buffer
+
+
+# --- Génération en lot ---
+def pdf_scenario(saisies):
+    scenario = normaliser_scenario(saisies)
+    tableau = TableauRegimes.depuis_resultats(simuler_scenario(scenario))
+    return generate_pdf(tableau, scenario["RFR"], scenario["parts"], scenario["loyers"], scenario["type_bien"],
+                        scenario["prix_bien"], scenario["valeur_terrain"]).getvalue()
+
+
+def _pdf_nomme(nom, saisies):
+    return nom, pdf_scenario(saisies)
+
+
+# Un dossier par (nom, saisies), écrit au fil de l'eau dans un répertoire ou une archive .zip :
+# au plus deux rapports par worker sont en mémoire à un instant donné
+def generer_rapports(scenarios, sortie, workers=None):
+    workers = workers or os.cpu_count() or 1
+    noms_pris = set()
+    if str(sortie).endswith(".zip"):
+        archive = zipfile.ZipFile(sortie, "w", compression=zipfile.ZIP_DEFLATED)
+        ecrire = archive.writestr
+    else:
+        archive = None
+        Path(sortie).mkdir(parents=True, exist_ok=True)
+        # Les PDF d'une génération précédente sont gardés : les nouveaux dossiers homonymes sont suffixés
+        noms_pris.update(chemin.stem.lower() for chemin in Path(sortie).iterdir() if chemin.suffix.lower() == ".pdf")
+
+        def ecrire(nom_fichier, contenu):
+            (Path(sortie) / nom_fichier).write_bytes(contenu)
+
+    n_rapports = 0
+    en_vol = deque()
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for nom, saisies in scenarios:
+                en_vol.append(pool.submit(_pdf_nomme, nom, saisies))
+                if len(en_vol) >= 2 * workers:
+                    ecrire(*_fichier_pdf(en_vol.popleft().result(), noms_pris))
+                    n_rapports += 1
+            while en_vol:
+                ecrire(*_fichier_pdf(en_vol.popleft().result(), noms_pris))
+                n_rapports += 1
+    finally:
+        if archive is not None:
+            archive.close()
+    return n_rapports
+
+
+CARACTERES_INTERDITS = re.compile(r'[\x00-\x1f<>:"/\\|?*]')
+NOMS_RESERVES = {"CON", "PRN", "AUX", "NUL", *(f"COM{i}" for i in range(1, 10)), *(f"LPT{i}" for i in range(1, 10))}
+LONGUEUR_NOM_MAX = 120
+
+
+def _fichier_pdf(resultat, noms_pris):
+    # Nom de fichier sûr sur tout système (ni séparateur, ni « .. », ni nom réservé de Windows) et
+    # unique dans le lot : les homonymes reçoivent un suffixe _2, _3... au lieu de s'écraser
+    nom, contenu = resultat
+    base = CARACTERES_INTERDITS.sub("_", nom).strip(" .")[:LONGUEUR_NOM_MAX] or "dossier"
+    if base.split(".")[0].upper() in NOMS_RESERVES:
+        base = f"_{base}"
+    candidat, numero = base, 1
+    while candidat.lower() in noms_pris:  # insensible à la casse, comme Windows et macOS
+        numero += 1
+        candidat = f"{base}_{numero}"
+    noms_pris.add(candidat.lower())
+    return f"{candidat}.pdf", contenu
+
+
+def main(argv=None):
+    from moteur_fiscal.batch import lire_lots
+
+    parser = argparse.ArgumentParser(description="Génération en lot des dossiers d'investissement PDF.")
+    parser.add_argument("entree", help="fichier CSV ou Parquet des scénarios (une ligne par dossier)")
+    parser.add_argument("sortie", help="répertoire ou archive .zip de destination")
+    parser.add_argument("--colonne-nom", default="nom", help="colonne donnant le nom de chaque dossier (défaut : nom)")
+    parser.add_argument("--workers", type=int, default=None, help="nombre de processus (défaut : nombre de cœurs)")
+    args = parser.parse_args(argv)
+
+    def scenarios():
+        numero = 0
+        for lot in lire_lots(args.entree, 1000):
+            for ligne in lot:
+                numero += 1
+                yield str(ligne.get(args.colonne_nom) or f"dossier_{numero:06d}"), ligne
+
+    n_rapports = generer_rapports(scenarios(), args.sortie, args.workers)
+    print(f"{n_rapports} dossiers générés dans {args.sortie}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
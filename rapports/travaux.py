@@ -0,0 +1,202 @@
+"""Génération en arrière-plan des rapports PDF demandés depuis la page.
+
+reportlab est du Python pur : un rapport construit dans le fil d'une session retiendrait le GIL
+au détriment de toutes les autres. Les rapports sont donc construits dans un pool de processus
+partagé par tout le serveur, et chaque demande reçoit un identifiant de travail, seule donnée
+conservée dans l'état de session ; etat_rapport() en donne l'avancement à chaque interrogation.
+Un même scénario demandé par plusieurs sessions ne donne lieu qu'à un seul travail, et un
+rapport déjà en cache est disponible immédiatement. Un appelant sans page à rafraîchir (le
+service HTTP) attend la fin du travail avec attendre_rapport().
+
+Les processus sont démarrés en mode « spawn » (jamais de fork d'un serveur multi-fils) ;
+leur nombre est fixé par SIMULATEUR_WORKERS_PDF (défaut : 2). Chaque processus signale par une
+file le moment où il commence un rapport : l'avancement affiché part du début réel du travail.
+Un pool cassé (processus tué, mémoire épuisée) est remplacé, et les travaux qu'il emportait
+sont soumis une seconde fois au nouveau pool avant d'être déclarés en échec.
+"""
+
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from moteur_fiscal.cache import cache_resultats
+
+TRAVAUX_CONSERVES = 256  # travaux terminés gardés en mémoire, les plus anciens oubliés d'abord
+
+_verrou = threading.Lock()
+_pool = None
+_debuts = None  # file (identifiant, heure de début) alimentée par les processus du pool
+_travaux = OrderedDict()  # identifiant -> {"cle", "entrees", "futur", "soumis", "debut", "relance", "pdf", "erreur", "fini"}
+_par_cle = {}  # empreinte du scénario -> identifiant du dernier travail
+_duree_moyenne = 2.0  # durée d'un rapport (s), moyenne glissante des travaux terminés
+
+
+def _pool_rapports():
+    # Appelé sous _verrou
+    global _pool, _debuts
+    if _pool is None:
+        workers = int(os.environ.get("SIMULATEUR_WORKERS_PDF", 2))
+        contexte = multiprocessing.get_context("spawn")
+        _debuts = contexte.Queue()
+        _pool = ProcessPoolExecutor(max_workers=workers, mp_context=contexte,
+                                    initializer=_initialiser_processus, initargs=(_debuts,))
+    return _pool
+
+
+def _remplacer_pool(pool):
+    # Appelé sous _verrou : un pool cassé refuse tout travail, le suivant est créé à la demande
+    global _pool
+    if _pool is pool:
+        _pool = None
+        pool.shutdown(wait=False)
+
+
+def _initialiser_processus(debuts):
+    # Dans chaque processus du pool : la file des débuts devient une globale du processus
+    global _debuts
+    _debuts = debuts
+
+
+def _construire_rapport(identifiant, arguments, images, parametres=None):
+    # Exécuté dans un processus du pool : les graphiques déjà rendus par la page sont repris
+    from rapports.graphiques import cache_graphiques, empreinte_donnees
+    from rapports.pdf import generate_pdf
+
+    _debuts.put((identifiant, time.time()))  # horloge murale, commune à tous les processus
+    debut = time.perf_counter()
+    empreinte = empreinte_donnees(arguments[0])
+    for nom, image in images.items():
+        cache_graphiques.deposer(empreinte, nom, image)
+    pdf = generate_pdf(*arguments, parametres=parametres).getvalue()
+    return pdf, time.perf_counter() - debut
+
+
+def soumettre_rapport(cle, tableau, RFR, parts, loyers, type_bien, prix_bien, valeur_terrain=0, parametres=None):
+    from rapports.graphiques import cache_graphiques, empreinte_donnees
+
+    with _verrou:
+        identifiant = _par_cle.get(cle)
+        travail = _travaux.get(identifiant)
+        if travail is not None and travail["erreur"] is None:
+            return identifiant
+
+        identifiant = uuid.uuid4().hex
+        travail = {"cle": cle, "entrees": None, "futur": None, "soumis": time.time(), "debut": None,
+                   "relance": False, "pdf": cache_resultats.artefacts(cle).get("pdf"), "erreur": None,
+                   "fini": threading.Event()}
+        _travaux[identifiant] = travail
+        _par_cle[cle] = identifiant
+        _oublier_anciens()
+        if travail["pdf"] is not None:
+            travail["fini"].set()
+            return identifiant
+        images = cache_graphiques.artefacts(empreinte_donnees(tableau))
+        arguments = (tableau, RFR, parts, loyers, type_bien, prix_bien, valeur_terrain)
+        travail["entrees"] = (arguments, images, parametres)
+        futur, pool = _soumettre(identifiant, travail)
+    futur.add_done_callback(lambda futur: _terminer(identifiant, travail, futur, pool))
+    return identifiant
+
+
+def _soumettre(identifiant, travail):
+    # Appelé sous _verrou ; un pool trouvé cassé à la soumission est remplacé sur-le-champ
+    pool = _pool_rapports()
+    try:
+        futur = pool.submit(_construire_rapport, identifiant, *travail["entrees"])
+    except BrokenProcessPool:
+        _remplacer_pool(pool)
+        pool = _pool_rapports()
+        futur = pool.submit(_construire_rapport, identifiant, *travail["entrees"])
+    travail.update(futur=futur, debut=None)
+    return futur, pool
+
+
+def _terminer(identifiant, travail, futur, pool):
+    global _duree_moyenne
+    try:
+        pdf, duree = futur.result()
+    except BrokenProcessPool as erreur:
+        # Processus du pool perdu : pool remplacé, travail soumis une seconde fois
+        with _verrou:
+            _remplacer_pool(pool)
+            relance = not travail["relance"]
+            if relance:
+                travail["relance"] = True
+                futur, pool = _soumettre(identifiant, travail)
+            else:
+                travail.update(entrees=None, erreur=f"{type(erreur).__name__}: {erreur}")
+        if relance:
+            futur.add_done_callback(lambda futur: _terminer(identifiant, travail, futur, pool))
+        else:
+            travail["fini"].set()
+        return
+    except Exception as erreur:  # le rapport est signalé en échec, la page peut le redemander
+        with _verrou:
+            travail.update(entrees=None, erreur=f"{type(erreur).__name__}: {erreur}")
+        travail["fini"].set()
+        return
+    cache_resultats.deposer(travail["cle"], "pdf", pdf)
+    with _verrou:
+        _relever_debuts()  # la file ne grossit pas quand personne n'interroge l'avancement
+        travail.update(entrees=None, pdf=pdf)
+        _duree_moyenne = 0.8 * _duree_moyenne + 0.2 * duree
+    travail["fini"].set()
+
+
+def _relever_debuts():
+    # Appelé sous _verrou : heures de début envoyées par les processus depuis le dernier relevé
+    while _debuts is not None:
+        try:
+            identifiant, debut = _debuts.get_nowait()
+        except queue.Empty:
+            break
+        travail = _travaux.get(identifiant)
+        if travail is not None and travail["pdf"] is None and travail["erreur"] is None:
+            travail["debut"] = debut
+
+
+def _oublier_anciens():
+    termines = [i for i, t in _travaux.items() if t["pdf"] is not None or t["erreur"] is not None]
+    for identifiant in termines[:max(0, len(termines) - TRAVAUX_CONSERVES)]:
+        travail = _travaux.pop(identifiant)
+        if _par_cle.get(travail["cle"]) == identifiant:
+            del _par_cle[travail["cle"]]
+
+
+def etat_rapport(identifiant):
+    # None si le travail est inconnu (oublié, ou serveur redémarré depuis la demande)
+    with _verrou:
+        travail = _travaux.get(identifiant)
+        if travail is None:
+            return None
+        _relever_debuts()
+        maintenant = time.time()
+        etat = {"cle": travail["cle"], "etat": "en_attente", "progression": 0.0, "rapports_avant": 0,
+                "duree_s": maintenant - travail["soumis"], "pdf": travail["pdf"], "erreur": travail["erreur"]}
+        if travail["pdf"] is not None:
+            etat.update(etat="termine", progression=1.0)
+        elif travail["erreur"] is not None:
+            etat["etat"] = "echec"
+        elif travail["debut"] is not None:
+            # Seul le début est signalé par le processus : estimation d'après la durée des rapports précédents
+            etat.update(etat="en_cours", progression=min(0.95, (maintenant - travail["debut"]) / _duree_moyenne))
+        else:
+            etat["rapports_avant"] = sum(1 for t in _travaux.values()
+                                         if t["futur"] is not None and t["soumis"] < travail["soumis"]
+                                         and not t["futur"].done())
+    return etat
+
+
+def attendre_rapport(identifiant, delai=None):
+    # Bloque jusqu'à la fin du travail (ou l'expiration du délai, en secondes), puis renvoie son état
+    with _verrou:
+        travail = _travaux.get(identifiant)
+    if travail is not None:
+        travail["fini"].wait(delai)
+    return etat_rapport(identifiant)
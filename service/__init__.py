@@ -0,0 +1 @@
+"""Service HTTP local autour du moteur de calcul, pour les appels d'autres applications (voir service.serveur)."""
@@ -0,0 +1,381 @@
+"""Service HTTP local de simulation : un scénario, un lot de scénarios ou le dossier PDF.
+
+Usage : python -m service.serveur [--hote 127.0.0.1] [--port 8502] [--workers 8] [--concurrence 64]
+
+Points d'entrée (corps JSON ; saisies : champs de moteur_fiscal.SCENARIO_DEFAUT, plus un champ
+« annee » facultatif pour choisir le jeu de paramètres fiscaux) :
+  GET  /sante        état du service et compteurs
+  POST /simulation   un scénario -> résultats détaillés des quatre régimes
+  POST /simulations  {"scenarios": [...], "annee": ...} -> indicateurs de chaque régime, en colonnes
+                     (une valeur par scénario, dans l'ordre du lot ; null si le régime est inapplicable)
+  POST /rapport      un scénario -> dossier PDF (application/pdf)
+
+Les lots sont découpés en tranches évaluées en parallèle par un pool de processus ; les rapports
+passent par le pool de rapports.travaux (dédoublonnés et mis en cache). Le nombre de requêtes
+traitées simultanément est borné, ainsi que celui des lots et des rapports en cours : au-delà, le
+service répond 503 avec Retry-After plutôt que de laisser s'allonger une file. Chaque réponse porte
+un en-tête Server-Timing (lecture, attente, calcul, écriture, total, en millisecondes).
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from moteur_fiscal.batch import colonnes_resultats, evaluer_lot
+from moteur_fiscal.cache import cache_resultats, empreinte_scenario
+from moteur_fiscal.parametres import PARAMETRES_DEFAUT, parametres_fiscaux
+from moteur_fiscal.resultats import TableauRegimes
+from moteur_fiscal.scenario import normaliser_scenario, simuler_scenario
+
+TAILLE_CORPS_MAX = 64 * 1024 * 1024
+SCENARIOS_PAR_LOT_MAX = 100_000
+TAILLE_TRANCHE = 2000     # scénarios par tâche du pool ; un lot plus petit est évalué sur place
+ATTENTE_PLACE = 0.5       # s d'attente d'une place libre avant de répondre 503
+DELAI_RAPPORT = 120       # s
+JSON = "application/json; charset=utf-8"
+# Saisies qui divisent un calcul (parts, durées) ou fondent un rendement (prix) : strictement positives
+CHAMPS_POSITIFS = ("parts", "prix_bien", "duree_annees", "duree_amortissement_bati", "duree_amortissement_mobilier")
+# Durées en années, comptées en mois par l'échéancier du prêt : au moins un mois une fois arrondies
+CHAMPS_DUREES = ("duree_annees", "duree_amortissement_bati", "duree_amortissement_mobilier")
+
+
+class ErreurRequete(Exception):
+    def __init__(self, statut, message):
+        super().__init__(message)
+        self.statut = statut
+
+
+# --- Conversion des résultats ---
+def _valeurs_finies(valeur):
+    # JSON strict : les NaN des régimes inapplicables et la borne infinie de la dernière tranche deviennent null
+    if isinstance(valeur, float):
+        return valeur if math.isfinite(valeur) else None
+    if isinstance(valeur, dict):
+        return {cle: _valeurs_finies(v) for cle, v in valeur.items()}
+    if isinstance(valeur, (list, tuple)):
+        return [_valeurs_finies(v) for v in valeur]
+    return valeur
+
+
+def _json(donnees):
+    return json.dumps(_valeurs_finies(donnees), ensure_ascii=False, allow_nan=False).encode()
+
+
+def resultat_vers_dict(resultat):
+    return {**resultat._asdict(), "libelle": resultat.libelle,
+            "res": resultat.res._asdict() if resultat.res is not None else None}
+
+
+def _verifier_scenario(scenario):
+    # Scénario normalisé : ValueError plutôt qu'une division par zéro au milieu du calcul
+    for cle, valeur in scenario.items():
+        if isinstance(valeur, float) and not math.isfinite(valeur):
+            raise ValueError(f"{cle} doit être un nombre fini")
+    for cle in CHAMPS_POSITIFS:
+        if scenario[cle] <= 0:
+            raise ValueError(f"{cle} doit être strictement positif")
+    for cle in CHAMPS_DUREES:
+        if round(scenario[cle] * 12) < 1:
+            raise ValueError(f"{cle} doit valoir au moins un mois ({1 / 12:.4f} an)")
+    return scenario
+
+
+def _evaluer_tranche(lignes, parametres=None, debut=0):
+    # Exécuté dans un processus du pool (ou sur place pour un petit lot) : colonnes déjà converties
+    for i, ligne in enumerate(lignes):
+        try:
+            _verifier_scenario(normaliser_scenario(ligne))
+        except (ValueError, TypeError) as erreur:
+            raise ValueError(f"scénario {debut + i} : {erreur}") from None
+    tableau = evaluer_lot(lignes, parametres)
+    return {colonne: [None if v != v else v for v in valeurs.tolist()]
+            for colonne, valeurs in colonnes_resultats(tableau).items()}
+
+
+# --- Serveur ---
+class ServiceSimulation(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, adresse, workers=None, concurrence=64, lots_simultanes=2, rapports_simultanes=32,
+                 journal=False):
+        super().__init__(adresse, GestionnaireSimulation)
+        self.workers = workers or os.cpu_count() or 1
+        self.journal = journal
+        self.places = threading.BoundedSemaphore(concurrence)
+        self.places_lots = threading.BoundedSemaphore(lots_simultanes)
+        self.places_rapports = threading.BoundedSemaphore(rapports_simultanes)
+        self.compteurs = {"requetes": 0, "refusees": 0, "erreurs": 0, "en_cours": 0}
+        self._verrou = threading.Lock()
+        self._pool = None
+
+    def pool_lots(self):
+        # Processus démarrés en mode « spawn » (serveur multi-fils), au premier lot
+        with self._verrou:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+    def remplacer_pool(self, pool):
+        # Un pool cassé (processus tué, mémoire épuisée) refuse tout travail : le suivant est créé à la demande
+        with self._verrou:
+            if self._pool is pool:
+                self._pool = None
+                pool.shutdown(wait=False)
+
+    def compter(self, **increments):
+        with self._verrou:
+            for compteur, increment in increments.items():
+                self.compteurs[compteur] += increment
+
+    def server_close(self):
+        super().server_close()
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+
+
+class GestionnaireSimulation(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # connexions persistantes
+    server_version = "SimulateurFiscal/1.0"
+    disable_nagle_algorithm = True
+
+    ROUTES = {
+        ("GET", "/sante"): "_sante",
+        ("POST", "/simulation"): "_simulation",
+        ("POST", "/simulations"): "_simulations",
+        ("POST", "/rapport"): "_rapport",
+    }
+
+    def do_GET(self):
+        self._traiter("GET")
+
+    def do_POST(self):
+        self._traiter("POST")
+
+    def _traiter(self, methode):
+        debut = time.perf_counter()
+        self.durees = {}
+        entetes = {}
+        chemin = self.path.split("?", 1)[0].rstrip("/") or "/"
+        self.server.compter(requetes=1)
+        try:
+            corps = self._lire_corps() if methode == "POST" else None
+            self._jalon("lecture", debut)
+            action = self.ROUTES.get((methode, chemin))
+            if action is None:
+                connu = any(c == chemin for _, c in self.ROUTES)
+                raise ErreurRequete(405 if connu else 404, f"{methode} {chemin} : point d'entrée inconnu")
+
+            attente = time.perf_counter()
+            if not self.server.places.acquire(timeout=ATTENTE_PLACE):
+                raise ErreurRequete(503, "Service saturé, réessayer plus tard")
+            self._jalon("attente", attente)
+            self.server.compter(en_cours=1)
+            try:
+                statut, type_contenu, contenu, entetes = getattr(self, action)(corps)
+            finally:
+                self.server.compter(en_cours=-1)
+                self.server.places.release()
+        except ErreurRequete as erreur:
+            self.server.compter(**{"refusees" if erreur.statut == 503 else "erreurs": 1})
+            statut, type_contenu, contenu = erreur.statut, JSON, _json({"erreur": str(erreur)})
+            if erreur.statut == 503:
+                entetes = {"Retry-After": "1"}
+        except Exception as erreur:  # l'erreur est renvoyée au client, le service continue
+            self.server.compter(erreurs=1)
+            self.log_error("%s %s : %r", methode, chemin, erreur)
+            statut, type_contenu = 500, JSON
+            contenu = _json({"erreur": f"{type(erreur).__name__}: {erreur}"})
+        self.durees["total"] = (time.perf_counter() - debut) * 1000
+        self._repondre(statut, type_contenu, contenu, entetes)
+
+    def _jalon(self, etape, depuis):
+        self.durees[etape] = (time.perf_counter() - depuis) * 1000
+
+    def _lire_corps(self):
+        longueur = self.headers.get("Content-Length")
+        # Corps non lu en cas de refus : la connexion ne peut pas être réutilisée
+        if longueur is None:
+            self.close_connection = True
+            raise ErreurRequete(411, "En-tête Content-Length requis")
+        try:
+            longueur = int(longueur)
+        except ValueError:
+            self.close_connection = True
+            raise ErreurRequete(400, "En-tête Content-Length invalide") from None
+        if longueur > TAILLE_CORPS_MAX:
+            self.close_connection = True
+            raise ErreurRequete(413, f"Corps de requête limité à {TAILLE_CORPS_MAX} octets")
+        contenu = self.rfile.read(longueur)
+        try:
+            return json.loads(contenu) if contenu else {}
+        except ValueError as erreur:
+            raise ErreurRequete(400, f"JSON invalide : {erreur}") from None
+
+    def _repondre(self, statut, type_contenu, contenu, entetes):
+        self.send_response(statut)
+        self.send_header("Content-Type", type_contenu)
+        self.send_header("Content-Length", str(len(contenu)))
+        self.send_header("Server-Timing", ", ".join(f"{etape};dur={duree:.2f}" for etape, duree in self.durees.items()))
+        for nom, valeur in entetes.items():
+            self.send_header(nom, valeur)
+        self.end_headers()
+        self.wfile.write(contenu)
+
+    def log_message(self, format, *args):
+        if self.server.journal:
+            super().log_message(format, *args)
+
+    def log_error(self, format, *args):
+        super().log_message(format, *args)
+
+    # --- Points d'entrée ---
+    def _sante(self, corps):
+        with self.server._verrou:
+            compteurs = dict(self.server.compteurs)
+        donnees = {"etat": "ok", "workers": self.server.workers, **compteurs,
+                   "cache": {"scenarios": len(cache_resultats), "taille": cache_resultats.taille,
+                             "succes": cache_resultats.succes,
+                             "echecs": cache_resultats.echecs}}
+        return 200, JSON, _json(donnees), {}
+
+    def _simulation(self, corps):
+        calcul = time.perf_counter()
+        scenario, parametres, cle = _lire_scenario(corps)
+        resultats = cache_resultats.obtenir(cle, "regimes", lambda: simuler_scenario(scenario, parametres))
+        self._jalon("calcul", calcul)
+        ecriture = time.perf_counter()
+        contenu = _json({"cle": cle, "annee": parametres.annee,
+                         "regimes": [resultat_vers_dict(r) for r in resultats]})
+        self._jalon("ecriture", ecriture)
+        return 200, JSON, contenu, {}
+
+    def _simulations(self, corps):
+        calcul = time.perf_counter()
+        if isinstance(corps, list):
+            corps = {"scenarios": corps}
+        scenarios = corps.get("scenarios") if isinstance(corps, dict) else None
+        if not isinstance(scenarios, list) or not all(isinstance(s, dict) for s in scenarios):
+            raise ErreurRequete(400, "Corps attendu : {\"scenarios\": [{...}, ...]}")
+        if not scenarios:
+            raise ErreurRequete(400, "Aucun scénario dans le lot")
+        if len(scenarios) > SCENARIOS_PAR_LOT_MAX:
+            raise ErreurRequete(413, f"Lot limité à {SCENARIOS_PAR_LOT_MAX} scénarios")
+        parametres = _lire_parametres(corps.get("annee"))
+
+        tranches = [scenarios[i:i + TAILLE_TRANCHE] for i in range(0, len(scenarios), TAILLE_TRANCHE)]
+        try:
+            if len(tranches) == 1:
+                colonnes = [_evaluer_tranche(tranches[0], parametres)]
+            else:
+                if not self.server.places_lots.acquire(timeout=ATTENTE_PLACE):
+                    raise ErreurRequete(503, "Trop de lots en cours, réessayer plus tard")
+                try:
+                    colonnes = self._evaluer_tranches(tranches, parametres)
+                finally:
+                    self.server.places_lots.release()
+        except (ValueError, TypeError) as erreur:
+            raise ErreurRequete(400, f"Scénario invalide dans le lot : {erreur}") from None
+        self._jalon("calcul", calcul)
+
+        ecriture = time.perf_counter()
+        resultats = {colonne: [v for tranche in colonnes for v in tranche[colonne]] for colonne in colonnes[0]}
+        contenu = _json({"n": len(scenarios), "annee": parametres.annee, "resultats": resultats})
+        self._jalon("ecriture", ecriture)
+        return 200, JSON, contenu, {"X-Scenarios": str(len(scenarios))}
+
+    def _evaluer_tranches(self, tranches, parametres):
+        # Un pool cassé en cours de lot est remplacé et le lot soumis une seconde fois
+        for essai in range(2):
+            pool = self.server.pool_lots()
+            try:
+                futurs = [pool.submit(_evaluer_tranche, tranche, parametres, i * TAILLE_TRANCHE)
+                          for i, tranche in enumerate(tranches)]
+                return [futur.result() for futur in futurs]
+            except BrokenProcessPool:
+                self.server.remplacer_pool(pool)
+        raise ErreurRequete(503, "Processus de calcul interrompus, réessayer plus tard")
+
+    def _rapport(self, corps):
+        from rapports.travaux import attendre_rapport, soumettre_rapport
+
+        calcul = time.perf_counter()
+        scenario, parametres, cle = _lire_scenario(corps)
+        if not self.server.places_rapports.acquire(blocking=False):
+            raise ErreurRequete(503, "Trop de rapports en cours, réessayer plus tard")
+        try:
+            resultats = cache_resultats.obtenir(cle, "regimes", lambda: simuler_scenario(scenario, parametres))
+            identifiant = soumettre_rapport(
+                cle, TableauRegimes.depuis_resultats(resultats), scenario["RFR"], scenario["parts"],
+                scenario["loyers"], scenario["type_bien"], scenario["prix_bien"], scenario["valeur_terrain"],
+                parametres,
+            )
+            etat = attendre_rapport(identifiant, DELAI_RAPPORT)
+        finally:
+            self.server.places_rapports.release()
+        if etat is None or etat["etat"] == "echec":
+            raise ErreurRequete(500, f"Échec du rapport : {etat['erreur'] if etat else 'travail perdu'}")
+        if etat["etat"] != "termine":
+            raise ErreurRequete(504, f"Rapport non terminé après {DELAI_RAPPORT} s")
+        self._jalon("calcul", calcul)
+        return 200, "application/pdf", etat["pdf"], {
+            "Content-Disposition": f'attachment; filename="dossier_{cle[:12]}.pdf"'}
+
+
+def _lire_parametres(annee):
+    try:
+        return parametres_fiscaux(annee)
+    except (ValueError, TypeError) as erreur:
+        raise ErreurRequete(400, str(erreur)) from None
+
+
+def _lire_scenario(corps):
+    # Saisies normalisées, jeu de paramètres et empreinte (l'année n'y figure que si elle n'est pas celle par défaut)
+    if not isinstance(corps, dict):
+        raise ErreurRequete(400, "Corps attendu : objet JSON des saisies du scénario")
+    parametres = _lire_parametres(corps.get("annee"))
+    try:
+        scenario = _verifier_scenario(normaliser_scenario(corps))
+    except (ValueError, TypeError) as erreur:
+        raise ErreurRequete(400, f"Saisie invalide : {erreur}") from None
+    options = {} if parametres is PARAMETRES_DEFAUT else {"annee": parametres.annee}
+    return scenario, parametres, empreinte_scenario(scenario, **options)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Service HTTP local du simulateur fiscal.")
+    parser.add_argument("--hote", default="127.0.0.1", help="adresse d'écoute (défaut : 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8502, help="port d'écoute (défaut : 8502)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processus d'évaluation des lots (défaut : nombre de cœurs)")
+    parser.add_argument("--concurrence", type=int, default=64, help="requêtes traitées simultanément (défaut : 64)")
+    parser.add_argument("--lots", type=int, default=2, help="lots évalués simultanément (défaut : 2)")
+    parser.add_argument("--rapports", type=int, default=32, help="rapports PDF en cours au plus (défaut : 32)")
+    parser.add_argument("--journal", action="store_true", help="journaliser chaque requête sur la sortie d'erreur")
+    args = parser.parse_args(argv)
+
+    serveur = ServiceSimulation((args.hote, args.port), args.workers, args.concurrence, args.lots, args.rapports,
+                                args.journal)
+    # SIGTERM arrête le service comme Ctrl+C : le pool est fermé avec lui, sans processus orphelins
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    print(f"Service de simulation sur http://{args.hote}:{serveur.server_address[1]}", file=sys.stderr, flush=True)
+    try:
+        serveur.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        serveur.server_close()
+
+
+if __name__ == "__main__":
+    main()